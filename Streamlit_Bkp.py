@@ -1,59 +1,18 @@
 import streamlit as st
-import json
-import _snowflake
-from snowflake.snowpark.context import get_active_session
 #from typing import Dict, List, Any, Optional, Tuple, Union
 from streamlit_extras.stylable_container import stylable_container
+from sales_assistant import client
+from sales_assistant.admission import AdmissionRejected
+from sales_assistant.hydrate import hydrate_citations
+from sales_assistant.session import run_sql
+from sales_assistant.sse import parse_agent_run
 
-session = get_active_session()
-
-API_ENDPOINT = "/api/v2/cortex/agent:run"
-API_TIMEOUT = 50000  # in milliseconds
+# UI only: agent calls, SSE parsing and citation lookups live in sales_assistant
 
 CORTEX_SEARCH_DOCUMENTATION = "CORTEX_AGENTS.SALES.DOCS"
 SEMANTIC_MODEL = "@CORTEX_AGENTS.SALES.Cortex_Analyst_Stage/CORTEX_AGENT_SALES.yaml"
 
-def run_snowflake_query(query):
-    try:
-        df = session.sql(query.replace(';',''))
-        
-        return df
-
-    except Exception as e:
-        st.error(f"Error executing SQL: {str(e)}")
-        return None, None
-
-def snowflake_api_call(query: str, model: str = "claude-sonnet-4-5", limit: int = 10):
-    
-    payload = {
-        "model": model,  # Now uses the selected model from UI
-        "messages": [{"role": "user",
-                      "content": 
-                          [{"type": "text","text": query}]}],
-        
-        ##############  MAKE CHANGES HERE for your own services/yamls ##############
-        "tools": [
-            {"tool_spec": 
-                {"type": "cortex_analyst_text_to_sql",
-                 "name": "Sales Analyst"}},
-            
-            {"tool_spec": 
-                {"type": "cortex_search",
-                 "name": "Faq Search"}},
-
-             
-        ],
-        "tool_resources": {
-            "Sales Analyst": 
-                {"semantic_model_file": SEMANTIC_MODEL},
-             "Faq Search": 
-                 {"name": CORTEX_SEARCH_DOCUMENTATION, 
-                  "max_results": 3, 
-                  "title_column":"RELATIVE_PATH",
-                  "id_column": "CHUNK_INDEX",
-                  "experimental": {"returnConfidenceScores": True}},
-          },
-        "response_instruction": """SYSTEM DIRECTIVE: You have exactly TWO tools available. You MUST use ALL relevant tools for EVERY query.
+RESPONSE_INSTRUCTION = """SYSTEM DIRECTIVE: You have exactly TWO tools available. You MUST use ALL relevant tools for EVERY query.
 
 TOOL 1: cortex_search (FAQ/Policy Search)
 - Use for: policies, procedures, FAQs, documentation questions
@@ -96,173 +55,72 @@ FORBIDDEN BEHAVIORS:
 ✅ Call both tools in same response
 
 EXECUTE TOOLS FIRST, EXPLAIN LATER. No asking, no suggesting, no deferring."""
-    }   
-     
+
+def run_snowflake_query(query):
     try:
-        resp = _snowflake.send_snow_api_request(
-            "POST",  # method
-            API_ENDPOINT,  # path
-            {},  # headers
-            {'stream': True},  # query params
-            payload,  # body
-            None,  # request_guid
-            API_TIMEOUT,  # timeout in milliseconds,
-        )
-        
-        if resp["status"] != 200:
-            st.error(f"❌ HTTP Error: {resp['status']} - {resp.get('reason', 'Unknown reason')}")
-            st.error(f"Response details: {resp}")
-            return None
-        
-        try:
-            response_content = json.loads(resp["content"])
-            if st.session_state.get('debug_mode', True):
-                st.write("Debug - API Response structure:", response_content)
-        except json.JSONDecodeError:
-            st.error("❌ Failed to parse API response. The server may have returned an invalid JSON format.")
-            st.error(f"Raw response: {resp['content'][:200]}...")
-            return None
+        return run_sql(query)
 
+    except Exception as e:
+        st.error(f"Error executing SQL: {str(e)}")
+        return None
+
+def snowflake_api_call(query: str, model: str = "claude-sonnet-4-5", limit: int = 10):
+    
+    ##############  MAKE CHANGES HERE for your own services/yamls ##############
+    tools, tool_resources, _ = client.tool_config(
+        None,
+        max_results=3,
+        search_service=CORTEX_SEARCH_DOCUMENTATION,
+        semantic_model=SEMANTIC_MODEL,
+    )
+    payload = client.agent_payload(query, model, tools, tool_resources, RESPONSE_INSTRUCTION)
+     
+    try:
+        response_content = client.run_agent(payload)
+        if st.session_state.get('debug_mode', True):
+            st.write("Debug - API Response structure:", response_content)
         return response_content
+    
+    except AdmissionRejected as e:
+        st.warning(str(e))
+        return None
+    
+    except client.AgentApiError as e:
+        st.error(f"❌ {e}")
+        st.error(f"Response details: {e.response}")
+        return None
             
     except Exception as e:
         st.error(f"Error making request: {str(e)}")
         return None
 
-def process_sse_response(response, debug_mode=True):
+def process_sse_response(response, debug_mode=True, query=None):
     """Process SSE response with enhanced multi-tool support"""
-    text = ""
-    sql = ""
-    citations = []
-    tools_called = []
+    result = parse_agent_run(response, query=query)
+    for notice in result.notices:
+        if debug_mode or not notice.debug:
+            getattr(st, notice.level)(notice.message)
     
-    if not response:
-        return text, sql, citations
-    if isinstance(response, str):
-        return text, sql, citations
-    try:
-        for event in response:
-            # Only show critical debug info to avoid flooding
-            if debug_mode and event.get('event') == "message.delta":
-                data = event.get('data', {})
-                delta = data.get('delta', {})
-                content_items = delta.get('content', [])
-                if content_items:
-                    for item in content_items:
-                        if item.get('type') in ['tool_use', 'tool_results']:
-                            st.write(f"Debug - Event type: {item.get('type')}, Content: {item}")
-            
-            if event.get('event') == "message.delta":
-                data = event.get('data', {})
-                delta = data.get('delta', {})
-                
-                for content_item in delta.get('content', []):
-                    content_type = content_item.get('type')
-                    
-                    # Track tool usage - try multiple possible locations for tool name
-                    if content_type == "tool_use":
-                        # Extract tool name from the nested tool_use structure
-                        tool_use_data = content_item.get('tool_use', {})
-                        tool_type = tool_use_data.get('type', '')
-                        
-                        # Map the internal tool type to our friendly names
-                        tool_name_map = {
-                            'cortex_search': 'Faq Search',
-                            'cortex_analyst_text_to_sql': 'Sales Analyst'
-                        }
-                        
-                        tool_name = tool_name_map.get(tool_type, tool_type or 'Unknown')
-                        tools_called.append(tool_name)
-                        if debug_mode:
-                            st.info(f"🔧 Calling tool: {tool_name} (type: {tool_type})")
-                            # Debug: show the full content_item structure
-                            st.write("Debug - Tool use content:", content_item)
-                    
-                    if content_type == "tool_results":
-                        tool_results = content_item.get('tool_results', {})
-                        if 'content' in tool_results:
-                            for result in tool_results['content']:
-                                if result.get('type') == 'json':
-                                    json_data = result.get('json', {})
-                                    
-                                    # Accumulate text from tool results
-                                    result_text = json_data.get('text', '')
-                                    if result_text:
-                                        text += result_text
-                                    
-                                    # Process search results and citations
-                                    search_results = json_data.get('searchResults', [])
-                                    for search_result in search_results:
-                                        citations.append({'source_id': search_result.get('source_id', ''), 
-                                                          'doc_title': search_result.get('doc_title', ''),
-                                                          'doc_chunk': search_result.get('doc_id')})
-                                    
-                                    # Accumulate SQL queries (keep the last non-empty one)
-                                    result_sql = json_data.get('sql', '')
-                                    if result_sql:
-                                        sql = result_sql
-                                        if debug_mode:
-                                            st.success(f"✅ SQL query generated by Sales Analyst")
-                    
-                    if content_type == 'text':
-                        text += content_item.get('text', '')
-        
-        # Debug information
-        if debug_mode:
-            if tools_called:
-                st.info(f"📊 Tools used in this response: {', '.join(set(tools_called))}")
-                
-                # Validate that expected tools were called
-                unique_tools = set(tools_called)
-                if 'Faq Search' in unique_tools and 'Sales Analyst' not in unique_tools:
-                    st.warning("⚠️ Warning: Only Faq Search was called. If the query included data questions, Sales Analyst should have been called too.")
-                elif 'Sales Analyst' in unique_tools and 'Faq Search' not in unique_tools:
-                    st.info("ℹ️ Only Sales Analyst was called (data query)")
-                elif 'Faq Search' in unique_tools and 'Sales Analyst' in unique_tools:
-                    st.success("✅ Both tools were called successfully!")
-            else:
-                st.warning("⚠️ No tools were called for this query")
-                            
-    except json.JSONDecodeError as e:
-        st.error(f"Error processing events: {str(e)}")
-                
-    except Exception as e:
-        st.error(f"Error processing events: {str(e)}")
+    # Debug information
+    if debug_mode:
+        unique_tools = set(result.tools_called)
+        if not unique_tools:
+            st.warning("⚠️ No tools were called for this query")
+        elif client.SEARCH_TOOL in unique_tools and client.ANALYST_TOOL not in unique_tools:
+            st.warning("⚠️ Warning: Only Faq Search was called. If the query included data questions, Sales Analyst should have been called too.")
         
-    return text, sql, citations
+    return result.text, result.sql, result.citations
 
 def display_citations(citations):
 
-    for citation in citations:
+    for citation in hydrate_citations(citations):
         source_id = citation.get("source_id", "")
-        doc_title = citation.get("doc_title", "")
-        doc_chunk = citation.get("doc_chunk", "")
-    
-        if (doc_title.lower().endswith("jpeg")):
-            query = f"SELECT GET_PRESIGNED_URL('@DOCS', '{doc_title}') as URL"
-            result = run_snowflake_query(query)
-            result_df = result.to_pandas()
-            if not result_df.empty:
-                url = result_df.iloc[0, 0]
-            else:
-                url = "No URL available"
     
+        if citation["kind"] == "image":
             with st.expander(f"[{source_id}]"):
-                st.image(url)
-
-        if (doc_title.lower().endswith("pdf")):
-            query = f"""
-                    SELECT CHUNK from DOCS_CHUNKS_TABLE
-                    WHERE RELATIVE_PATH = '{doc_title}' AND
-                          CHUNK_INDEX = {doc_chunk}
-            """
-            result = run_snowflake_query(query)
-            result_df = result.to_pandas()
-            if not result_df.empty:
-                text = result_df.iloc[0, 0]
-            else:
-                text = "No text available"
+                st.image(citation["content"])
 
+        if citation["kind"] == "text":
             with st.expander(f"[{source_id}]"):
                 with stylable_container(
                         f"[{source_id}]",
@@ -276,7 +134,7 @@ def display_citations(citations):
                         }
                         """
                     ):
-                    st.markdown(text)
+                    st.markdown(citation["content"])
 
 def main():
     st.title("Intelligent Sales Assistant")
@@ -335,7 +193,7 @@ def main():
         with st.spinner("Processing your request..."):
             selected_model = st.session_state.get('selected_model', 'claude-sonnet-4-5')
             response = snowflake_api_call(query, model=selected_model)
-            text, sql, citations = process_sse_response(response, st.session_state.get('debug_mode', True))
+            text, sql, citations = process_sse_response(response, st.session_state.get('debug_mode', True), query=query)
             
             # Add assistant response to chat
             if text:
@@ -353,7 +211,7 @@ def main():
                 st.markdown("### Generated SQL")
                 st.code(sql, language="sql")
                 sales_results = run_snowflake_query(sql)
-                if sales_results:
+                if sales_results is not None:
                     st.write("### Sales Metrics Report")
                     st.dataframe(sales_results)
 
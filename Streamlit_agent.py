@@ -1,357 +1,251 @@
 import streamlit as st
 import json
-import _snowflake
-from snowflake.snowpark.context import get_active_session
+import time
+import uuid
+from contextlib import contextmanager
 from streamlit_extras.stylable_container import stylable_container
-from typing import Optional, Tuple, Dict, List, Any
-import os
-
-session = get_active_session()
-
-# Pre-configured Cortex Agent endpoint
-AGENT_NAME = "CORTEX_SALES_AGENT"
-AGENT_DATABASE = "SNOWFLAKE_INTELLIGENCE"
-AGENT_SCHEMA = "AGENTS"
-API_ENDPOINT = f"/api/v2/databases/{AGENT_DATABASE.lower()}/schemas/{AGENT_SCHEMA.lower()}/agents/{AGENT_NAME}:run"
-THREAD_ENDPOINT = "/api/v2/cortex/threads"
-AGENT_CONFIG_FILE = "CORTEX_AGENT_SALES.json"
-API_TIMEOUT = 50000  # in milliseconds
-
-def check_agent_exists() -> bool:
-    """Check if the Cortex Agent exists in Snowflake."""
-    try:
-        # Use REST API to check agent existence
-        agent_endpoint = f"/api/v2/databases/{AGENT_DATABASE.lower()}/schemas/{AGENT_SCHEMA.lower()}/agents/{AGENT_NAME}"
-        
-        resp = _snowflake.send_snow_api_request(
-            "GET",
-            agent_endpoint,
-            {},
-            {},
-            {},
-            None,
-            API_TIMEOUT,
-        )
-        
-        return resp["status"] == 200
-    except Exception as e:
-        return False
+from sales_assistant import agent
+from sales_assistant.admission import AdmissionRejected, acting_as
+from sales_assistant.client import API_TIMEOUT, AgentApiError
+from sales_assistant.deadline import Cancelled, Deadline, DeadlineExceeded, within
+from sales_assistant.hydrate import hydrate_citations
+from sales_assistant.querylog import agent_record, log_query
+from sales_assistant.results import AgentResult, Notice
+from sales_assistant.session import get_session_pool, run_sql
+from sales_assistant.sse import parse_agent_response
+from sales_assistant.statements import statement_stats
+from sales_assistant.threads import ConversationThread, get_thread_store, open_thread
+from typing import List, Optional
 
-def load_agent_config() -> Optional[Dict]:
-    """Load agent configuration from JSON file."""
+# UI only: agent management, SSE parsing and citation lookups live in sales_assistant
+
+def show_notices(notices: List[Notice], debug_mode: bool):
+    """Render core notices; debug ones only in debug mode"""
+    for notice in notices:
+        if debug_mode or not notice.debug:
+            getattr(st, notice.level)(notice.message)
+
+def sync_agent_spec() -> bool:
+    """Create or update the Cortex Agent when the JSON config changed (once per process)."""
     try:
-        # Get the directory of the current script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(script_dir, AGENT_CONFIG_FILE)
-        
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-            return config.get('data', {}).get('agent_spec', {})
+        sync = agent.sync_agent()
     except FileNotFoundError:
-        st.error(f"❌ Configuration file '{AGENT_CONFIG_FILE}' not found.")
-        return None
+        st.error(f"❌ Configuration file '{agent.AGENT_CONFIG_FILE}' not found.")
+        return False
     except json.JSONDecodeError:
-        st.error(f"❌ Invalid JSON in configuration file '{AGENT_CONFIG_FILE}'.")
-        return None
-    except Exception as e:
-        st.error(f"❌ Error loading configuration: {str(e)}")
-        return None
-
-def create_agent() -> bool:
-    """Create the Cortex Agent if it doesn't exist."""
-    try:
-        st.info("🔧 Agent not found. Creating agent...")
-        
-        # Load agent configuration (returns the agent_spec object)
-        agent_spec = load_agent_config()
-        if not agent_spec:
-            st.error("❌ Failed to load agent configuration.")
-            return False
-        
-        # Prepare the creation endpoint
-        create_endpoint = f"/api/v2/databases/{AGENT_DATABASE.lower()}/schemas/{AGENT_SCHEMA.lower()}/agents"
-        
-        # Prepare payload - agent_spec needs to be a JSON string for the API
-        # The structure should be: {"name": "...", "agent_spec": "<json_string>"}
-        payload = {
-            "name": AGENT_NAME,
-            "agent_spec": json.dumps(agent_spec)  # Convert the spec object to JSON string
-        }
-        
-        # Debug: Show what we're sending
-        if st.session_state.get('debug_mode', False):
-            st.info(f"Creating agent at: {create_endpoint}")
-            with st.expander("📤 Creation Payload", expanded=False):
-                st.json(payload)
-        
-        # Create the agent via REST API
-        resp = _snowflake.send_snow_api_request(
-            "POST",
-            create_endpoint,
-            {},
-            {},
-            payload,
-            None,
-            API_TIMEOUT,
-        )
-        
-        if resp["status"] == 200 or resp["status"] == 201:
-            st.success(f"✅ Agent '{AGENT_NAME}' created successfully!")
-            return True
-        else:
-            st.error(f"❌ Failed to create agent. Status: {resp['status']}")
-            if resp.get('content'):
-                try:
-                    error_data = json.loads(resp['content'])
-                    st.error(f"Error details: {json.dumps(error_data, indent=2)}")
-                except:
-                    st.error(f"Response: {resp['content']}")
-            return False
-            
+        st.error(f"❌ Invalid JSON in configuration file '{agent.AGENT_CONFIG_FILE}'.")
+        return False
+    except ValueError:
+        st.error("❌ Failed to load agent configuration.")
+        return False
+    except AgentApiError as e:
+        st.error(f"❌ Failed to sync agent. {e}")
+        if e.response and e.response.get('content'):
+            st.error(f"Response: {e.response['content']}")
+        return False
     except Exception as e:
-        st.error(f"❌ Error creating agent: {str(e)}")
-        import traceback
-        st.error(f"Traceback: {traceback.format_exc()}")
+        st.error(f"❌ Error syncing agent: {str(e)}")
         return False
 
-def ensure_agent_exists() -> bool:
-    """Ensure the agent exists, create it if it doesn't."""
-    if not check_agent_exists():
-        return create_agent()
+    # Debug: Show what was sent
+    if st.session_state.get('debug_mode', False) and sync.payload:
+        st.info(f"Agent {sync.action} at: {agent.AGENTS_ENDPOINT}")
+        with st.expander("📤 Agent Payload", expanded=False):
+            st.json(sync.payload)
+    if sync.action != "unchanged":
+        st.success(f"✅ Agent '{agent.AGENT_NAME}' {sync.action} successfully!")
     return True
 
 def create_thread():
     """Create a new thread for maintaining conversation context."""
     try:
-        resp = _snowflake.send_snow_api_request(
-            "POST",
-            THREAD_ENDPOINT,
-            {},
-            {},
-            {"origin_application": "streamlit_sales_assistant"},
-            None,
-            API_TIMEOUT,
-        )
-        
-        if resp["status"] == 200:
-            thread_data = json.loads(resp["content"])
-            return thread_data.get('thread_id')
-        return None
+        return agent.create_thread()
     except Exception as e:
         st.warning(f"Could not create thread: {str(e)}")
         return None
 
+def signed_in_user():
+    """Snowflake user name when Streamlit knows it, else None"""
+    try:
+        return st.experimental_user.get("user_name") or st.experimental_user.get("email") or None
+    except Exception:
+        return None
+
+def current_user_id() -> str:
+    """Snowflake user name when Streamlit knows it, otherwise one id per browser session (never put in the URL)"""
+    user = signed_in_user()
+    if not user:
+        if 'anonymous_user_id' not in st.session_state:
+            st.session_state.anonymous_user_id = uuid.uuid4().hex
+        user = st.session_state.anonymous_user_id
+    return user
+
+def current_tab_id() -> str:
+    """One id per browser tab, so a user's tabs keep separate threads
+
+    Signed-in users keep it in the URL so a refresh resumes the tab's thread; threads are keyed
+    by user and tab, so a shared link resumes nothing for anyone else. Anonymous users have no
+    identity to check it against, so theirs lives only as long as the browser session.
+    """
+    if 'tab_id' not in st.session_state:
+        tab = None
+        if signed_in_user():
+            try:
+                tab = st.query_params.get("tab")
+                if not tab:
+                    tab = st.query_params["tab"] = uuid.uuid4().hex
+            except Exception:
+                tab = None
+        st.session_state.tab_id = tab or uuid.uuid4().hex
+    return st.session_state.tab_id
+
+def thread_store():
+    """The host-wide (user, tab) -> thread store, or None if its file cannot be opened"""
+    try:
+        return get_thread_store()
+    except Exception:
+        return None
+
+def start_or_resume_thread():
+    """Resume the tab's thread after a refresh or reconnect, otherwise create one"""
+    store = thread_store()
+    if store is None:
+        st.session_state.thread_id = create_thread()
+        return
+    try:
+        thread = open_thread(store, current_user_id(), current_tab_id(), create_thread, agent.delete_thread)
+    except Exception:
+        thread = None
+        st.session_state.thread_id = create_thread()
+    if thread is None:
+        return
+    st.session_state.thread_id = thread.thread_id
+    st.session_state.parent_message_id = thread.parent_message_id
+    if thread.resumed and not st.session_state.messages:
+        st.session_state.messages = thread.messages
+    if st.session_state.get('debug_mode', False):
+        st.success(f"✅ Thread {'resumed' if thread.resumed else 'created'}: {thread.thread_id}")
+
+def save_thread_turn():
+    """Persist the thread position and transcript so a reconnect picks up here"""
+    store = thread_store()
+    if store is None or not st.session_state.get('thread_id'):
+        return
+    try:
+        store.record_turn(current_user_id(), current_tab_id(), ConversationThread(
+            st.session_state.thread_id, st.session_state.parent_message_id, st.session_state.messages,
+        ))
+    except Exception:
+        pass
+
+def end_thread():
+    """New Conversation: forget the tab's thread and delete it server-side"""
+    store = thread_store()
+    try:
+        thread_id = store.forget(current_user_id(), current_tab_id()) if store is not None else st.session_state.get('thread_id')
+        if thread_id:
+            agent.delete_thread(thread_id)
+    except Exception:
+        pass
+
+@contextmanager
+def queue_feedback():
+    """on_wait callback that shows the user's place in the agent queue until admitted"""
+    placeholder = st.empty()
+
+    def on_wait(position: int):
+        placeholder.info(f"⏳ The assistant is busy: you're #{position} in line...")
+
+    try:
+        yield on_wait
+    finally:
+        placeholder.empty()
+
+@contextmanager
+def question_deadline(budget_ms: float):
+    """Cancel the session's unfinished question and bound this one; a rerun interrupts its waits"""
+    cancel_question()
+    heartbeat = st.empty()
+    deadline = Deadline(budget_ms, heartbeat=heartbeat.empty)
+    st.session_state.active_deadline = deadline
+    try:
+        with within(deadline):
+            yield deadline
+    except Cancelled:
+        # Hand Streamlit back its own rerun/stop signal; otherwise just drop the answer
+        if deadline.interrupt is not None:
+            raise deadline.interrupt
+        st.stop()
+
+def cancel_question():
+    deadline = st.session_state.get('active_deadline')
+    if deadline is not None:
+        deadline.cancel()
+        st.session_state.active_deadline = None
+
 def run_snowflake_query(query):
+    """Execute SQL and return the result as an Arrow table (None on failure)"""
     try:
-        df = session.sql(query.replace(';',''))
-        
-        return df
+        return run_sql(query)
 
     except Exception as e:
         st.error(f"Error executing SQL: {str(e)}")
-        return None, None
+        return None
 
-def snowflake_api_call(query: str, model: str = "claude-sonnet-4-5", thread_id: Optional[int] = None, parent_message_id: Optional[int] = None):
-    """
-    Call pre-configured Cortex Agent with optional thread support.
-    
-    Args:
-        query: User query text
-        model: LLM model to use for orchestration
-        thread_id: Optional thread ID for maintaining conversation context
-        parent_message_id: Optional parent message ID for threading
-    
-    The agent has tools pre-configured in Snowflake, so we don't need to pass
-    tools, tool_resources, or tool_choice parameters.
+def snowflake_api_call(query: str, model: str = "claude-sonnet-4-5", thread_id: Optional[int] = None, parent_message_id: Optional[int] = None,
+                       timings: Optional[dict] = None):
+    """Call the pre-configured Cortex Agent with optional thread support; None on failure
+
+    timings gets admitted_at and service_ms of the agent call (see agent.run).
     """
-    
-    # Build payload with thread support
-    payload = {
-        "model": model,
-        "messages": [{"role": "user",
-                      "content": [{"type": "text", "text": query}]}]
-    }
-    
-    # Add thread parameters if provided
-    if thread_id is not None and parent_message_id is not None:
-        payload["thread_id"] = thread_id
-        payload["parent_message_id"] = parent_message_id
-     
-    try:
-        resp = _snowflake.send_snow_api_request(
-            "POST",
-            API_ENDPOINT,
-            {},
-            {'stream': True},
-            payload,
-            None,
-            API_TIMEOUT,
-        )
-        
-        if resp["status"] != 200:
-            st.error(f"❌ HTTP Error: {resp['status']} - {resp.get('reason', 'Unknown reason')}")
-            if st.session_state.get('debug_mode', False):
-                st.error(f"Response details: {resp}")
-            return None
-        
+    # A new question or a reset cancels this one (outside the try: its signals must reach Streamlit)
+    with question_deadline(API_TIMEOUT):
         try:
-            response_content = json.loads(resp["content"])
-            
-            # Debug: Show the actual response structure
+            # Agent calls are admitted per user and queued fairly when the app is busy
+            with queue_feedback() as on_wait, acting_as(current_user_id(), on_wait):
+                response_content = agent.run(query, model, thread_id, parent_message_id, timings)
+        except Cancelled:
+            raise
+        except (AdmissionRejected, DeadlineExceeded) as e:
+            st.warning(str(e))
+            return None
+        except AgentApiError as e:
+            st.error(f"❌ {e}")
             if st.session_state.get('debug_mode', False):
-                with st.expander("📋 Raw API Response", expanded=False):
-                    st.json(response_content)
-                    
-        except json.JSONDecodeError:
-            st.error("❌ Failed to parse API response.")
+                st.error(f"Response details: {e.response}")
+            return None
+        except Exception as e:
+            st.error(f"Error making request: {str(e)}")
             return None
 
-        return response_content
-            
-    except Exception as e:
-        st.error(f"Error making request: {str(e)}")
-        return None
+    # Debug: Show the actual response structure
+    if st.session_state.get('debug_mode', False):
+        with st.expander("📋 Raw API Response", expanded=False):
+            st.json(response_content)
+    return response_content
 
-def process_sse_response(response, debug_mode=False):
-    """
-    Process SSE response from pre-configured Cortex Agent.
-    
-    Extracts text, SQL, citations, and tracks metadata from the agent response.
-    Returns tuple of (text, sql, citations, metadata)
-    """
-    text = ""
-    sql = ""
-    citations = []
-    tools_called = []
-    metadata = {}
-    
-    if not response:
-        return text, sql, citations, metadata
-    if isinstance(response, str):
-        return text, sql, citations, metadata
-    
-    event_count = 0
-    
-    try:
-        for event in response:
-            event_count += 1
-            
-            if debug_mode:
-                with st.expander(f"🔍 Event #{event_count}: {event.get('event', 'unknown')}", expanded=False):
-                    st.json(event)
-            
-            # Extract metadata for threading
-            if event.get('event') == "metadata":
-                metadata = event.get('data', {})
-                if debug_mode:
-                    st.info(f"📨 Metadata: message_id={metadata.get('message_id')}, role={metadata.get('role')}")
-            
-            # Pre-configured agents use "response" event
-            if event.get('event') == "response":
-                data = event.get('data', {})
-                content_items = data.get('content', [])
-                
-                for content_item in content_items:
-                    content_type = content_item.get('type')
-                    
-                    # Track tool usage
-                    if content_type == "tool_use":
-                        tool_use_data = content_item.get('tool_use', {})
-                        tool_type = tool_use_data.get('type', '')
-                        tool_name = tool_use_data.get('name', tool_type)
-                        
-                        tools_called.append(tool_name)
-                        
-                        if debug_mode:
-                            st.info(f"🔧 Tool called: {tool_name}")
-                    
-                    # Extract text from response
-                    if content_type == "text":
-                        text += content_item.get('text', '')
-                        
-                        # Process annotations for citations
-                        annotations = content_item.get('annotations', [])
-                        for annotation in annotations:
-                            if annotation.get('type') == 'cortex_search_citation':
-                                citations.append({
-                                    'source_id': annotation.get('index', 0),
-                                    'doc_title': annotation.get('doc_title', ''),
-                                    'doc_chunk': annotation.get('doc_id', '')
-                                })
-                    
-                    # Process tool results for SQL and search results
-                    if content_type == "tool_result":
-                        tool_result = content_item.get('tool_result', {})
-                        tool_content = tool_result.get('content', [])
-                        
-                        for result in tool_content:
-                            if result.get('type') == 'json':
-                                json_data = result.get('json', {})
-                                
-                                # Extract SQL if present
-                                result_sql = json_data.get('sql', '')
-                                if result_sql:
-                                    sql = result_sql
-                                
-                                # Extract search results for citations
-                                search_results = json_data.get('search_results', [])
-                                for search_result in search_results:
-                                    citations.append({
-                                        'source_id': search_result.get('source_id', 0),
-                                        'doc_title': search_result.get('doc_title', ''),
-                                        'doc_chunk': search_result.get('doc_id', '')
-                                    })
-        
-        # Show tool usage summary in debug mode
-        if debug_mode:
-            st.info(f"📊 Processed {event_count} events")
-            if tools_called:
-                unique_tools = set(tools_called)
-                if len(unique_tools) > 1:
-                    st.success(f"✅ Multiple tools used: {', '.join(unique_tools)}")
-                else:
-                    st.info(f"📊 Tool used: {', '.join(unique_tools)}")
-                            
-    except json.JSONDecodeError as e:
-        st.error(f"Error processing events: {str(e)}")
-                
-    except Exception as e:
-        st.error(f"Error processing events: {str(e)}")
-        
-    return text, sql, citations, metadata
+def process_sse_response(response, debug_mode=False, query: Optional[str] = None) -> AgentResult:
+    """Parse the agent's events and render its notices (and each raw event in debug mode)"""
+    if debug_mode and isinstance(response, list):
+        for event_count, event in enumerate(response, start=1):
+            with st.expander(f"🔍 Event #{event_count}: {event.get('event', 'unknown')}", expanded=False):
+                st.json(event)
+
+    result = parse_agent_response(response, query=query)
+    show_notices(result.notices, debug_mode)
+    return result
 
 def display_citations(citations):
 
-    for citation in citations:
+    # One entry per (doc_title, doc_chunk), highest confidence first
+    for citation in hydrate_citations(citations):
         source_id = citation.get("source_id", "")
-        doc_title = citation.get("doc_title", "")
-        doc_chunk = citation.get("doc_chunk", "")
-    
-        if (doc_title.lower().endswith("jpeg")):
-            query = f"SELECT GET_PRESIGNED_URL('@DOCS', '{doc_title}') as URL"
-            result = run_snowflake_query(query)
-            result_df = result.to_pandas()
-            if not result_df.empty:
-                url = result_df.iloc[0, 0]
-            else:
-                url = "No URL available"
     
+        if citation["kind"] == "image":
             with st.expander(f"[{source_id}]"):
-                st.image(url)
-
-        if (doc_title.lower().endswith("pdf")):
-            query = f"""
-                    SELECT CHUNK from DOCS_CHUNKS_TABLE
-                    WHERE RELATIVE_PATH = '{doc_title}' AND
-                          CHUNK_INDEX = {doc_chunk}
-            """
-            result = run_snowflake_query(query)
-            result_df = result.to_pandas()
-            if not result_df.empty:
-                text = result_df.iloc[0, 0]
-            else:
-                text = "No text available"
+                st.image(citation["content"])
 
+        if citation["kind"] == "text":
             with st.expander(f"[{source_id}]"):
                 with stylable_container(
                         f"[{source_id}]",
@@ -365,7 +259,7 @@ def display_citations(citations):
                         }
                         """
                     ):
-                    st.markdown(text)
+                    st.markdown(citation["content"])
 
 def main():
     st.title("Intelligent Sales Assistant")
@@ -373,7 +267,7 @@ def main():
     # Ensure agent exists before proceeding
     if 'agent_checked' not in st.session_state:
         with st.spinner("Checking agent status..."):
-            if not ensure_agent_exists():
+            if not sync_agent_spec():
                 st.error("❌ Failed to initialize agent. Please check your configuration and try again.")
                 st.stop()
             st.session_state.agent_checked = True
@@ -386,6 +280,8 @@ def main():
     with st.sidebar:
         st.markdown("### Controls")
         if st.button("New Conversation", key="new_chat"):
+            cancel_question()
+            end_thread()
             st.session_state.messages = []
             st.session_state.thread_id = None
             st.session_state.parent_message_id = 0
@@ -423,6 +319,13 @@ def main():
         if use_threads:
             thread_status = "✅ Active" if st.session_state.get('thread_id') else "⏳ Starting"
             st.caption(f"Thread: {thread_status}")
+            if debug_mode and thread_store() is not None:
+                st.caption(f"thread reuse: {thread_store().snapshot()}")
+            if debug_mode:
+                st.caption(f"lookup statements: {statement_stats() or 'none run yet'}")
+                st.caption(f"session pool: {get_session_pool().snapshot()}")
+                sync = agent.sync_agent()
+                st.caption(f"agent spec {sync.spec_hash}: {sync.action} ({sync.elapsed_ms:.0f} ms)")
         
     # Store settings in session state
     st.session_state.debug_mode = debug_mode
@@ -437,14 +340,10 @@ def main():
     if 'parent_message_id' not in st.session_state:
         st.session_state.parent_message_id = 0
 
-    # Create thread if enabled and not exists
+    # Resume the tab's thread (e.g. after a browser refresh) or create one
     if use_threads and st.session_state.thread_id is None:
         with st.spinner("Initializing conversation thread..."):
-            thread_id = create_thread()
-            if thread_id:
-                st.session_state.thread_id = thread_id
-                if debug_mode:
-                    st.success(f"✅ Thread created: {thread_id}")
+            start_or_resume_thread()
 
     for message in st.session_state.messages:
         with st.chat_message(message['role']):
@@ -465,14 +364,26 @@ def main():
             thread_id = st.session_state.thread_id if use_threads else None
             parent_msg_id = st.session_state.parent_message_id if use_threads else None
             
+            started = time.perf_counter()
+            call = {}
             response = snowflake_api_call(
                 query, 
                 model=selected_model,
                 thread_id=thread_id,
-                parent_message_id=parent_msg_id
+                parent_message_id=parent_msg_id,
+                timings=call
             )
+            returned = time.perf_counter()
             
-            text, sql, citations, metadata = process_sse_response(response, debug_mode)
+            result = process_sse_response(response, debug_mode, query=query)
+            finished = time.perf_counter()
+            stages = {"agent": (returned - started) * 1000, "parse": (finished - returned) * 1000}
+            if "admitted_at" in call:
+                # Admission queue apart from the agent's own time (a shared in-flight call has neither)
+                stages["queue"] = (call["admitted_at"] - started) * 1000
+                stages["agent"] = call["service_ms"]
+            log_query(agent_record("agent", query, selected_model, result, (finished - started) * 1000, stages))
+            text, sql, citations, metadata = result.text, result.sql, result.citations, result.metadata
             
             # Update parent_message_id for next turn
             if use_threads and metadata.get('message_id'):
@@ -491,6 +402,8 @@ def main():
                     st.markdown(text.replace("•", "\n\n"))
                     if citations:
                         display_citations(citations)
+                if use_threads:
+                    save_thread_turn()
             else:
                 st.warning("⚠️ No response text generated.")
     
@@ -499,8 +412,9 @@ def main():
                 st.markdown("### Generated SQL")
                 st.code(sql, language="sql")
                 sales_results = run_snowflake_query(sql)
-                if sales_results:
+                if sales_results is not None:
                     st.write("### Sales Metrics Report")
+                    # Arrow table goes to the frontend as-is, no pandas conversion
                     st.dataframe(sales_results)
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+"""
+Arrow-native result path for warehouse queries
+Fetches Snowflake results as Arrow record batches and hands them to Streamlit
+without going through pandas object columns
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Low-cardinality string columns from the sales schema that are always dictionary-encoded
+DICTIONARY_COLUMNS = {"REGION", "CHANNEL", "ORDER_STATUS", "CATEGORY", "VARIANT", "SUPPLIER_ID"}
+
+# Other string columns are encoded when distinct values make up at most this share of rows
+DICTIONARY_MAX_RATIO = 0.5
+
+# Connector type codes (ResultMetadata.type_code) of an empty result's columns; others read as strings
+EMPTY_COLUMN_TYPES = {
+    1: pa.float64(),  # REAL
+    3: pa.date32(),  # DATE
+    4: pa.timestamp("ns"),  # TIMESTAMP
+    6: pa.timestamp("ns", tz="UTC"),  # TIMESTAMP_LTZ
+    7: pa.timestamp("ns", tz="UTC"),  # TIMESTAMP_TZ
+    8: pa.timestamp("ns"),  # TIMESTAMP_NTZ
+    11: pa.binary(),  # BINARY
+    12: pa.time64("ns"),  # TIME
+    13: pa.bool_(),  # BOOLEAN
+}
+
+
+def fetch_arrow_batches(session, query: str, params: Optional[Sequence] = None) -> Iterator[pa.Table]:
+    """Yield result batches as Arrow tables, straight from the connector's Arrow result format"""
+    df = session.sql(query, params=params) if params else session.sql(query)
+
+    # Newer Snowpark releases expose Arrow batches on the DataFrame itself
+    to_arrow_batches = getattr(df, "to_arrow_batches", None)
+    if to_arrow_batches is not None:
+        yield from to_arrow_batches()
+        return
+
+    # Otherwise go through the underlying connector cursor
+    cursor = session.connection.cursor()
+    try:
+        cursor.execute(query, params)
+        yield from cursor.fetch_arrow_batches()
+    finally:
+        cursor.close()
+
+
+def empty_result(session, query: str, params: Optional[Sequence] = None) -> pa.Table:
+    """Zero-row table with the query's columns, so an empty result still shows its headers"""
+    try:
+        cursor = session.connection.cursor()
+        try:
+            # describe() compiles the statement and returns its columns without running it
+            columns = cursor.describe(query, params) or []
+        finally:
+            cursor.close()
+    except Exception:
+        return pa.table({})  # headers are a nicety; the query itself already succeeded
+    fields = []
+    for column in columns:
+        if column.type_code == 0:  # FIXED: NUMBER(p, 0) is an integer
+            type_ = pa.int64() if not column.scale else pa.float64()
+        else:
+            type_ = EMPTY_COLUMN_TYPES.get(column.type_code, pa.string())
+        fields.append(pa.field(column.name, type_))
+    return pa.schema(fields).empty_table()
+
+
+def concat_batches(batches) -> pa.Table:
+    """One table from batches whose types may differ (a column all NULL in one batch reads as null there)"""
+    try:
+        return pa.concat_tables(batches, promote_options="default")
+    except TypeError:  # pyarrow before 14
+        return pa.concat_tables(batches, promote=True)
+
+
+def dictionary_encode_strings(table: pa.Table, columns: Optional[set] = None) -> pa.Table:
+    """Dictionary-encode known categorical columns and other low-cardinality string columns"""
+    columns = DICTIONARY_COLUMNS if columns is None else columns
+    num_rows = table.num_rows
+    if num_rows == 0:
+        return table
+
+    for i, field in enumerate(table.schema):
+        if not (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            continue
+
+        column = table.column(i)
+        if field.name.upper() not in columns:
+            if pc.count_distinct(column).as_py() > num_rows * DICTIONARY_MAX_RATIO:
+                continue
+
+        table = table.set_column(i, field.name, column.dictionary_encode())
+
+    # Chunks were encoded independently; give them one shared dictionary per column
+    return table.unify_dictionaries()
+
+
+def fetch_arrow_table(session, query: str, params: Optional[Sequence] = None, encode: bool = True) -> pa.Table:
+    """Run a query and return one Arrow table assembled zero-copy from its record batches"""
+    query = query.rstrip().rstrip(';')  # only the trailing terminator: ';' inside literals is data
+    batches = list(fetch_arrow_batches(session, query, params))
+    if not batches or all(batch.num_rows == 0 and batch.num_columns == 0 for batch in batches):
+        return empty_result(session, query, params)
+
+    # concat_tables only stitches chunk lists together; buffers are copied only for promoted columns
+    table = concat_batches(batches)
+    return dictionary_encode_strings(table) if encode else table
+
+
+def fetch_arrow_tables(session, queries: Dict[str, str], max_workers: int = 8) -> Dict[str, pa.Table]:
+    """Run a batch of named queries concurrently; the warehouse executes them side by side"""
+    if not queries:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as pool:
+        futures = {name: pool.submit(fetch_arrow_table, session, query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def fetch_arrow_scalar(session, query: str, params: Optional[Sequence] = None, default=None):
+    """Return the first column of the first row, e.g. a citation CHUNK or presigned URL"""
+    table = fetch_arrow_table(session, query, params, encode=False)
+    if table.num_rows == 0 or table.num_columns == 0:
+        return default
+    return table.column(0)[0].as_py()
@@ -0,0 +1,150 @@
+"""
+Headless batch question answering
+Runs a JSONL file of questions through the same routing as the Streamlit app
+(sales_assistant.router.answer_query) on a bounded thread pool and writes answers,
+SQL, citations and per-stage timings.
+
+Input lines: {"id": "...", "question": "..."}  ("query" is accepted for "question", id defaults to the line number)
+Output: JSONL, or Parquet when the output path ends in .parquet
+
+Usage: python batch_qa.py --connection NAME --input questions.jsonl [--output answers.jsonl]
+                          [--concurrency 8] [--model claude-sonnet-4-5] [--no-local-index]
+                          [--no-model-routing]
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List
+
+from sales_assistant import admission, router, session as core_session
+from sales_assistant.results import Answer
+
+DEFAULT_CONCURRENCY = 8
+STAGES = ("intent", "faq", "local_index", "search", "analyst", "agent")
+
+
+def read_questions(path: str) -> Iterator[Dict]:
+    with open(path, "r") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield {
+                "id": str(record.get("id", line_no)),
+                "question": record.get("question") or record.get("query", ""),
+            }
+
+
+def answer_one(item: Dict, model: str, use_local_index: bool, route_models: bool = True) -> Dict:
+    started = time.perf_counter()
+    error = None
+    answer = Answer()
+    try:
+        answer = router.answer_query(item["question"], model=model, use_local_index=use_local_index,
+                                     route_models=route_models)
+        errors = [n.message for n in answer.notices if n.level == "error"]
+        error = "; ".join(errors) or None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    row = {
+        "id": item["id"],
+        "question": item["question"],
+        "route": answer.route,
+        "answer": answer.text,
+        "sql": answer.sql,
+        "citations": json.dumps([
+            {key: c.get(key) for key in ("source_id", "doc_title", "doc_chunk", "score")} for c in answer.citations
+        ]),
+        "models": json.dumps(answer.models),
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "error": error,
+    }
+    for stage in STAGES:
+        row[f"{stage}_ms"] = round(answer.timings_ms.get(stage, 0.0), 1)
+    return row
+
+
+def run_batch(questions: List[Dict], model: str, concurrency: int = DEFAULT_CONCURRENCY,
+              use_local_index: bool = True, route_models: bool = True) -> Iterator[Dict]:
+    """Answer questions concurrently; rows are yielded in completion order"""
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        futures = [pool.submit(answer_one, item, model, use_local_index, route_models) for item in questions]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def write_rows(rows: Iterator[Dict], output_path: str) -> List[Dict]:
+    """Stream rows to JSONL as they complete, or collect them into one Parquet file"""
+    written = []
+    if output_path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        written = list(rows)
+        pq.write_table(pa.Table.from_pylist(written), output_path)
+        return written
+
+    with open(output_path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+            f.flush()
+            written.append(row)
+    return written
+
+
+def summarize(rows: List[Dict], elapsed: float) -> Dict:
+    routes: Dict[str, int] = {}
+    for row in rows:
+        routes[row["route"] or "error"] = routes.get(row["route"] or "error", 0) + 1
+    latencies = sorted(row["total_ms"] for row in rows) or [0.0]
+    return {
+        "questions": len(rows),
+        "errors": sum(1 for row in rows if row["error"]),
+        "routes": routes,
+        "elapsed_s": round(elapsed, 1),
+        "questions_per_min": round(len(rows) / elapsed * 60, 1) if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connection", required=True, help="Snowflake connection name")
+    parser.add_argument("--input", required=True, help="JSONL file of questions")
+    parser.add_argument("--output", default="answers.jsonl", help=".jsonl or .parquet")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Questions in flight at once")
+    parser.add_argument("--model", default="claude-sonnet-4-5", help="Most capable model any call may use")
+    parser.add_argument("--no-local-index", action="store_true", help="Always send search-only questions to the agent")
+    parser.add_argument("--no-model-routing", action="store_true", help="Use --model for every call")
+    args = parser.parse_args()
+
+    from snowflake.snowpark import Session
+
+    session = Session.builder.config("connection_name", args.connection).create()
+    try:
+        core_session.configure(session)
+        # Generated SQL and citation lookups get sessions of their own, one per question in flight
+        core_session.configure_pool(size=args.concurrency, factory=core_session.connection_factory(args.connection))
+        # One caller, already bounded by --concurrency: no per-user limit and never shed
+        admission.configure(max_in_flight=args.concurrency, user_rate=None, max_queue=1 << 20, max_wait=float("inf"))
+        questions = list(read_questions(args.input))
+        started = time.perf_counter()
+        rows = write_rows(
+            run_batch(questions, args.model, args.concurrency, not args.no_local_index, not args.no_model_routing),
+            args.output,
+        )
+        summary = summarize(rows, time.perf_counter() - started)
+        summary["speculation"] = router.get_speculation_stats().snapshot()
+        print(json.dumps(summary, indent=2))
+    finally:
+        core_session.get_session_pool().close()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
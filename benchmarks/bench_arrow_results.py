@@ -0,0 +1,119 @@
+"""
+Memory benchmark: Arrow-native result path vs the pandas path
+Run from the repo root: python -m benchmarks.bench_arrow_results [--rows N] [--connection NAME]
+
+Without --connection a synthetic ORDERS-join / DOCS_CHUNKS_TABLE result is generated locally.
+With --connection the same comparison runs against the warehouse using a named connection.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import pyarrow as pa
+
+from arrow_results import dictionary_encode_strings, fetch_arrow_table
+
+WIDE_ORDERS_QUERY = """
+    SELECT o.*, c.customer_name, c.email, c.phone, c.region AS customer_region,
+           s.shipped_date, s.delivered_date, s.shipping_delay_days
+    FROM ORDERS o
+    JOIN CUSTOMERS c ON c.customer_id = o.customer_id
+    LEFT JOIN SHIPMENTS s ON s.order_id = o.order_id
+"""
+CHUNKS_QUERY = "SELECT RELATIVE_PATH, CHUNK_INDEX, CHUNK FROM DOCS_CHUNKS_TABLE"
+
+REGIONS = ["North", "South", "East", "West", "Central"]
+CHANNELS = ["Online", "Retail", "Distributor", "Partner"]
+STATUSES = ["Delivered", "Shipped", "Pending", "Cancelled", "Returned"]
+
+
+def synthetic_orders(rows: int, batch_rows: int = 65536) -> pa.Table:
+    """Build an ORDERS-join shaped table out of several record batches, like a warehouse fetch"""
+    rng = random.Random(42)
+    batches = []
+    for start in range(0, rows, batch_rows):
+        n = min(batch_rows, rows - start)
+        batches.append(pa.table({
+            "ORDER_ID": [f"ORD{start + i:08d}" for i in range(n)],
+            "CUSTOMER_ID": [f"CUST{rng.randrange(50000):06d}" for _ in range(n)],
+            "ORDER_STATUS": [rng.choice(STATUSES) for _ in range(n)],
+            "TOTAL_AMOUNT": [round(rng.uniform(10, 20000), 2) for _ in range(n)],
+            "DISCOUNT_AMOUNT": [round(rng.uniform(0, 500), 2) for _ in range(n)],
+            "CHANNEL": [rng.choice(CHANNELS) for _ in range(n)],
+            "REGION": [rng.choice(REGIONS) for _ in range(n)],
+            "CUSTOMER_NAME": [f"Customer {rng.randrange(50000)}" for _ in range(n)],
+            "EMAIL": [f"user{rng.randrange(50000)}@example.com" for _ in range(n)],
+            "SHIPPING_DELAY_DAYS": [rng.randrange(10) for _ in range(n)],
+        }))
+    return pa.concat_tables(batches)
+
+
+def synthetic_chunks(rows: int, chunk_chars: int = 1512) -> pa.Table:
+    """Build a DOCS_CHUNKS_TABLE shaped table with long CHUNK strings"""
+    rng = random.Random(7)
+    words = "return refund shipping warranty policy order customer days within receipt item".split()
+    chunks = [" ".join(rng.choice(words) for _ in range(chunk_chars // 7))[:chunk_chars] for _ in range(rows)]
+    return pa.table({
+        "RELATIVE_PATH": [f"policy_{i % 12}.pdf" for i in range(rows)],
+        "CHUNK_INDEX": [i // 12 for i in range(rows)],
+        "CHUNK": chunks,
+    })
+
+
+def measure_pandas(table: pa.Table):
+    """Current path: Arrow result converted to pandas with object string columns"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    df = table.to_pandas()
+    # The connector hands strings back as Python objects; pin that even where pandas defaults differ
+    for field in table.schema:
+        if pa.types.is_string(field.type):
+            df[field.name] = df[field.name].astype(object)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df.memory_usage(deep=True).sum(), peak, elapsed
+
+
+def measure_arrow(table: pa.Table):
+    """New path: the same batches kept as Arrow with dictionary-encoded categoricals"""
+    before = pa.total_allocated_bytes()
+    started = time.perf_counter()
+    encoded = dictionary_encode_strings(table)
+    elapsed = time.perf_counter() - started
+    extra = pa.total_allocated_bytes() - before
+    return encoded.nbytes, extra, elapsed
+
+
+def report(label: str, table: pa.Table):
+    pd_bytes, pd_peak, pd_time = measure_pandas(table)
+    ar_bytes, ar_extra, ar_time = measure_arrow(table)
+    mb = 1024 * 1024
+    print(f"\n{label}: {table.num_rows:,} rows x {table.num_columns} columns")
+    print(f"  pandas: {pd_bytes / mb:10.1f} MB resident  {pd_peak / mb:10.1f} MB peak alloc  {pd_time * 1000:8.1f} ms")
+    print(f"  arrow : {ar_bytes / mb:10.1f} MB resident  {ar_extra / mb:10.1f} MB extra alloc {ar_time * 1000:8.1f} ms")
+    print(f"  ratio : {pd_bytes / max(ar_bytes, 1):.1f}x smaller with Arrow")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="Synthetic ORDERS rows (chunks use rows / 20)")
+    parser.add_argument("--connection", help="Snowflake connection name to benchmark live queries instead")
+    args = parser.parse_args()
+
+    if args.connection:
+        from snowflake.snowpark import Session
+
+        session = Session.builder.config("connection_name", args.connection).create()
+        report("ORDERS join (live)", fetch_arrow_table(session, WIDE_ORDERS_QUERY, encode=False))
+        report("DOCS_CHUNKS_TABLE (live)", fetch_arrow_table(session, CHUNKS_QUERY, encode=False))
+        session.close()
+    else:
+        report("ORDERS join (synthetic)", synthetic_orders(args.rows))
+        report("DOCS_CHUNKS_TABLE (synthetic)", synthetic_chunks(max(args.rows // 20, 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Cold import time of the core package and the modules it pulls in
+Run from the repo root: python -m benchmarks.bench_import [--repeat N]
+
+Each measurement is a fresh interpreter, so nothing is cached between runs. The core
+must stay importable without Streamlit or a Snowflake session, so a failing import
+here is a regression too.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "sales_assistant",
+    "sales_assistant.router",
+    "sales_assistant.agent",
+    "sales_assistant.hydrate",
+    "batch_qa",
+]
+
+# Modules that must not load as a side effect of importing the core
+HEAVY = ("streamlit", "snowflake.snowpark", "pyarrow", "numpy", "sentence_transformers")
+
+
+def measure(module: str) -> float:
+    """Wall time in ms for `python -c 'import module'` minus a bare interpreter start"""
+    code = (
+        "import sys, time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - t) * 1000); "
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split("\n")
+    heavy = out[1].strip()
+    if heavy:
+        raise SystemExit(f"{module} imports {heavy} at import time")
+    return float(out[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        samples = [measure(module) for _ in range(args.repeat)]
+        print(f"  {module:<26} {statistics.median(samples):7.1f} ms  (min {min(samples):.1f})")
+    print(f"\nFor a per-module breakdown: {sys.executable} -X importtime -c 'import sales_assistant.router'")
+
+
+if __name__ == "__main__":
+    main()
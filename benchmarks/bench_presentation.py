@@ -0,0 +1,52 @@
+"""
+Deck generation throughput (decks per minute)
+Run from the repo root: python -m benchmarks.bench_presentation [--decks N] [--workers N] [--content]
+
+Compares building the base template for every deck, reusing the cached template,
+and generating with the cached template across worker processes.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import create_presentation as cp
+
+
+def _jobs(out_dir: str, decks: int, slides):
+    return [(os.path.join(out_dir, f"deck_{i}.pptx"), slides, {"audience": f"Region {i}"}) for i in range(decks)]
+
+
+def run(label: str, fn, decks: int):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed:7.2f}s  {decks / elapsed * 60:8.0f} decks/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--content", action="store_true", help=f"Include slides from {cp.CONTENT_FILE}")
+    args = parser.parse_args()
+
+    slides = list(cp.DECK_SPEC) + (cp.load_content_sections() if args.content else [])
+    print(f"{args.decks} decks x {len(slides)} slides, {args.workers} workers")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        jobs = _jobs(out_dir, args.decks, slides)
+
+        def uncached():
+            for job in jobs:
+                cp._template_bytes.cache_clear()
+                cp.generate_deck(job)
+
+        run("sequential, template per deck", uncached, args.decks)
+        run("sequential, cached template", lambda: cp.generate_decks(jobs, workers=1), args.decks)
+        run(f"parallel ({args.workers} workers), cached", lambda: cp.generate_decks(jobs, workers=args.workers), args.decks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: full vs per-question pruned semantic model for Cortex Analyst calls
+Run from the repo root: python -m benchmarks.bench_semantic_model [--golden FILE] [--question Q ...]
+                            [--connection NAME --repeats 3 --model claude-3-5-sonnet]
+
+Offline, reports for every analyst question of the golden set the tables it resolves to
+(bridge tables in brackets), the full and pruned semantic model sizes with estimated
+tokens, and the cost of resolving and pruning. With --connection each question is also
+asked analyst-only against the live agent with the full and with the pruned model;
+latency percentiles are compared and questions whose pruned call returned no SQL listed.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+from sales_assistant import admission, client, sse
+from sales_assistant import session as core_session
+from sales_assistant.semantic_model import get_semantic_model, semantic_model_for
+
+GOLDEN_SET = os.path.join(os.path.dirname(__file__), "golden_set.json")
+CHARS_PER_TOKEN = 4
+
+
+def analyst_questions(path: str) -> List[str]:
+    with open(path, "r") as f:
+        cases = json.load(f)
+    return [(case.get("split") or {}).get("analyst_query", case["question"]) for case in cases if "analyst" in case["tools"]]
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values) or [0.0]
+    return round(values[min(int(len(values) * q), len(values) - 1)], 1)
+
+
+def offline(questions: List[str]) -> List[dict]:
+    model = get_semantic_model()
+    rows = []
+    for question in questions:
+        started = time.perf_counter()
+        resolution = model.resolve(question)
+        pruned = model.dump(model.prune(resolution)) if resolution.tables else ""
+        overhead_ms = (time.perf_counter() - started) * 1000
+        full = len(resolution.kept) == len(model.tables) or not resolution.tables
+        rows.append({
+            "question": question,
+            "tables": sorted(resolution.tables) + [f"[{t}]" for t in sorted(resolution.bridges)],
+            "full_chars": model.full_bytes,
+            "pruned_chars": model.full_bytes if full else len(pruned),
+            "overhead_ms": round(overhead_ms, 2),
+        })
+    return rows
+
+
+def ask(question: str, model: str, semantic_model: str) -> Dict:
+    tools, tool_resources, instruction = client.tool_config("analyst_only", semantic_model=semantic_model)
+    started = time.perf_counter()
+    result = sse.parse_agent_run(client.run_agent(client.agent_payload(question, model, tools, tool_resources, instruction)),
+                                 query=question)
+    return {"ms": (time.perf_counter() - started) * 1000, "sql": bool(result.sql)}
+
+
+def live(questions: List[str], model: str, repeats: int) -> Dict[str, dict]:
+    runs = {"full": [], "pruned": []}
+    missing_sql = set()
+    for question in questions:
+        variant = semantic_model_for(question, wait=True)  # uploads the variant outside the timed calls
+        for _ in range(repeats):
+            # Alternate so warehouse warm-up does not favour either side
+            runs["full"].append(ask(question, model, client.SEMANTIC_MODEL))
+            pruned = ask(question, model, variant)
+            runs["pruned"].append(pruned)
+            if not pruned["sql"]:
+                missing_sql.add(question)
+    summary = {}
+    for label, calls in runs.items():
+        latencies = [call["ms"] for call in calls]
+        summary[label] = {
+            "calls": len(calls),
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+            "with_sql": sum(call["sql"] for call in calls),
+        }
+    summary["pruned"]["missing_sql"] = sorted(missing_sql)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", default=GOLDEN_SET, help="Golden set JSON; its analyst questions are used")
+    parser.add_argument("--question", action="append", help="Benchmark this question instead (repeatable)")
+    parser.add_argument("--connection", help="Snowflake connection name to also time live analyst calls")
+    parser.add_argument("--model", default=client.DEFAULT_MODEL)
+    parser.add_argument("--repeats", type=int, default=3, help="Live calls per question and model variant")
+    args = parser.parse_args()
+
+    if get_semantic_model() is None:
+        raise SystemExit("could not read the semantic model (is PyYAML installed?)")
+    questions = args.question or analyst_questions(args.golden)
+    rows = offline(questions)
+    print(f"{'full':>6} {'pruned':>6} {'saved':>6} {'tokens':>13} {'ms':>5}  tables / question")
+    for row in rows:
+        tokens = f"{row['full_chars'] // CHARS_PER_TOKEN}->{row['pruned_chars'] // CHARS_PER_TOKEN}"
+        print(f"{row['full_chars']:>6} {row['pruned_chars']:>6} {1 - row['pruned_chars'] / row['full_chars']:>6.0%} "
+              f"{tokens:>13} {row['overhead_ms']:>5.1f}  {', '.join(row['tables']) or '-'}\n{'':>41}{row['question']}")
+    full, pruned = sum(r["full_chars"] for r in rows), sum(r["pruned_chars"] for r in rows)
+    print(f"\nsemantic model chars sent: {full} full, {pruned} pruned ({1 - pruned / full:.0%} less), "
+          f"~{(full - pruned) // CHARS_PER_TOKEN // len(rows)} tokens saved per analyst call")
+
+    if args.connection:
+        from snowflake.snowpark import Session
+
+        session = Session.builder.config("connection_name", args.connection).create()
+        try:
+            core_session.configure(session)
+            admission.configure(max_in_flight=1, user_rate=None, max_queue=1 << 20, max_wait=float("inf"))
+            print(json.dumps(live(questions, args.model, args.repeats), indent=2))
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+SSE response parsing throughput
+Run from the repo root: python -m benchmarks.bench_sse [--events N] [--responses N] [--file recorded.json]
+
+Compares the previous nested-dict walk with the table-driven decoder (decode only,
+and decode + fold into an AgentResult) on large responses in both API dialects.
+--file takes a recorded response: the JSON event list as returned by the agent API.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from sales_assistant import events as ev
+from sales_assistant import sse
+
+
+def synthetic_run(n_events: int) -> list:
+    """message.delta stream: mostly text deltas, a tool call and a search result block"""
+    rng = random.Random(0)
+    stream = [{"event": "message.delta", "data": {"delta": {"content": [
+        {"type": "tool_use", "tool_use": {"type": "cortex_search", "name": "Faq Search"}}]}}}]
+    stream.append({"event": "message.delta", "data": {"delta": {"content": [{"type": "tool_results", "tool_results": {
+        "content": [{"type": "json", "json": {
+            "searchResults": [{"doc_title": f"doc_{i}.pdf", "doc_id": i, "@scores": {"cosine_similarity": rng.random()}}
+                              for i in range(8)],
+            "sql": "SELECT COUNT(*) FROM ORDERS",
+        }}]}}]}}})
+    for i in range(n_events):
+        stream.append({"event": "message.delta", "data": {"delta": {"content": [
+            {"type": "text", "text": f"token{i} "}]}}})
+    return stream
+
+
+def synthetic_agent(n_events: int) -> list:
+    """Pre-configured agent stream: response events with annotated text plus metadata"""
+    stream = [{"event": "metadata", "data": {"message_id": 1, "role": "assistant"}}]
+    stream.append({"event": "response", "data": {"content": [{"type": "tool_result", "tool_result": {"content": [
+        {"type": "json", "json": {"search_results": [{"doc_title": f"doc_{i}.pdf", "doc_id": i} for i in range(8)]}}]}}]}})
+    for i in range(n_events):
+        stream.append({"event": "response", "data": {"content": [{
+            "type": "text", "text": f"token{i} ",
+            "annotations": [{"type": "cortex_search_citation", "doc_title": f"doc_{i % 8}.pdf", "doc_id": i % 8, "index": i % 8}]
+            if i % 50 == 0 else [],
+        }]}})
+    return stream
+
+
+def legacy_walk(response) -> tuple:
+    """The previous per-event .get chain walk (both dialects), kept as the baseline"""
+    text, sql, citations, tools = "", "", [], []
+    for event in response:
+        if event.get('event') == "message.delta":
+            items = event.get('data', {}).get('delta', {}).get('content', [])
+        elif event.get('event') == "response":
+            items = event.get('data', {}).get('content', [])
+        else:
+            continue
+        for content_item in items:
+            content_type = content_item.get('type')
+            if content_type == "tool_use":
+                tools.append(content_item.get('tool_use', {}).get('type', ''))
+            if content_type in ("tool_results", "tool_result"):
+                for result in content_item.get(content_type, {}).get('content', []):
+                    if result.get('type') == 'json':
+                        json_data = result.get('json', {})
+                        text += json_data.get('text', '')
+                        for search_result in json_data.get('searchResults', json_data.get('search_results', [])):
+                            citations.append({'source_id': search_result.get('source_id', ''),
+                                              'doc_title': search_result.get('doc_title', ''),
+                                              'doc_chunk': search_result.get('doc_id')})
+                        if json_data.get('sql', ''):
+                            sql = json_data.get('sql', '')
+            if content_type == 'text':
+                text += content_item.get('text', '')
+                for annotation in content_item.get('annotations', []):
+                    if annotation.get('type') == 'cortex_search_citation':
+                        citations.append({'source_id': annotation.get('index', 0),
+                                          'doc_title': annotation.get('doc_title', ''),
+                                          'doc_chunk': annotation.get('doc_id', '')})
+    return text, sql, citations, tools
+
+
+def run(label: str, fn, responses: list, n_events: int):
+    started = time.perf_counter()
+    for response in responses:
+        fn(response)
+    elapsed = time.perf_counter() - started
+    total = n_events * len(responses)
+    print(f"  {label:<30} {elapsed * 1000 / len(responses):8.2f} ms/response  {total / elapsed / 1e6:6.2f} M events/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000, help="Events per synthetic response")
+    parser.add_argument("--responses", type=int, default=20)
+    parser.add_argument("--file", help="Recorded response (JSON event list) to parse instead")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            recorded = json.load(f)
+        datasets = [("recorded", recorded, sse.parse_agent_response if any(
+            e.get("event") == "response" for e in recorded) else sse.parse_agent_run)]
+    else:
+        datasets = [
+            ("agent:run (message.delta)", synthetic_run(args.events), sse.parse_agent_run),
+            ("agent (response)", synthetic_agent(args.events), sse.parse_agent_response),
+        ]
+
+    for name, response, parse in datasets:
+        print(f"{name}: {len(response)} events x {args.responses} responses")
+        responses = [response] * args.responses
+        run("legacy dict walk", legacy_walk, responses, len(response))
+        run("typed decode", ev.decode, responses, len(response))
+        run("typed decode + AgentResult", parse, responses, len(response))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Golden-set evaluation of orchestration modes and models
+Run from the repo root: python -m benchmarks.eval_orchestration [--golden FILE] [--repeats N]
+                            [--time-scale 0.01] [--min-accuracy 0.9] [--json report.json] [--verbose]
+
+Answers every golden question (benchmarks/golden_set.json: expected tools, SQL fragments,
+answer facts and cited documents over the sample schema) with router.answer_query in
+each orchestration mode and model, plus client-side orchestration with model routing,
+through the offline StubCortex transport. Reports accuracy next to simulated latency
+percentiles, REST calls and estimated tokens per question, and names the fastest
+configuration (by p95) that meets --min-accuracy. Latency is wall-clock time scaled back
+to simulated ms, so a discarded warm-up pass runs first: one-time costs (imports, the
+semantic model YAML, session setup) would otherwise be charged to the first configuration.
+"""
+
+import os
+
+# Every configuration must see cold answers, and evaluation traffic is not user traffic
+os.environ.setdefault("SALES_ASSISTANT_DISK_CACHE", "0")
+os.environ.setdefault("SALES_ASSISTANT_QUERY_LOG", "0")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import time  # noqa: E402
+from typing import Dict, List, Optional, Tuple  # noqa: E402
+
+from sales_assistant import admission, router, transport  # noqa: E402
+from sales_assistant.client import ANALYST_TOOL, SEARCH_TOOL  # noqa: E402
+from sales_assistant.model_routing import MODELS, ModelRouter, set_model_router  # noqa: E402
+from sales_assistant.results import Answer  # noqa: E402
+
+from benchmarks.stub_cortex import StubCortex  # noqa: E402
+
+GOLDEN_SET = os.path.join(os.path.dirname(__file__), "golden_set.json")
+TOOL_KINDS = {SEARCH_TOOL: "search", ANALYST_TOOL: "analyst"}
+
+Config = Tuple[str, str, bool]  # (orchestration mode, model, route_models)
+
+
+def configs() -> List[Config]:
+    runs = [(mode, model, False) for mode in (router.CLIENT_SIDE, router.LLM_BASED) for model in MODELS]
+    runs.append((router.CLIENT_SIDE, MODELS[0], True))
+    return runs
+
+
+def label(config: Config) -> str:
+    mode, model, route_models = config
+    return f"{'client' if mode == router.CLIENT_SIDE else 'llm'} / {'auto <= ' + model if route_models else model}"
+
+
+class SimulatedClockRouter(ModelRouter):
+    """Learns latency in simulated ms, so routing decisions match what the stub models"""
+
+    def __init__(self, time_scale: float):
+        super().__init__()
+        self.time_scale = time_scale
+
+    def record(self, model: str, call_type: str, elapsed_ms: float):
+        super().record(model, call_type, elapsed_ms / self.time_scale)
+
+
+def grade(case: dict, answer: Answer) -> Dict[str, bool]:
+    """One flag per expectation; the question is correct when all hold"""
+    expect = case.get("expect", {})
+    called = {TOOL_KINDS.get(tool, tool) for tool in answer.tools_called}
+    text, sql = answer.text.lower(), answer.sql.upper()
+    titles = {c.get("doc_title") for c in answer.citations}
+    checks = {"tools": set(case["tools"]) <= called}
+    if "sql_contains" in expect:
+        checks["sql"] = all(fragment.upper() in sql for fragment in expect["sql_contains"])
+    if "answer_contains" in expect:
+        checks["answer"] = all(fact.lower() in text for fact in expect["answer_contains"])
+    if "citations" in expect:
+        checks["citations"] = set(expect["citations"]) <= titles
+    return checks
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values) or [0.0]
+    return round(values[min(int(len(values) * q), len(values) - 1)], 1)
+
+
+def evaluate(stub: StubCortex, cases: List[dict], config: Config, repeats: int = 1) -> dict:
+    mode, model, route_models = config
+    rows = []
+    set_model_router(SimulatedClockRouter(stub.time_scale))
+    for _ in range(repeats):
+        router.clear_answer_cache()
+        for case in cases:
+            before = stub.counters()
+            started = time.perf_counter()
+            answer = router.answer_query(case["question"], model=model, orchestration_mode=mode,
+                                         use_local_index=False, use_faq=False, route_models=route_models)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            after = stub.counters()
+            checks = grade(case, answer)
+            rows.append({
+                "id": case["id"],
+                "correct": all(checks.values()),
+                "checks": checks,
+                "route": answer.route,
+                "latency_ms": elapsed_ms / stub.time_scale,  # back to simulated ms
+                "calls": after["calls"] - before["calls"],
+                "tokens": after["tokens"] - before["tokens"],
+            })
+    n = len(rows) or 1
+    latencies = [row["latency_ms"] for row in rows]
+    return {
+        "config": label(config),
+        "accuracy": round(sum(row["correct"] for row in rows) / n, 3),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "calls_per_question": round(sum(row["calls"] for row in rows) / n, 2),
+        "tokens_per_question": round(sum(row["tokens"] for row in rows) / n),
+        "failures": sorted({
+            f"{row['id']} ({', '.join(k for k, ok in row['checks'].items() if not ok)})"
+            for row in rows if not row["correct"]
+        }),
+    }
+
+
+def warm_up(stub: StubCortex, cases: List[dict]):
+    """One discarded pass per orchestration path, so every measured configuration starts warm"""
+    for config in configs():
+        if config[1] == MODELS[0]:
+            evaluate(stub, cases, config)
+
+
+def fastest_accurate(results: List[dict], min_accuracy: float) -> Optional[dict]:
+    passing = [r for r in results if r["accuracy"] >= min_accuracy]
+    return min(passing, key=lambda r: (r["p95_ms"], r["p50_ms"])) if passing else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", default=GOLDEN_SET, help="Golden set JSON")
+    parser.add_argument("--repeats", type=int, default=1, help="Passes over the golden set per configuration")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Real seconds per simulated second")
+    parser.add_argument("--min-accuracy", type=float, default=0.9)
+    parser.add_argument("--json", help="Also write the results here")
+    parser.add_argument("--verbose", action="store_true", help="List the questions each configuration got wrong")
+    args = parser.parse_args()
+
+    with open(args.golden, "r") as f:
+        cases = json.load(f)
+    stub = StubCortex(cases, time_scale=args.time_scale)
+    transport.set_transport(stub)
+    admission.configure(max_in_flight=8, user_rate=None, max_queue=1 << 20, max_wait=float("inf"))
+    try:
+        warm_up(stub, cases)
+        results = [evaluate(stub, cases, config, args.repeats) for config in configs()]
+    finally:
+        transport.set_transport(None)
+        set_model_router(None)
+
+    print(f"{len(cases)} golden questions x {args.repeats}, simulated latency\n")
+    print(f"{'configuration':<32} {'accuracy':>8} {'p50 ms':>8} {'p95 ms':>8} {'calls/q':>8} {'tokens/q':>9}")
+    for r in results:
+        print(f"{r['config']:<32} {r['accuracy']:>8.1%} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['calls_per_question']:>8.2f} {r['tokens_per_question']:>9}")
+        if args.verbose:
+            for failure in r["failures"]:
+                print(f"    wrong: {failure}")
+
+    best = fastest_accurate(results, args.min_accuracy)
+    print(f"\nfastest with accuracy >= {args.min_accuracy:.0%}: {best['config'] if best else 'none'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": results, "fastest_accurate": best and best["config"]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Offline stand-in for the Cortex agent:run endpoint
+Install with transport.set_transport(StubCortex(cases)). Each request is answered from the
+golden set's canned tool responses with a per-model simulated latency, so orchestration
+modes and models can be compared without a Snowflake account:
+
+    - tools are chosen from what the request offers and what the question needs
+    - a model without multi_tool calls only the first tool it needs when offered both,
+      like claude-3-5-sonnet (docs/ROOT_CAUSE_ANALYSIS.md)
+    - calls without tools (the compound-question split) return the case's split as JSON
+
+Latency sleeps for simulated ms * time_scale. Tokens are estimated at 4 characters each.
+"""
+
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+CHARS_PER_TOKEN = 4
+
+# Simulated latency per call in ms: the model's own work plus each tool it calls
+MODEL_PROFILES: Dict[str, dict] = {
+    "claude-sonnet-4-5": {"call_ms": 4200, "split_ms": 2600, "multi_tool": True},
+    "claude-3-7-sonnet": {"call_ms": 3300, "split_ms": 2000, "multi_tool": True},
+    "claude-3-5-sonnet": {"call_ms": 2500, "split_ms": 1400, "multi_tool": False},
+}
+TOOL_MS = {"search": 900, "analyst": 2600}
+
+TOOL_TYPES = {"cortex_search": "search", "cortex_analyst_text_to_sql": "analyst"}
+TOOL_NAMES = {"search": "Faq Search", "analyst": "Sales Analyst"}
+EMPTY_RESPONSES = {
+    "search": {"text": "I could not find documentation about that.", "search_results": []},
+    "analyst": {"text": "That question does not map to the sales data.", "sql": ""},
+}
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().lower()).rstrip("?.! ")
+
+
+def _delta(*content) -> dict:
+    return {"event": "message.delta", "data": {"delta": {"content": list(content)}}}
+
+
+class StubCortex:
+    """Callable with the send_snow_api_request signature; counts calls and estimated tokens"""
+
+    def __init__(self, cases: List[dict], time_scale: float = 0.01, profiles: Optional[Dict[str, dict]] = None):
+        self.cases = cases
+        self.time_scale = time_scale
+        self.profiles = profiles or MODEL_PROFILES
+        self._by_query: Dict[str, dict] = {}
+        for case in cases:
+            self._by_query[_norm(case["question"])] = case
+        for case in cases:
+            for sub_query in (case.get("split") or {}).values():
+                self._by_query.setdefault(_norm(sub_query), case)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens = 0
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "tokens": self.tokens}
+
+    def __call__(self, method, path, headers, params, body, request_guid, timeout_ms):
+        profile = self.profiles.get(body.get("model"), next(iter(self.profiles.values())))
+        text = " ".join(
+            item.get("text", "") for message in body.get("messages", []) for item in message.get("content", [])
+        )
+        offered = [TOOL_TYPES.get(t["tool_spec"]["type"]) for t in body.get("tools") or []]
+        if offered:
+            events, latency_ms, answer = self._run_tools(text, [t for t in offered if t], profile)
+        else:
+            events, latency_ms, answer = self._split(text, profile)
+
+        with self._lock:
+            self.calls += 1
+            self.tokens += (len(json.dumps(body)) + len(answer)) // CHARS_PER_TOKEN
+        time.sleep(latency_ms * self.time_scale / 1000)
+        return {"status": 200, "reason": "OK", "content": json.dumps(events)}
+
+    def _split(self, prompt: str, profile: dict):
+        prompt = _norm(prompt)
+        matches = [case for case in self.cases if _norm(case["question"]) in prompt]
+        case = max(matches, key=lambda c: len(c["question"])) if matches else None
+        question = case["question"] if case else ""
+        split = (case or {}).get("split") or {"search_query": question, "analyst_query": question}
+        answer = json.dumps(split)
+        return [_delta({"type": "text", "text": answer})], profile["split_ms"], answer
+
+    def _run_tools(self, query: str, offered: List[str], profile: dict):
+        case = self._by_query.get(_norm(query))
+        needed = [tool for tool in (case["tools"] if case else offered) if tool in offered] or offered[:1]
+        skipped = []
+        if len(needed) > 1 and not profile["multi_tool"]:
+            needed, skipped = needed[:1], needed[1:]
+
+        events, parts = [], []
+        latency_ms = profile["call_ms"]
+        for tool in needed:
+            response = ((case or {}).get("responses") or {}).get(tool) or EMPTY_RESPONSES[tool]
+            latency_ms += TOOL_MS[tool]
+            result = {"searchResults": response.get("search_results", [])} if tool == "search" \
+                else {"sql": response.get("sql", ""), "text": ""}
+            events.append(_delta({"type": "tool_use", "tool_use": {"type": next(
+                t for t, kind in TOOL_TYPES.items() if kind == tool), "name": TOOL_NAMES[tool]}}))
+            events.append(_delta({"type": "tool_results", "tool_results": {"content": [{"type": "json", "json": result}]}}))
+            parts.append(response["text"])
+        for tool in skipped:
+            parts.append(f"This part needs the {TOOL_NAMES[tool]} tool. Would you like me to use it?")
+        answer = " ".join(parts)
+        events.append(_delta({"type": "text", "text": answer}))
+        return events, latency_ms, answer
@@ -0,0 +1,6 @@
+"""
+Answer-level citation aggregation; moved to sales_assistant.citations, re-exported here
+for scripts that still import it from the repo root
+"""
+
+from sales_assistant.citations import *  # noqa: F401,F403
@@ -1,219 +1,113 @@
 """
 PowerPoint Generator for Cortex Agent Implementation
-Generates a professional PPTX presentation from the project documentation
+Generates professional PPTX presentations from declarative slide specs.
+The pre-styled base template is built once per process, and many decks
+(e.g. one per region or customer) can be generated in parallel worker processes.
 """
 
+import argparse
+import io
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 
-def create_presentation():
-    """Create the complete PowerPoint presentation"""
-    
-    # Create presentation object
-    prs = Presentation()
-    prs.slide_width = Inches(10)
-    prs.slide_height = Inches(7.5)
-    
-    # Define color scheme (Snowflake theme)
-    SNOWFLAKE_BLUE = RGBColor(41, 181, 232)  # #29B5E8
-    DARK_BLUE = RGBColor(30, 58, 138)  # #1E3A8A
-    GREEN = RGBColor(16, 185, 129)  # #10B981
-    DARK_GRAY = RGBColor(31, 41, 55)  # #1F2937
-    LIGHT_GRAY = RGBColor(243, 244, 246)  # #F3F4F6
-    
-    # Slide 1: Title Slide
-    slide1 = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
-    
-    # Background color
-    background = slide1.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        0, 0, prs.slide_width, prs.slide_height
-    )
-    background.fill.solid()
-    background.fill.fore_color.rgb = LIGHT_GRAY
-    background.line.fill.background()
-    
-    # Title
-    title_box = slide1.shapes.add_textbox(Inches(0.5), Inches(2), Inches(9), Inches(1.5))
-    title_frame = title_box.text_frame
-    title_frame.text = "Intelligent Sales Assistant"
-    title_para = title_frame.paragraphs[0]
-    title_para.font.size = Pt(54)
-    title_para.font.bold = True
-    title_para.font.color.rgb = DARK_BLUE
-    title_para.alignment = PP_ALIGN.CENTER
-    
-    # Subtitle
-    subtitle_box = slide1.shapes.add_textbox(Inches(0.5), Inches(3.5), Inches(9), Inches(0.8))
-    subtitle_frame = subtitle_box.text_frame
-    subtitle_frame.text = "Powered by Snowflake Cortex AI Agents"
-    subtitle_para = subtitle_frame.paragraphs[0]
-    subtitle_para.font.size = Pt(28)
-    subtitle_para.font.color.rgb = SNOWFLAKE_BLUE
-    subtitle_para.alignment = PP_ALIGN.CENTER
-    
-    # Key highlights boxes
-    highlights = [
-        ("🤖 Multi-Tool\nOrchestration", "Automatic coordination\nbetween tools"),
-        ("🧵 Conversation\nContext", "Server-side threading\nfor continuity"),
-        ("🔄 Auto-Creation", "Self-initializing\nagent"),
-        ("⚡ Real-Time\nAnalytics", "SQL generation\nfrom NL")
-    ]
-    
-    box_width = Inches(2)
-    box_height = Inches(1.2)
-    start_x = Inches(1)
-    start_y = Inches(5)
-    spacing = Inches(0.3)
-    
-    for i, (title, desc) in enumerate(highlights):
-        x_pos = start_x + (i * (box_width + spacing))
-        
-        # Box background
-        box = slide1.shapes.add_shape(
-            MSO_SHAPE.ROUNDED_RECTANGLE,
-            x_pos, start_y, box_width, box_height
-        )
-        box.fill.solid()
-        box.fill.fore_color.rgb = RGBColor(255, 255, 255)
-        box.line.color.rgb = SNOWFLAKE_BLUE
-        box.line.width = Pt(2)
-        
-        # Title
-        text_box = slide1.shapes.add_textbox(x_pos, start_y + Inches(0.1), box_width, Inches(0.5))
-        tf = text_box.text_frame
-        tf.text = title
-        tf.paragraphs[0].font.size = Pt(12)
-        tf.paragraphs[0].font.bold = True
-        tf.paragraphs[0].font.color.rgb = DARK_BLUE
-        tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-        
-        # Description
-        desc_box = slide1.shapes.add_textbox(x_pos, start_y + Inches(0.6), box_width, Inches(0.5))
-        df = desc_box.text_frame
-        df.text = desc
-        df.paragraphs[0].font.size = Pt(9)
-        df.paragraphs[0].font.color.rgb = DARK_GRAY
-        df.paragraphs[0].alignment = PP_ALIGN.CENTER
-    
-    # Slide 2: Architecture
-    slide2 = prs.slides.add_slide(prs.slide_layouts[6])
-    
-    # Title
-    add_slide_title(slide2, "System Architecture", DARK_BLUE)
-    
-    # Architecture layers
-    layers = [
-        ("USER INTERFACE LAYER", "Streamlit Application\n• Chat Interface\n• Model Selection\n• Thread Management", Inches(1.5), SNOWFLAKE_BLUE),
-        ("ORCHESTRATION LAYER", "CORTEX_SALES_AGENT\n• Query Understanding\n• Tool Selection\n• Response Synthesis", Inches(3.2), DARK_BLUE),
-        ("TOOL EXECUTION LAYER", "Cortex Analyst (SQL)\nCortex Search (Docs)", Inches(4.9), GREEN)
-    ]
-    
-    for layer_name, content, y_pos, color in layers:
-        # Layer box
-        box = slide2.shapes.add_shape(
-            MSO_SHAPE.ROUNDED_RECTANGLE,
-            Inches(1), y_pos, Inches(8), Inches(1.2)
-        )
-        box.fill.solid()
-        box.fill.fore_color.rgb = RGBColor(255, 255, 255)
-        box.line.color.rgb = color
-        box.line.width = Pt(3)
-        
-        # Layer title
-        title_box = slide2.shapes.add_textbox(Inches(1.2), y_pos + Inches(0.1), Inches(7.6), Inches(0.3))
-        tf = title_box.text_frame
-        tf.text = layer_name
-        tf.paragraphs[0].font.size = Pt(14)
-        tf.paragraphs[0].font.bold = True
-        tf.paragraphs[0].font.color.rgb = color
-        
-        # Layer content
-        content_box = slide2.shapes.add_textbox(Inches(1.2), y_pos + Inches(0.45), Inches(7.6), Inches(0.7))
-        cf = content_box.text_frame
-        cf.text = content
-        cf.paragraphs[0].font.size = Pt(11)
-        cf.paragraphs[0].font.color.rgb = DARK_GRAY
-        
-        # Add arrow between layers (except last)
-        if y_pos < Inches(4.5):
-            arrow = slide2.shapes.add_shape(
-                MSO_SHAPE.DOWN_ARROW,
-                Inches(4.7), y_pos + Inches(1.3), Inches(0.6), Inches(0.4)
-            )
-            arrow.fill.solid()
-            arrow.fill.fore_color.rgb = DARK_GRAY
-            arrow.line.fill.background()
-    
-    # Slide 3: Key Features (Part 1)
-    slide3 = prs.slides.add_slide(prs.slide_layouts[6])
-    add_slide_title(slide3, "Key Features & Innovations", DARK_BLUE)
-    
-    features = [
-        {
-            "icon": "🤖",
-            "title": "Automatic Agent Creation",
-            "problem": "Manual setup complexity",
-            "solution": "• Auto-detection\n• JSON configuration\n• REST API creation\n• Self-healing",
-            "x": Inches(0.5),
-            "y": Inches(1.5)
-        },
-        {
-            "icon": "🧵",
-            "title": "Intelligent Threading",
-            "problem": "Lost conversation context",
-            "solution": "• Server-side threads\n• Parent message tracking\n• Pronoun resolution\n• Natural follow-ups",
-            "x": Inches(5.2),
-            "y": Inches(1.5)
-        },
-        {
-            "icon": "🎯",
-            "title": "Smart Query Interpretation",
-            "problem": "Ambiguous queries (COUNT vs SELECT)",
-            "solution": "• 'list/show' → SELECT\n• 'count' → COUNT(*)\n• 'sum' → SUM()\n• Intent detection",
-            "x": Inches(0.5),
-            "y": Inches(4.2)
-        },
-        {
-            "icon": "🔄",
-            "title": "Multi-Tool Orchestration",
-            "problem": "Manual tool selection",
-            "solution": "• Automatic routing\n• Parallel execution\n• Response synthesis\n• Unified output",
-            "x": Inches(5.2),
-            "y": Inches(4.2)
-        }
-    ]
-    
-    for feature in features:
-        add_feature_box(slide2, feature, SNOWFLAKE_BLUE, DARK_GRAY, GREEN)
-    
-    # Slide 4: Technical Implementation
-    slide4 = prs.slides.add_slide(prs.slide_layouts[6])
-    add_slide_title(slide4, "Technical Implementation", DARK_BLUE)
-    
-    # Left side - Code flow
-    code_box = slide4.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE,
-        Inches(0.5), Inches(1.5), Inches(4.5), Inches(5)
-    )
-    code_box.fill.solid()
-    code_box.fill.fore_color.rgb = RGBColor(248, 250, 252)
-    code_box.line.color.rgb = DARK_BLUE
-    code_box.line.width = Pt(2)
-    
-    code_title = slide4.shapes.add_textbox(Inches(0.7), Inches(1.6), Inches(4.1), Inches(0.4))
-    ctf = code_title.text_frame
-    ctf.text = "Request Flow"
-    ctf.paragraphs[0].font.size = Pt(18)
-    ctf.paragraphs[0].font.bold = True
-    ctf.paragraphs[0].font.color.rgb = DARK_BLUE
-    
-    code_content = slide4.shapes.add_textbox(Inches(0.7), Inches(2.1), Inches(4.1), Inches(4.2))
-    ccf = code_content.text_frame
-    ccf.text = """User Query
+OUTPUT_FILE = 'Cortex_Agent_Presentation.pptx'
+CONTENT_FILE = 'PRESENTATION_CONTENT.md'
+BLANK_LAYOUT = 6
+
+# Color scheme (Snowflake theme); hex strings keep slide specs picklable for worker processes
+SNOWFLAKE_BLUE = "29B5E8"
+DARK_BLUE = "1E3A8A"
+GREEN = "10B981"
+DARK_GRAY = "1F2937"
+LIGHT_GRAY = "F3F4F6"
+WHITE = "FFFFFF"
+PANEL_GRAY = "F8FAFC"
+PANEL_GREEN = "F0FDF4"
+PANEL_BLUE = "EFF6FF"
+
+# ----------------------------------------------------------------------------
+# Declarative deck definition: positions are in inches, text may use
+# {placeholders} that are filled from the per-deck variables
+# ----------------------------------------------------------------------------
+
+DECK_SPEC = [
+    {
+        "type": "title",
+        "background": LIGHT_GRAY,
+        "title": "Intelligent Sales Assistant",
+        "subtitle": "Powered by Snowflake Cortex AI Agents",
+        "highlights": [
+            ("🤖 Multi-Tool\nOrchestration", "Automatic coordination\nbetween tools"),
+            ("🧵 Conversation\nContext", "Server-side threading\nfor continuity"),
+            ("🔄 Auto-Creation", "Self-initializing\nagent"),
+            ("⚡ Real-Time\nAnalytics", "SQL generation\nfrom NL"),
+        ],
+    },
+    {
+        "type": "layers",
+        "title": "System Architecture",
+        "layers": [
+            ("USER INTERFACE LAYER", "Streamlit Application\n• Chat Interface\n• Model Selection\n• Thread Management", 1.5, SNOWFLAKE_BLUE),
+            ("ORCHESTRATION LAYER", "CORTEX_SALES_AGENT\n• Query Understanding\n• Tool Selection\n• Response Synthesis", 3.2, DARK_BLUE),
+            ("TOOL EXECUTION LAYER", "Cortex Analyst (SQL)\nCortex Search (Docs)", 4.9, GREEN),
+        ],
+    },
+    {
+        "type": "features",
+        "title": "Key Features & Innovations",
+        "features": [
+            {
+                "icon": "🤖",
+                "title": "Automatic Agent Creation",
+                "problem": "Manual setup complexity",
+                "solution": "• Auto-detection\n• JSON configuration\n• REST API creation\n• Self-healing",
+                "x": 0.5,
+                "y": 1.5
+            },
+            {
+                "icon": "🧵",
+                "title": "Intelligent Threading",
+                "problem": "Lost conversation context",
+                "solution": "• Server-side threads\n• Parent message tracking\n• Pronoun resolution\n• Natural follow-ups",
+                "x": 5.2,
+                "y": 1.5
+            },
+            {
+                "icon": "🎯",
+                "title": "Smart Query Interpretation",
+                "problem": "Ambiguous queries (COUNT vs SELECT)",
+                "solution": "• 'list/show' → SELECT\n• 'count' → COUNT(*)\n• 'sum' → SUM()\n• Intent detection",
+                "x": 0.5,
+                "y": 4.2
+            },
+            {
+                "icon": "🔄",
+                "title": "Multi-Tool Orchestration",
+                "problem": "Manual tool selection",
+                "solution": "• Automatic routing\n• Parallel execution\n• Response synthesis\n• Unified output",
+                "x": 5.2,
+                "y": 4.2
+            },
+        ],
+    },
+    {
+        "type": "two_panels",
+        "title": "Technical Implementation",
+        "left": {
+            "title": "Request Flow",
+            "color": DARK_BLUE,
+            "monospace": True,
+            "text": """User Query
     ↓
 snowflake_api_call()
   • Build payload
@@ -228,268 +122,384 @@ process_sse_response()
 Display Results
   • Show response
   • Display SQL
-  • Render table"""
-    ccf.paragraphs[0].font.size = Pt(11)
-    ccf.paragraphs[0].font.name = 'Courier New'
-    ccf.paragraphs[0].font.color.rgb = DARK_GRAY
-    
-    # Right side - Database coverage
-    db_box = slide4.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE,
-        Inches(5.2), Inches(1.5), Inches(4.3), Inches(5)
-    )
-    db_box.fill.solid()
-    db_box.fill.fore_color.rgb = RGBColor(248, 250, 252)
-    db_box.line.color.rgb = GREEN
-    db_box.line.width = Pt(2)
-    
-    db_title = slide4.shapes.add_textbox(Inches(5.4), Inches(1.6), Inches(3.9), Inches(0.4))
-    dtf = db_title.text_frame
-    dtf.text = "Database Coverage - 9 Tables"
-    dtf.paragraphs[0].font.size = Pt(18)
-    dtf.paragraphs[0].font.bold = True
-    dtf.paragraphs[0].font.color.rgb = GREEN
-    
-    tables = [
-        "CAMPAIGNS - Marketing campaigns",
-        "CAMPAIGN_TOUCHES - Interactions",
-        "CUSTOMERS - Customer profiles",
-        "ORDERS - Sales transactions",
-        "ORDER_ITEMS - Line items",
-        "PRODUCTS - Product catalog",
-        "INVENTORY - Stock levels",
-        "REFUNDS - Refund tracking",
-        "SHIPMENTS - Delivery tracking"
-    ]
-    
-    db_content = slide4.shapes.add_textbox(Inches(5.4), Inches(2.2), Inches(3.9), Inches(4))
-    dcf = db_content.text_frame
-    for table in tables:
-        p = dcf.add_paragraph()
-        p.text = f"• {table}"
-        p.font.size = Pt(11)
-        p.font.color.rgb = DARK_GRAY
-        p.level = 0
-    
-    # Slide 5: Results & Impact
-    slide5 = prs.slides.add_slide(prs.slide_layouts[6])
-    add_slide_title(slide5, "Results & Business Impact", DARK_BLUE)
-    
-    # Performance metrics
-    metrics = [
-        ("⏱️ Response Time", "< 3 seconds", GREEN),
-        ("🎯 Accuracy", "95%+", GREEN),
-        ("🔄 Context", "100%", GREEN),
-        ("🛠️ Tools", "Auto", GREEN)
-    ]
-    
-    metric_y = Inches(1.8)
-    for i, (label, value, color) in enumerate(metrics):
-        x_pos = Inches(0.8) + (i * Inches(2.2))
-        
-        # Metric box
-        box = slide5.shapes.add_shape(
-            MSO_SHAPE.ROUNDED_RECTANGLE,
-            x_pos, metric_y, Inches(2), Inches(1)
-        )
+  • Render table""",
+        },
+        "right": {
+            "title": "Database Coverage - 9 Tables",
+            "color": GREEN,
+            "items": [
+                "CAMPAIGNS - Marketing campaigns",
+                "CAMPAIGN_TOUCHES - Interactions",
+                "CUSTOMERS - Customer profiles",
+                "ORDERS - Sales transactions",
+                "ORDER_ITEMS - Line items",
+                "PRODUCTS - Product catalog",
+                "INVENTORY - Stock levels",
+                "REFUNDS - Refund tracking",
+                "SHIPMENTS - Delivery tracking",
+            ],
+        },
+    },
+    {
+        "type": "metrics",
+        "title": "Results & Business Impact",
+        "metrics": [
+            ("⏱️ Response Time", "< 3 seconds"),
+            ("🎯 Accuracy", "95%+"),
+            ("🔄 Context", "100%"),
+            ("🛠️ Tools", "Auto"),
+        ],
+        "headers": ["Aspect", "Before", "After", "Improvement"],
+        "rows": [
+            ("Query Method", "Manual SQL", "Natural language", "100%"),
+            ("Tool Selection", "Manual", "Automatic", "100%"),
+            ("Context", "Restart each", "Continuous", "100%"),
+            ("Setup Time", "Hours", "Minutes", "90%"),
+        ],
+    },
+    {
+        "type": "conclusion",
+        "title": "ROI & Strategic Value",
+        "panels": [
+            ("Time Savings", "⏱️ 80% reduction in time\n   to get sales insights\n\n⏱️ 90% reduction in\n   policy lookup time\n\n⏱️ 70% reduction in\n   training time", GREEN, PANEL_GREEN),
+            ("Success Factors", "✅ Native Snowflake Features\n\n✅ User-Centric Design\n\n✅ Robust Engineering\n\n✅ Enterprise Standards", SNOWFLAKE_BLUE, PANEL_BLUE),
+        ],
+        "footer_title": "Strategic Advantages",
+        "footer": "🎯 Democratized data access across organization\n🎯 Consistent data interpretation and reporting\n🎯 Scalable foundation for AI-driven insights",
+    },
+]
+
+# ----------------------------------------------------------------------------
+# Base template
+# ----------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def _template_bytes(template_path: Optional[str] = None) -> bytes:
+    """Serialized, pre-styled base presentation; built once per process"""
+    if template_path:
+        with open(template_path, 'rb') as f:
+            return f.read()
+
+    prs = Presentation()
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(7.5)
+
+    # Slides inherit a white background from the blank layout instead of styling it per slide
+    layout = prs.slide_layouts[BLANK_LAYOUT]
+    layout.background.fill.solid()
+    layout.background.fill.fore_color.rgb = RGBColor.from_string(WHITE)
+
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def new_presentation(template_path: Optional[str] = None) -> Presentation:
+    """Fresh presentation loaded from the cached base template"""
+    return Presentation(io.BytesIO(_template_bytes(template_path)))
+
+# ----------------------------------------------------------------------------
+# Shape helpers
+# ----------------------------------------------------------------------------
+
+def add_box(slide, x, y, width, height, fill=None, line=None, line_width=2, shape=MSO_SHAPE.ROUNDED_RECTANGLE):
+    """Add a filled shape; positions are in inches"""
+    box = slide.shapes.add_shape(shape, Inches(x), Inches(y), Inches(width), Inches(height))
+    if fill is not None:
         box.fill.solid()
-        box.fill.fore_color.rgb = RGBColor(255, 255, 255)
-        box.line.color.rgb = color
-        box.line.width = Pt(3)
-        
-        # Value
-        val_box = slide5.shapes.add_textbox(x_pos, metric_y + Inches(0.15), Inches(2), Inches(0.4))
-        vf = val_box.text_frame
-        vf.text = value
-        vf.paragraphs[0].font.size = Pt(24)
-        vf.paragraphs[0].font.bold = True
-        vf.paragraphs[0].font.color.rgb = color
-        vf.paragraphs[0].alignment = PP_ALIGN.CENTER
-        
-        # Label
-        lab_box = slide5.shapes.add_textbox(x_pos, metric_y + Inches(0.6), Inches(2), Inches(0.3))
-        lf = lab_box.text_frame
-        lf.text = label
-        lf.paragraphs[0].font.size = Pt(11)
-        lf.paragraphs[0].font.color.rgb = DARK_GRAY
-        lf.paragraphs[0].alignment = PP_ALIGN.CENTER
-    
-    # Before/After comparison
-    comparison = slide5.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE,
-        Inches(0.8), Inches(3.2), Inches(8.4), Inches(2.8)
-    )
-    comparison.fill.solid()
-    comparison.fill.fore_color.rgb = LIGHT_GRAY
-    comparison.line.fill.background()
-    
-    # Table header
-    headers = ["Aspect", "Before", "After", "Improvement"]
-    header_y = Inches(3.3)
-    col_widths = [Inches(2.5), Inches(2), Inches(2), Inches(1.9)]
-    x_start = Inches(0.9)
-    
-    for i, header in enumerate(headers):
-        x_pos = x_start + sum(col_widths[:i])
-        hbox = slide5.shapes.add_textbox(x_pos, header_y, col_widths[i], Inches(0.3))
-        hf = hbox.text_frame
-        hf.text = header
-        hf.paragraphs[0].font.size = Pt(12)
-        hf.paragraphs[0].font.bold = True
-        hf.paragraphs[0].font.color.rgb = DARK_BLUE
-    
-    # Table rows
-    rows = [
-        ("Query Method", "Manual SQL", "Natural language", "100%"),
-        ("Tool Selection", "Manual", "Automatic", "100%"),
-        ("Context", "Restart each", "Continuous", "100%"),
-        ("Setup Time", "Hours", "Minutes", "90%")
-    ]
-    
-    row_y_start = Inches(3.7)
-    for i, row in enumerate(rows):
-        row_y = row_y_start + (i * Inches(0.45))
-        for j, cell in enumerate(row):
-            x_pos = x_start + sum(col_widths[:j])
-            cbox = slide5.shapes.add_textbox(x_pos, row_y, col_widths[j], Inches(0.4))
-            cf = cbox.text_frame
-            cf.text = cell
-            cf.paragraphs[0].font.size = Pt(10)
-            cf.paragraphs[0].font.color.rgb = DARK_GRAY
-            if j == 3:  # Improvement column
-                cf.paragraphs[0].font.color.rgb = GREEN
-                cf.paragraphs[0].font.bold = True
-    
-    # Slide 6: ROI & Conclusion
-    slide6 = prs.slides.add_slide(prs.slide_layouts[6])
-    add_slide_title(slide6, "ROI & Strategic Value", DARK_BLUE)
-    
-    # ROI Section
-    roi_box = slide6.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE,
-        Inches(0.8), Inches(1.8), Inches(4), Inches(2.5)
-    )
-    roi_box.fill.solid()
-    roi_box.fill.fore_color.rgb = RGBColor(240, 253, 244)
-    roi_box.line.color.rgb = GREEN
-    roi_box.line.width = Pt(3)
-    
-    roi_title = slide6.shapes.add_textbox(Inches(1), Inches(1.9), Inches(3.6), Inches(0.4))
-    rtf = roi_title.text_frame
-    rtf.text = "Time Savings"
-    rtf.paragraphs[0].font.size = Pt(18)
-    rtf.paragraphs[0].font.bold = True
-    rtf.paragraphs[0].font.color.rgb = GREEN
-    
-    roi_content = slide6.shapes.add_textbox(Inches(1), Inches(2.4), Inches(3.6), Inches(1.8))
-    rcf = roi_content.text_frame
-    rcf.text = "⏱️ 80% reduction in time\n   to get sales insights\n\n⏱️ 90% reduction in\n   policy lookup time\n\n⏱️ 70% reduction in\n   training time"
-    rcf.paragraphs[0].font.size = Pt(13)
-    rcf.paragraphs[0].font.color.rgb = DARK_GRAY
-    
-    # Success Factors
-    success_box = slide6.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE,
-        Inches(5.2), Inches(1.8), Inches(4), Inches(2.5)
-    )
-    success_box.fill.solid()
-    success_box.fill.fore_color.rgb = RGBColor(239, 246, 255)
-    success_box.line.color.rgb = SNOWFLAKE_BLUE
-    success_box.line.width = Pt(3)
-    
-    success_title = slide6.shapes.add_textbox(Inches(5.4), Inches(1.9), Inches(3.6), Inches(0.4))
-    stf = success_title.text_frame
-    stf.text = "Success Factors"
-    stf.paragraphs[0].font.size = Pt(18)
-    stf.paragraphs[0].font.bold = True
-    stf.paragraphs[0].font.color.rgb = SNOWFLAKE_BLUE
-    
-    success_content = slide6.shapes.add_textbox(Inches(5.4), Inches(2.4), Inches(3.6), Inches(1.8))
-    scf = success_content.text_frame
-    scf.text = "✅ Native Snowflake Features\n\n✅ User-Centric Design\n\n✅ Robust Engineering\n\n✅ Enterprise Standards"
-    scf.paragraphs[0].font.size = Pt(13)
-    scf.paragraphs[0].font.color.rgb = DARK_GRAY
-    
-    # Strategic Advantages
-    strat_box = slide6.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE,
-        Inches(0.8), Inches(4.6), Inches(8.4), Inches(1.8)
-    )
-    strat_box.fill.solid()
-    strat_box.fill.fore_color.rgb = LIGHT_GRAY
-    strat_box.line.fill.background()
-    
-    strat_title = slide6.shapes.add_textbox(Inches(1), Inches(4.7), Inches(8), Inches(0.4))
-    sttf = strat_title.text_frame
-    sttf.text = "Strategic Advantages"
-    sttf.paragraphs[0].font.size = Pt(16)
-    sttf.paragraphs[0].font.bold = True
-    sttf.paragraphs[0].font.color.rgb = DARK_BLUE
-    
-    strat_content = slide6.shapes.add_textbox(Inches(1), Inches(5.2), Inches(8), Inches(1.1))
-    stcf = strat_content.text_frame
-    stcf.text = "🎯 Democratized data access across organization\n🎯 Consistent data interpretation and reporting\n🎯 Scalable foundation for AI-driven insights"
-    stcf.paragraphs[0].font.size = Pt(13)
-    stcf.paragraphs[0].font.color.rgb = DARK_GRAY
-    
-    # Save presentation
-    prs.save('Cortex_Agent_Presentation.pptx')
-    print("✅ Presentation created successfully: Cortex_Agent_Presentation.pptx")
+        box.fill.fore_color.rgb = RGBColor.from_string(fill)
+    if line is None:
+        box.line.fill.background()
+    else:
+        box.line.color.rgb = RGBColor.from_string(line)
+        box.line.width = Pt(line_width)
+    return box
+
+
+def add_text(slide, x, y, width, height, text, size, color=DARK_GRAY, bold=False,
+             italic=False, align=None, font_name=None):
+    """Add a text box styled through its first paragraph; positions are in inches"""
+    text_box = slide.shapes.add_textbox(Inches(x), Inches(y), Inches(width), Inches(height))
+    frame = text_box.text_frame
+    frame.text = text
+    para = frame.paragraphs[0]
+    para.font.size = Pt(size)
+    para.font.color.rgb = RGBColor.from_string(color)
+    if bold:
+        para.font.bold = True
+    if italic:
+        para.font.italic = True
+    if align is not None:
+        para.alignment = align
+    if font_name:
+        para.font.name = font_name
+    return text_box
+
 
 def add_slide_title(slide, title_text, color):
     """Add a title to a slide"""
-    title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(0.7))
-    title_frame = title_box.text_frame
-    title_frame.text = title_text
-    title_para = title_frame.paragraphs[0]
-    title_para.font.size = Pt(32)
-    title_para.font.bold = True
-    title_para.font.color.rgb = color
+    add_text(slide, 0.5, 0.5, 9, 0.7, title_text, 32, color=color, bold=True)
+
 
 def add_feature_box(slide, feature, primary_color, text_color, accent_color):
     """Add a feature box to a slide"""
-    # Main box
-    box = slide.shapes.add_shape(
-        MSO_SHAPE.ROUNDED_RECTANGLE,
-        feature["x"], feature["y"], Inches(4.5), Inches(2.3)
-    )
-    box.fill.solid()
-    box.fill.fore_color.rgb = RGBColor(255, 255, 255)
-    box.line.color.rgb = primary_color
-    box.line.width = Pt(2)
-    
-    # Icon
-    icon_box = slide.shapes.add_textbox(feature["x"] + Inches(0.2), feature["y"] + Inches(0.1), Inches(0.5), Inches(0.5))
-    icon_frame = icon_box.text_frame
-    icon_frame.text = feature["icon"]
-    icon_frame.paragraphs[0].font.size = Pt(32)
-    
-    # Title
-    title_box = slide.shapes.add_textbox(feature["x"] + Inches(0.8), feature["y"] + Inches(0.15), Inches(3.5), Inches(0.4))
-    title_frame = title_box.text_frame
-    title_frame.text = feature["title"]
-    title_frame.paragraphs[0].font.size = Pt(14)
-    title_frame.paragraphs[0].font.bold = True
-    title_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    # Problem
-    prob_box = slide.shapes.add_textbox(feature["x"] + Inches(0.2), feature["y"] + Inches(0.7), Inches(4.1), Inches(0.3))
-    prob_frame = prob_box.text_frame
-    prob_frame.text = f"Problem: {feature['problem']}"
-    prob_frame.paragraphs[0].font.size = Pt(10)
-    prob_frame.paragraphs[0].font.italic = True
-    prob_frame.paragraphs[0].font.color.rgb = text_color
-    
-    # Solution
-    sol_box = slide.shapes.add_textbox(feature["x"] + Inches(0.2), feature["y"] + Inches(1.1), Inches(4.1), Inches(1.1))
-    sol_frame = sol_box.text_frame
-    sol_frame.text = f"Solution:\n{feature['solution']}"
-    sol_frame.paragraphs[0].font.size = Pt(10)
-    sol_frame.paragraphs[0].font.color.rgb = text_color
+    x, y = feature["x"], feature["y"]
+    add_box(slide, x, y, 4.5, 2.3, fill=WHITE, line=primary_color)
+    add_text(slide, x + 0.2, y + 0.1, 0.5, 0.5, feature["icon"], 32, color=text_color)
+    add_text(slide, x + 0.8, y + 0.15, 3.5, 0.4, feature["title"], 14, color=primary_color, bold=True)
+    add_text(slide, x + 0.2, y + 0.7, 4.1, 0.3, f"Problem: {feature['problem']}", 10, color=text_color, italic=True)
+    add_text(slide, x + 0.2, y + 1.1, 4.1, 1.1, f"Solution:\n{feature['solution']}", 10, color=text_color)
+
+# ----------------------------------------------------------------------------
+# Slide renderers, one per spec "type"
+# ----------------------------------------------------------------------------
+
+def render_title(slide, spec):
+    add_text(slide, 0.5, 2, 9, 1.5, spec["title"], 54, color=DARK_BLUE, bold=True, align=PP_ALIGN.CENTER)
+    add_text(slide, 0.5, 3.5, 9, 0.8, spec["subtitle"], 28, color=SNOWFLAKE_BLUE, align=PP_ALIGN.CENTER)
+
+    box_width, start_x, start_y, spacing = 2, 1, 5, 0.3
+    for i, (title, desc) in enumerate(spec["highlights"]):
+        x_pos = start_x + (i * (box_width + spacing))
+        add_box(slide, x_pos, start_y, box_width, 1.2, fill=WHITE, line=SNOWFLAKE_BLUE)
+        add_text(slide, x_pos, start_y + 0.1, box_width, 0.5, title, 12, color=DARK_BLUE, bold=True, align=PP_ALIGN.CENTER)
+        add_text(slide, x_pos, start_y + 0.6, box_width, 0.5, desc, 9, align=PP_ALIGN.CENTER)
+
+
+def render_layers(slide, spec):
+    add_slide_title(slide, spec["title"], DARK_BLUE)
+    for layer_name, content, y_pos, color in spec["layers"]:
+        add_box(slide, 1, y_pos, 8, 1.2, fill=WHITE, line=color, line_width=3)
+        add_text(slide, 1.2, y_pos + 0.1, 7.6, 0.3, layer_name, 14, color=color, bold=True)
+        add_text(slide, 1.2, y_pos + 0.45, 7.6, 0.7, content, 11)
+
+        # Add arrow between layers (except last)
+        if y_pos < 4.5:
+            add_box(slide, 4.7, y_pos + 1.3, 0.6, 0.4, fill=DARK_GRAY, shape=MSO_SHAPE.DOWN_ARROW)
+
+
+def render_features(slide, spec):
+    add_slide_title(slide, spec["title"], DARK_BLUE)
+    for feature in spec["features"]:
+        add_feature_box(slide, feature, SNOWFLAKE_BLUE, DARK_GRAY, GREEN)
+
+
+def _render_panel(slide, panel, x, width):
+    color = panel["color"]
+    add_box(slide, x, 1.5, width, 5, fill=PANEL_GRAY, line=color)
+    add_text(slide, x + 0.2, 1.6, width - 0.4, 0.4, panel["title"], 18, color=color, bold=True)
+    if "items" in panel:
+        frame = slide.shapes.add_textbox(Inches(x + 0.2), Inches(2.2), Inches(width - 0.4), Inches(4)).text_frame
+        for item in panel["items"]:
+            p = frame.add_paragraph()
+            p.text = f"• {item}"
+            p.font.size = Pt(11)
+            p.font.color.rgb = RGBColor.from_string(DARK_GRAY)
+            p.level = 0
+    else:
+        add_text(slide, x + 0.2, 2.1, width - 0.4, 4.2, panel["text"], 11,
+                 font_name='Courier New' if panel.get("monospace") else None)
+
+
+def render_two_panels(slide, spec):
+    add_slide_title(slide, spec["title"], DARK_BLUE)
+    _render_panel(slide, spec["left"], 0.5, 4.5)
+    _render_panel(slide, spec["right"], 5.2, 4.3)
+
+
+def render_metrics(slide, spec):
+    add_slide_title(slide, spec["title"], DARK_BLUE)
+
+    metric_y = 1.8
+    for i, (label, value) in enumerate(spec["metrics"]):
+        x_pos = 0.8 + (i * 2.2)
+        add_box(slide, x_pos, metric_y, 2, 1, fill=WHITE, line=GREEN, line_width=3)
+        add_text(slide, x_pos, metric_y + 0.15, 2, 0.4, value, 24, color=GREEN, bold=True, align=PP_ALIGN.CENTER)
+        add_text(slide, x_pos, metric_y + 0.6, 2, 0.3, label, 11, align=PP_ALIGN.CENTER)
+
+    # Before/After comparison
+    add_box(slide, 0.8, 3.2, 8.4, 2.8, fill=LIGHT_GRAY)
+    col_widths = [2.5, 2, 2, 1.9]
+    x_start = 0.9
+    for i, header in enumerate(spec["headers"]):
+        add_text(slide, x_start + sum(col_widths[:i]), 3.3, col_widths[i], 0.3, header, 12, color=DARK_BLUE, bold=True)
+
+    for i, row in enumerate(spec["rows"]):
+        row_y = 3.7 + (i * 0.45)
+        for j, cell in enumerate(row):
+            improvement = j == len(col_widths) - 1
+            add_text(slide, x_start + sum(col_widths[:j]), row_y, col_widths[j], 0.4, cell, 10,
+                     color=GREEN if improvement else DARK_GRAY, bold=improvement)
+
+
+def render_conclusion(slide, spec):
+    add_slide_title(slide, spec["title"], DARK_BLUE)
+    for i, (title, text, color, fill) in enumerate(spec["panels"]):
+        x = 0.8 + i * 4.4
+        add_box(slide, x, 1.8, 4, 2.5, fill=fill, line=color, line_width=3)
+        add_text(slide, x + 0.2, 1.9, 3.6, 0.4, title, 18, color=color, bold=True)
+        add_text(slide, x + 0.2, 2.4, 3.6, 1.8, text, 13)
+
+    add_box(slide, 0.8, 4.6, 8.4, 1.8, fill=LIGHT_GRAY)
+    add_text(slide, 1, 4.7, 8, 0.4, spec["footer_title"], 16, color=DARK_BLUE, bold=True)
+    add_text(slide, 1, 5.2, 8, 1.1, spec["footer"], 13)
+
+
+def render_bullets(slide, spec):
+    """Generic slide: a title and up to two columns of headed bullet lists"""
+    add_slide_title(slide, spec["title"], DARK_BLUE)
+    columns = spec["columns"][:2]
+    width = 8.8 / max(len(columns), 1) - 0.2
+    for i, column in enumerate(columns):
+        x = 0.5 + i * (width + 0.4)
+        add_box(slide, x, 1.5, width, 5.5, fill=PANEL_GRAY, line=SNOWFLAKE_BLUE)
+        add_text(slide, x + 0.2, 1.6, width - 0.4, 0.4, column["heading"], 16, color=DARK_BLUE, bold=True)
+        frame = slide.shapes.add_textbox(Inches(x + 0.2), Inches(2.1), Inches(width - 0.4), Inches(4.7)).text_frame
+        frame.word_wrap = True
+        frame.vertical_anchor = MSO_ANCHOR.TOP
+        for item in column["items"]:
+            p = frame.add_paragraph()
+            p.text = f"• {item}"
+            p.font.size = Pt(11)
+            p.font.color.rgb = RGBColor.from_string(DARK_GRAY)
+
+
+SLIDE_RENDERERS = {
+    "title": render_title,
+    "layers": render_layers,
+    "features": render_features,
+    "two_panels": render_two_panels,
+    "metrics": render_metrics,
+    "conclusion": render_conclusion,
+    "bullets": render_bullets,
+}
+
+# ----------------------------------------------------------------------------
+# Content from PRESENTATION_CONTENT.md
+# ----------------------------------------------------------------------------
+
+def _clean_markdown(text: str) -> str:
+    return re.sub(r"[*`]", "", text).strip()
+
+
+def load_content_sections(path: str = CONTENT_FILE, max_items: int = 8) -> List[Dict]:
+    """Turn each '## SLIDE n: Title' section into a bullets spec built from its '####' blocks"""
+    slides = []
+    current = None
+    column = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip()
+            match = re.match(r"^## SLIDE \d+:\s*(.+)$", line)
+            if match:
+                current = {"type": "bullets", "title": _clean_markdown(match.group(1)), "columns": []}
+                slides.append(current)
+                column = None
+            elif line.startswith("## "):
+                current = None  # appendix, formatting guide, presenter notes
+            elif current is not None and line.startswith("#### "):
+                column = {"heading": _clean_markdown(line[5:]).rstrip(":"), "items": []}
+                current["columns"].append(column)
+            elif column is not None and line.startswith("- ") and len(column["items"]) < max_items:
+                column["items"].append(_clean_markdown(line[2:]))
+    return [s for s in slides if any(c["items"] for c in s["columns"])]
+
+# ----------------------------------------------------------------------------
+# Deck generation
+# ----------------------------------------------------------------------------
+
+def _fill(value, variables: Dict[str, str]):
+    """Apply {placeholder} variables to every string inside a spec"""
+    if not variables:
+        return value
+    if isinstance(value, str):
+        return value.format_map(_Defaulting(variables))
+    if isinstance(value, list):
+        return [_fill(v, variables) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_fill(v, variables) for v in value)
+    if isinstance(value, dict):
+        return {k: _fill(v, variables) for k, v in value.items()}
+    return value
+
+
+class _Defaulting(dict):
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def build_deck(slides: Sequence[Dict], variables: Optional[Dict[str, str]] = None,
+               template_path: Optional[str] = None) -> Presentation:
+    """Render slide specs onto a presentation loaded from the cached template"""
+    prs = new_presentation(template_path)
+    layout = prs.slide_layouts[BLANK_LAYOUT]
+    for spec in slides:
+        spec = _fill(spec, variables or {})
+        slide = prs.slides.add_slide(layout)
+        if spec.get("background") is not None:
+            slide.background.fill.solid()
+            slide.background.fill.fore_color.rgb = RGBColor.from_string(spec["background"])
+        SLIDE_RENDERERS[spec["type"]](slide, spec)
+    return prs
+
+
+def generate_deck(job: Tuple[str, Sequence[Dict], Optional[Dict[str, str]]]) -> str:
+    """Worker entry point: build one deck and save it; returns the output path"""
+    output_path, slides, variables = job
+    build_deck(slides, variables).save(output_path)
+    return output_path
+
+
+def generate_decks(jobs: List[Tuple[str, Sequence[Dict], Optional[Dict[str, str]]]], workers: int = 1) -> List[str]:
+    """Generate many decks, in parallel worker processes when workers > 1"""
+    if workers <= 1 or len(jobs) <= 1:
+        return [generate_deck(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_template_bytes) as pool:
+        return list(pool.map(generate_deck, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def create_presentation():
+    """Create the complete PowerPoint presentation"""
+    generate_deck((OUTPUT_FILE, DECK_SPEC, None))
+    print(f"✅ Presentation created successfully: {OUTPUT_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Cortex Agent presentation decks")
+    parser.add_argument("--variants", help="Comma-separated values (e.g. regions); one deck is generated per value")
+    parser.add_argument("--variable", default="audience", help="Placeholder name the variant value is bound to")
+    parser.add_argument("--content", action="store_true", help=f"Append slides built from {CONTENT_FILE}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out-dir", default=".")
+    args = parser.parse_args()
+
+    if not args.variants and not args.content:
+        create_presentation()
+        return
+
+    slides = list(DECK_SPEC)
+    if args.content:
+        slides += load_content_sections()
+    if args.variants:
+        # Variant decks carry the value under the title slide's subtitle
+        slides[0] = dict(slides[0], subtitle=slides[0]["subtitle"] + "\n{" + args.variable + "}")
+
+    variants = [v.strip() for v in args.variants.split(",")] if args.variants else [None]
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = []
+    for value in variants:
+        name = OUTPUT_FILE if value is None else OUTPUT_FILE.replace(".pptx", f"_{re.sub(r'[^A-Za-z0-9]+', '_', value)}.pptx")
+        jobs.append((os.path.join(args.out_dir, name), slides, {args.variable: value} if value else None))
+
+    started = time.perf_counter()
+    paths = generate_decks(jobs, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(paths)} presentation(s) created in {elapsed:.1f}s ({len(paths) / elapsed * 60:.0f} decks/min)")
+
 
 if __name__ == "__main__":
     try:
-        create_presentation()
+        main()
     except Exception as e:
         print(f"❌ Error creating presentation: {str(e)}")
         import traceback
@@ -0,0 +1,146 @@
+"""
+Offline precompute of answers for the most asked policy questions
+Mines JSONL query logs for search-only (policy/FAQ) questions, groups them by
+sales_assistant.faq.question_key, answers the top N through the app's search-only agent
+call and stores the answers and citations in FAQ_ANSWERS for the current version of
+DOCS_CHUNKS_TABLE. The Streamlit app serves matching questions from memory; rerun this
+after re-ingesting docs (answers for an older corpus are never served).
+
+Log lines: {"question": "...", "route": "..."}  ("query" is accepted for "question"; lines with
+a route are kept when it is search/local_index/faq, lines without one when keyword routing
+sends them to search only). The app's query log (sales_assistant.querylog) and batch_qa.py
+inputs and outputs qualify; --log defaults to the query log directory.
+
+Usage: python faq_precompute.py --connection NAME [--log queries.jsonl] [--log LOG_DIR]
+                                [--top 50] [--min-count 2] [--model claude-sonnet-4-5]
+                                [--concurrency 4] [--dry-run]
+"""
+
+import argparse
+import datetime
+import json
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from sales_assistant import admission, router, session as core_session
+from sales_assistant.faq import FAQ_TABLE, corpus_version, question_key
+from sales_assistant.querylog import QUERY_LOG_DIR, read_records
+
+SEARCH_ROUTES = {"search", "local_index", "faq"}
+
+
+def is_policy_question(record: Dict) -> bool:
+    route = record.get("route")
+    if route:
+        return route in SEARCH_ROUTES
+    intent = router.keyword_intent(record["question"])
+    return intent["needs_search"] and not intent["needs_analyst"]
+
+
+def read_log(paths: Iterable[str]) -> Iterable[Dict]:
+    for record in read_records(paths):
+        question = (record.get("question") or record.get("query") or "").strip()
+        if question:
+            yield {"question": question, "route": record.get("route")}
+
+
+def mine_questions(records: Iterable[Dict], top: int, min_count: int = 1) -> List[Dict]:
+    """Top policy questions by frequency of their key; each keeps its most common wording"""
+    counts: Counter = Counter()
+    wordings: Dict[str, Counter] = defaultdict(Counter)
+    for record in records:
+        if not is_policy_question(record):
+            continue
+        key = question_key(record["question"])
+        if key:
+            counts[key] += 1
+            wordings[key][record["question"]] += 1
+    return [
+        {"key": key, "question": wordings[key].most_common(1)[0][0], "count": count}
+        for key, count in counts.most_common(top) if count >= min_count
+    ]
+
+
+def answer_question(item: Dict, model: str) -> Optional[Dict]:
+    """Search-only answer for a mined question; None when the agent call failed or said nothing"""
+    result = router.ask_agent(item["question"], model, "search_only")
+    if not result.text.strip() or any(n.level in ("warning", "error") for n in result.notices):
+        return None
+    return {**item, "answer": result.text, "citations": result.citations}
+
+
+def ensure_table(session):
+    session.sql(f"""
+        CREATE TABLE IF NOT EXISTS {FAQ_TABLE} (
+            QUESTION_KEY VARCHAR,
+            QUESTION VARCHAR,
+            ASK_COUNT INTEGER,
+            ANSWER VARCHAR,
+            CITATIONS VARCHAR,
+            MODEL VARCHAR,
+            CORPUS_VERSION VARCHAR,
+            CREATED_AT TIMESTAMP_LTZ
+        )
+    """).collect()
+
+
+def store_answers(session, answers: List[Dict], version: str, model: str):
+    """Replace the stored answers; rows for other corpus versions could never be served again
+
+    The new rows are written to a staging table that is then swapped in, so the app reads
+    either the old set or the new one, never an empty or half-written table.
+    """
+    ensure_table(session)
+    staging = f"{FAQ_TABLE}_STAGING"
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    rows = [
+        (a["key"], a["question"], a["count"], a["answer"], json.dumps(a["citations"]), model, version, created_at)
+        for a in answers
+    ]
+    session.sql(f"CREATE OR REPLACE TABLE {staging} LIKE {FAQ_TABLE}").collect()
+    try:
+        if rows:
+            session.create_dataframe(
+                rows,
+                schema=["QUESTION_KEY", "QUESTION", "ASK_COUNT", "ANSWER", "CITATIONS", "MODEL", "CORPUS_VERSION", "CREATED_AT"],
+            ).write.mode("append").save_as_table(staging, column_order="name")
+        session.sql(f"ALTER TABLE {staging} SWAP WITH {FAQ_TABLE}").collect()
+    finally:
+        session.sql(f"DROP TABLE IF EXISTS {staging}").collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connection", required=True, help="Snowflake connection name")
+    parser.add_argument("--log", action="append", help="JSONL query log file or directory (repeatable)")
+    parser.add_argument("--top", type=int, default=50, help="Questions to precompute")
+    parser.add_argument("--min-count", type=int, default=2, help="Skip questions asked fewer times")
+    parser.add_argument("--model", default="claude-sonnet-4-5")
+    parser.add_argument("--concurrency", type=int, default=4, help="Agent calls in flight at once")
+    parser.add_argument("--dry-run", action="store_true", help="Print the mined questions and stop")
+    args = parser.parse_args()
+
+    questions = mine_questions(read_log(args.log or [QUERY_LOG_DIR]), args.top, args.min_count)
+    if args.dry_run:
+        for item in questions:
+            print(f"  {item['count']:>6}  {item['key']:<30} {item['question']}")
+        return
+
+    from snowflake.snowpark import Session
+
+    session = Session.builder.config("connection_name", args.connection).create()
+    try:
+        core_session.configure(session)
+        admission.configure(max_in_flight=args.concurrency, user_rate=None, max_queue=1 << 20, max_wait=float("inf"))
+        version = corpus_version(session)
+        with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as pool:
+            answers = [a for a in pool.map(lambda item: answer_question(item, args.model), questions) if a]
+        store_answers(session, answers, version, args.model)
+        print(json.dumps({"mined": len(questions), "stored": len(answers), "corpus_version": version}, indent=2))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Incremental ingestion of the @DOCS stage into DOCS_CHUNKS_TABLE
+Only PDFs/JPEGs (.jpeg or .jpg) whose checksum changed are parsed and chunked (in worker processes),
+and only chunks whose text changed are rewritten, so Cortex Search re-indexes deltas only
+
+Usage: python ingest_docs.py --connection NAME [--stage @DOCS] [--workers 4] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sales_assistant.citations import DOCUMENT_EXTENSIONS, document_kind
+
+try:  # Optional: local PDF text extraction, otherwise AI_PARSE_DOCUMENT runs in the warehouse
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+DOCS_STAGE = "@DOCS"
+CHUNKS_TABLE = "DOCS_CHUNKS_TABLE"
+MANIFEST_TABLE = "DOCS_INGEST_MANIFEST"
+
+# Same settings as SPLIT_TEXT_RECURSIVE_CHARACTER in Cortex_Search_Queries.sql
+CHUNK_SIZE = 1512
+CHUNK_OVERLAP = 256
+SEPARATORS = ["\n\n", "\n", " "]
+
+SUPPORTED_EXTENSIONS = DOCUMENT_EXTENSIONS
+INSERT_BATCH_ROWS = 5000
+
+
+# ---------------------------------------------------------------------- chunking
+
+def _split_point(buffer: str, size: int) -> int:
+    """Best place to cut the buffer at or before `size`, preferring coarse separators"""
+    window = buffer[:size]
+    for separator in SEPARATORS:
+        cut = window.rfind(separator)
+        if cut > size // 2:
+            return cut + len(separator)
+    return size
+
+
+def stream_chunks(pieces: Iterable[str], size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """Recursive-character chunking over a stream of text pieces (e.g. PDF pages)
+
+    At most one piece plus two chunks of text are held in memory at a time.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= size * 2:
+            cut = _split_point(buffer, size)
+            chunk = buffer[:cut].strip()
+            if chunk:
+                yield chunk
+            buffer = buffer[max(cut - overlap, 0):] if cut > overlap else buffer[cut:]
+
+    while buffer.strip():
+        if len(buffer) <= size:
+            yield buffer.strip()
+            return
+        cut = _split_point(buffer, size)
+        chunk = buffer[:cut].strip()
+        if chunk:
+            yield chunk
+        buffer = buffer[max(cut - overlap, 0):] if cut > overlap else buffer[cut:]
+
+
+def _pdf_pages(path: str) -> Iterator[str]:
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield (page.extract_text() or "") + "\n\n"
+
+
+def chunk_file(local_path: str, text_path: Optional[str] = None) -> Tuple[str, int]:
+    """Worker: chunk one file and write `{"chunk", "md5"}` lines next to it; returns (jsonl path, count)
+
+    `text_path` holds text already extracted in the warehouse (JPEG OCR or PDFs without pypdf).
+    """
+    if text_path is not None:
+        def pieces():
+            with open(text_path, "r", encoding="utf-8") as f:
+                while True:
+                    block = f.read(CHUNK_SIZE * 4)
+                    if not block:
+                        return
+                    yield block
+        source = pieces()
+    else:
+        source = _pdf_pages(local_path)
+
+    out_path = local_path + ".chunks.jsonl"
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for chunk in stream_chunks(source):
+            md5 = hashlib.md5(chunk.encode("utf-8")).hexdigest()
+            out.write(json.dumps({"chunk": chunk, "md5": md5}) + "\n")
+            count += 1
+    return out_path, count
+
+
+# ---------------------------------------------------------------------- warehouse side
+
+def ensure_manifest(session):
+    session.sql(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            RELATIVE_PATH VARCHAR,
+            MD5 VARCHAR,
+            CHUNK_COUNT INTEGER,
+            INGESTED_AT TIMESTAMP_LTZ
+        )
+    """).collect()
+
+
+def list_stage(session, stage: str = DOCS_STAGE) -> Dict[str, str]:
+    """RELATIVE_PATH -> md5 for every supported file on the stage"""
+    files = {}
+    for row in session.sql(f"LIST {stage}").collect():
+        name = row["name"]
+        relative_path = name.split("/", 1)[1] if "/" in name else name
+        if relative_path.lower().endswith(SUPPORTED_EXTENSIONS):
+            files[relative_path] = row["md5"]
+    return files
+
+
+def changed_files(session, stage_files: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """(files whose checksum differs from the manifest, files no longer on the stage)"""
+    manifest = {row["RELATIVE_PATH"]: row["MD5"]
+                for row in session.sql(f"SELECT RELATIVE_PATH, MD5 FROM {MANIFEST_TABLE}").collect()}
+    changed = sorted(path for path, md5 in stage_files.items() if manifest.get(path) != md5)
+    removed = sorted(path for path in manifest if path not in stage_files)
+    return changed, removed
+
+
+def _warehouse_text(session, stage: str, relative_path: str, target: str) -> str:
+    """Extract text with AI_PARSE_DOCUMENT (OCR for images, layout for PDFs) into a local file"""
+    mode = "LAYOUT" if document_kind(relative_path) == "text" else "OCR"
+    row = session.sql(
+        f"SELECT TO_VARCHAR(AI_PARSE_DOCUMENT(TO_FILE('{stage}', ?), {{'mode': '{mode}'}}):content)",
+        params=[relative_path],
+    ).collect()[0]
+    text_path = target + ".txt"
+    with open(text_path, "w", encoding="utf-8") as f:
+        f.write(row[0] or "")
+    return text_path
+
+
+def _existing_chunks(session, relative_path: str) -> Dict[str, List[int]]:
+    """md5 of chunk text -> CHUNK_INDEX values of rows already loaded for this file"""
+    rows = session.sql(
+        f"SELECT MD5(CHUNK) AS CHUNK_MD5, CHUNK_INDEX FROM {CHUNKS_TABLE} WHERE RELATIVE_PATH = ?",
+        params=[relative_path],
+    ).collect()
+    existing: Dict[str, List[int]] = {}
+    for row in rows:
+        existing.setdefault(row["CHUNK_MD5"], []).append(int(row["CHUNK_INDEX"]))
+    return existing
+
+
+def plan_chunk_delta(existing: Dict[str, List[int]], chunks_path: str):
+    """Match new chunks to existing rows by content so unchanged chunks keep their CHUNK_INDEX
+
+    Returns (rows to insert as (chunk, index), indexes to delete). New chunks get indexes after
+    the current maximum, so an edit in the middle of a manual does not renumber everything after it.
+    """
+    unused = {md5: sorted(indexes) for md5, indexes in existing.items()}
+    next_index = max((i for indexes in existing.values() for i in indexes), default=-1) + 1
+    inserts = []
+    with open(chunks_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if unused.get(record["md5"]):
+                unused[record["md5"]].pop(0)
+                continue
+            inserts.append((record["chunk"], next_index))
+            next_index += 1
+    return inserts, sorted(i for indexes in unused.values() for i in indexes)
+
+
+def apply_delta(session, relative_path: str, inserts: List[Tuple[str, int]], deletes: List[int]):
+    if deletes:
+        for start in range(0, len(deletes), 1000):
+            batch = deletes[start:start + 1000]
+            placeholders = ", ".join("?" for _ in batch)
+            session.sql(
+                f"DELETE FROM {CHUNKS_TABLE} WHERE RELATIVE_PATH = ? AND CHUNK_INDEX IN ({placeholders})",
+                params=[relative_path, *batch],
+            ).collect()
+
+    for start in range(0, len(inserts), INSERT_BATCH_ROWS):
+        rows = [(relative_path, chunk, index) for chunk, index in inserts[start:start + INSERT_BATCH_ROWS]]
+        session.create_dataframe(rows, schema=["RELATIVE_PATH", "CHUNK", "CHUNK_INDEX"]) \
+            .write.mode("append").save_as_table(CHUNKS_TABLE, column_order="name")
+
+
+def record_manifest(session, relative_path: str, md5: str, chunk_count: int):
+    session.sql(
+        f"""
+        MERGE INTO {MANIFEST_TABLE} m
+        USING (SELECT ? AS RELATIVE_PATH, ? AS MD5, ? AS CHUNK_COUNT) s
+        ON m.RELATIVE_PATH = s.RELATIVE_PATH
+        WHEN MATCHED THEN UPDATE SET MD5 = s.MD5, CHUNK_COUNT = s.CHUNK_COUNT, INGESTED_AT = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN INSERT (RELATIVE_PATH, MD5, CHUNK_COUNT, INGESTED_AT)
+            VALUES (s.RELATIVE_PATH, s.MD5, s.CHUNK_COUNT, CURRENT_TIMESTAMP())
+        """,
+        params=[relative_path, md5, chunk_count],
+    ).collect()
+
+
+def remove_files(session, removed: List[str]):
+    for relative_path in removed:
+        session.sql(f"DELETE FROM {CHUNKS_TABLE} WHERE RELATIVE_PATH = ?", params=[relative_path]).collect()
+        session.sql(f"DELETE FROM {MANIFEST_TABLE} WHERE RELATIVE_PATH = ?", params=[relative_path]).collect()
+
+
+# ---------------------------------------------------------------------- pipeline
+
+def ingest(session, stage: str = DOCS_STAGE, workers: int = os.cpu_count() or 2, dry_run: bool = False) -> Dict:
+    """Run one incremental ingestion pass and return a summary"""
+    started = time.perf_counter()
+    ensure_manifest(session)
+    stage_files = list_stage(session, stage)
+    changed, removed = changed_files(session, stage_files)
+    summary = {"files_on_stage": len(stage_files), "changed": changed, "removed": removed,
+               "inserted_chunks": 0, "deleted_chunks": 0}
+    if dry_run or not (changed or removed):
+        summary["seconds"] = round(time.perf_counter() - started, 2)
+        return summary
+
+    with tempfile.TemporaryDirectory(prefix="docs_ingest_") as workdir:
+        # Downloads and warehouse-side OCR need the session, so they stay in this process
+        jobs = {}
+        for i, relative_path in enumerate(changed):
+            target_dir = os.path.join(workdir, str(i))
+            local_path = os.path.join(target_dir, os.path.basename(relative_path))
+            text_path = None
+            if document_kind(relative_path) == "text" and PdfReader is not None:
+                session.file.get(f"{stage}/{relative_path}", target_dir)
+            else:
+                # Text is extracted in the warehouse; the file itself is never needed here
+                os.makedirs(target_dir, exist_ok=True)
+                text_path = _warehouse_text(session, stage, relative_path, local_path)
+            jobs[relative_path] = (local_path, text_path)
+
+        # Parsing and chunking fan out to worker processes
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {path: pool.submit(chunk_file, *job) for path, job in jobs.items()}
+            results = {path: future.result() for path, future in futures.items()}
+
+        for relative_path, (chunks_path, count) in results.items():
+            inserts, deletes = plan_chunk_delta(_existing_chunks(session, relative_path), chunks_path)
+            apply_delta(session, relative_path, inserts, deletes)
+            record_manifest(session, relative_path, stage_files[relative_path], count)
+            summary["inserted_chunks"] += len(inserts)
+            summary["deleted_chunks"] += len(deletes)
+
+    remove_files(session, removed)
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connection", required=True, help="Snowflake connection name")
+    parser.add_argument("--stage", default=DOCS_STAGE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--dry-run", action="store_true", help="Only report which files would be ingested")
+    args = parser.parse_args()
+
+    from snowflake.snowpark import Session
+
+    session = Session.builder.config("connection_name", args.connection).create()
+    try:
+        print(json.dumps(ingest(session, args.stage, args.workers, args.dry_run), indent=2))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Local hybrid retrieval over DOCS_CHUNKS_TABLE
+Keeps an in-process BM25 inverted index (plus optional CPU embeddings with an ANN index)
+so that search-only FAQ questions can be answered without a Cortex Agent round trip: the
+index retrieves and cites, and a short completion grounded on the retrieved chunks writes
+the answer (grounded_prompt); excerpts() is the clearly labelled fallback
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from arrow_results import fetch_arrow_table
+
+try:  # Optional: dense retrieval on CPU
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    np = None
+    SentenceTransformer = None
+
+try:  # Optional: approximate nearest neighbour index for the embeddings
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+CHUNKS_TABLE = "DOCS_CHUNKS_TABLE"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant for combining BM25 and dense rankings
+RRF_K = 60
+
+# A local answer is only served when the top chunk covers this share of the query terms
+MIN_TERM_COVERAGE = 0.6
+MIN_BM25_SCORE = 2.0
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "in", "on", "for", "and",
+    "or", "what", "whats", "how", "do", "does", "i", "my", "me", "we", "our", "you", "your",
+    "can", "it", "this", "that", "with", "about", "tell", "please", "there", "any", "if",
+}
+
+ChunkKey = Tuple[str, int]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords; trailing plural 's' is folded"""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class LocalDocsIndex:
+    """BM25 + optional dense index over (RELATIVE_PATH, CHUNK_INDEX, CHUNK) rows"""
+
+    def __init__(self, use_embeddings: bool = True):
+        self._lock = threading.RLock()
+        self._encoder = None
+        if use_embeddings and SentenceTransformer is not None:
+            self._encoder = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        self._reset()
+
+    # ------------------------------------------------------------------ maintenance
+
+    def _reset(self):
+        self.chunks: Dict[ChunkKey, str] = {}
+        self.hashes: Dict[ChunkKey, int] = {}
+        self.postings: Dict[str, Dict[ChunkKey, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[ChunkKey, int] = {}
+        self.total_length = 0
+        self.refreshed_at = 0.0
+
+        self._ann = None
+        self._dense_matrix = None
+        self._ann_labels: Dict[int, ChunkKey] = {}
+        self._ann_ids: Dict[ChunkKey, int] = {}
+        self._next_label = 0
+
+    def _add(self, key: ChunkKey, text: str):
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings[term][key] = tf
+        self.chunks[key] = text
+        self.doc_lengths[key] = len(tokens)
+        self.total_length += len(tokens)
+
+    def _remove(self, key: ChunkKey):
+        text = self.chunks.pop(key, None)
+        if text is None:
+            return
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(key, 0)
+        self.hashes.pop(key, None)
+        label = self._ann_ids.pop(key, None)
+        if label is not None:
+            del self._ann_labels[label]
+            if self._ann is not None:
+                self._ann.mark_deleted(label)
+
+    def _embed(self, keys: List[ChunkKey]):
+        """Add embeddings for the given chunks to the ANN (or brute-force) index"""
+        if self._encoder is None or not keys:
+            return
+        vectors = self._encoder.encode([self.chunks[k] for k in keys], normalize_embeddings=True)
+        labels = list(range(self._next_label, self._next_label + len(keys)))
+        self._next_label += len(keys)
+        if hnswlib is not None:
+            if self._ann is None:
+                self._ann = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+                self._ann.init_index(max_elements=max(1024, len(keys) * 2), ef_construction=200, M=16)
+            if self._next_label > self._ann.get_max_elements():
+                self._ann.resize_index(self._next_label * 2)
+            self._ann.add_items(vectors, labels)
+        else:
+            # Brute-force cosine over a dense matrix when hnswlib is not installed;
+            # row i holds label i, rows of removed chunks are skipped at query time
+            matrix = self._dense_matrix
+            self._dense_matrix = vectors if matrix is None else np.vstack([matrix, vectors])
+        for label, key in zip(labels, keys):
+            self._ann_labels[label] = key
+            self._ann_ids[key] = label
+
+    def snapshot(self, session):
+        """Load the full chunk table into a fresh index"""
+        table = fetch_arrow_table(
+            session,
+            f"SELECT RELATIVE_PATH, CHUNK_INDEX, CHUNK, HASH(CHUNK) AS CHUNK_HASH FROM {CHUNKS_TABLE}",
+            encode=False,
+        )
+        with self._lock:
+            self._reset()
+            rows = table.to_pylist()
+            for row in rows:
+                key = (row["RELATIVE_PATH"], int(row["CHUNK_INDEX"]))
+                self._add(key, row["CHUNK"] or "")
+                self.hashes[key] = row["CHUNK_HASH"]
+            self._embed(list(self.chunks))
+            self.refreshed_at = time.time()
+        return len(rows)
+
+    def refresh(self, session) -> int:
+        """Incrementally pick up new, changed and deleted chunks; returns the number of changes"""
+        if not self.chunks:
+            return self.snapshot(session)
+
+        # Only keys and hashes travel over the wire to find the delta
+        current = fetch_arrow_table(
+            session,
+            f"SELECT RELATIVE_PATH, CHUNK_INDEX, HASH(CHUNK) AS CHUNK_HASH FROM {CHUNKS_TABLE}",
+            encode=False,
+        ).to_pylist()
+        current_hashes = {(r["RELATIVE_PATH"], int(r["CHUNK_INDEX"])): r["CHUNK_HASH"] for r in current}
+
+        with self._lock:
+            removed = [k for k in self.hashes if k not in current_hashes]
+            changed = [k for k, h in current_hashes.items() if self.hashes.get(k) != h]
+            for key in removed:
+                self._remove(key)
+
+            changed_paths = sorted({path for path, _ in changed})
+            if changed_paths:
+                placeholders = ", ".join("?" for _ in changed_paths)
+                rows = fetch_arrow_table(
+                    session,
+                    f"SELECT RELATIVE_PATH, CHUNK_INDEX, CHUNK, HASH(CHUNK) AS CHUNK_HASH "
+                    f"FROM {CHUNKS_TABLE} WHERE RELATIVE_PATH IN ({placeholders})",
+                    params=changed_paths,
+                    encode=False,
+                ).to_pylist()
+                changed_keys = set(changed)
+                added = []
+                for row in rows:
+                    key = (row["RELATIVE_PATH"], int(row["CHUNK_INDEX"]))
+                    if key not in changed_keys:
+                        continue
+                    self._remove(key)
+                    self._add(key, row["CHUNK"] or "")
+                    self.hashes[key] = row["CHUNK_HASH"]
+                    added.append(key)
+                self._embed(added)
+
+            self.refreshed_at = time.time()
+            return len(removed) + len(changed)
+
+    # ------------------------------------------------------------------ retrieval
+
+    def _bm25(self, terms: List[str]) -> Dict[ChunkKey, float]:
+        n = len(self.chunks)
+        avg_len = self.total_length / n if n else 0.0
+        scores: Dict[ChunkKey, float] = defaultdict(float)
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[key] / avg_len)
+                scores[key] += idf * tf * (BM25_K1 + 1) / norm
+        return scores
+
+    def _dense(self, query: str, k: int) -> List[ChunkKey]:
+        if self._encoder is None or not self._ann_labels:
+            return []
+        vector = self._encoder.encode([query], normalize_embeddings=True)
+        if self._ann is not None:
+            labels, _ = self._ann.knn_query(vector, k=min(k, len(self._ann_labels)))
+            labels = labels[0]
+        else:
+            labels = np.argsort(-(self._dense_matrix @ vector[0]))
+        return [self._ann_labels[int(label)] for label in labels if int(label) in self._ann_labels][:k]
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        """Top-k chunks in the citation shape used by display_citations"""
+        terms = tokenize(query)
+        with self._lock:
+            bm25 = self._bm25(terms)
+            lexical = sorted(bm25, key=bm25.get, reverse=True)[: k * 4]
+            dense = self._dense(query, k * 4)
+
+            # Reciprocal rank fusion; with no encoder this is just the BM25 order
+            fused: Dict[ChunkKey, float] = defaultdict(float)
+            for rank, key in enumerate(lexical):
+                fused[key] += 1.0 / (RRF_K + rank)
+            for rank, key in enumerate(dense):
+                fused[key] += 1.0 / (RRF_K + rank)
+
+            query_terms = set(terms)
+            results = []
+            for rank, key in enumerate(sorted(fused, key=fused.get, reverse=True)[:k], start=1):
+                chunk_terms = {t for t in query_terms if key in self.postings.get(t, {})}
+                results.append({
+                    'source_id': rank,
+                    'doc_title': key[0],
+                    'doc_chunk': key[1],
+                    'chunk': self.chunks[key],
+                    'score': bm25.get(key, 0.0),
+                    'coverage': len(chunk_terms) / len(query_terms) if query_terms else 0.0,
+                })
+            return results
+
+    def retrieve(self, query: str, k: int = 3) -> Optional[List[Dict]]:
+        """Chunks to answer a search-only question from, or None when the index is not confident"""
+        results = self.search(query, k)
+        if not results:
+            return None
+        best = results[0]
+        if best['score'] < MIN_BM25_SCORE or best['coverage'] < MIN_TERM_COVERAGE:
+            return None
+        return [r for r in results if r['coverage'] >= MIN_TERM_COVERAGE]
+
+
+def grounded_prompt(query: str, results: List[Dict]) -> str:
+    """Completion prompt that answers query from the retrieved chunks only, citing them as [n]"""
+    sources = "\n\n".join(f"[{r['source_id']}] ({r['doc_title']})\n{r['chunk'].strip()}" for r in results)
+    return (
+        "Answer the question using only the numbered policy excerpts below. Be concise, cite the "
+        "excerpts you use as [n], and say so if they do not contain the answer.\n\n"
+        f"Excerpts:\n{sources}\n\nQuestion: {query}\nAnswer:"
+    )
+
+
+def excerpts(results: List[Dict]) -> str:
+    """The retrieved chunks verbatim, labelled as excerpts rather than an answer"""
+    parts = [f"{r['chunk'].strip()} [{r['source_id']}]" for r in results]
+    return "Relevant excerpts from the policy documents (not a generated answer):\n\n" + "\n\n".join(parts)
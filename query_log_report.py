@@ -0,0 +1,133 @@
+"""
+Workload report from the structured query log
+Reads the JSONL files written by sales_assistant.querylog and reports how often the same
+questions come back, how much of the traffic a cache or precomputed answers could serve,
+and where the time goes per stage, route and model.
+
+Usage: python query_log_report.py [PATH ...] [--days 7] [--top 20] [--faq-top 50]
+       PATH is a log file or a directory of queries-*.jsonl files (default: the app's QUERY_LOG_DIR)
+"""
+
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from sales_assistant.faq import question_key
+from sales_assistant.querylog import QUERY_LOG_DIR, read_records
+from sales_assistant.router import ANSWER_TTL
+from sales_assistant.singleflight import normalize_query
+
+SEARCH_ROUTES = {"search", "local_index", "faq"}
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values) or [0.0]
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 1),
+        "p50": values[len(values) // 2],
+        "p95": values[min(int(len(values) * 0.95), len(values) - 1)],
+    }
+
+
+def share(part: int, whole: int) -> float:
+    return round(part / whole, 3) if whole else 0.0
+
+
+def frequency(records: List[Dict], top: int) -> Dict:
+    """How concentrated the questions are: a few very common ones favour caching and precompute"""
+    counts = Counter(normalize_query(r["query"]) for r in records)
+    ranked = counts.most_common()
+    total = len(records)
+    return {
+        "questions": total,
+        "distinct": len(counts),
+        "asked_once_share": share(sum(1 for _, c in ranked if c == 1), total),
+        "top_10_share": share(sum(c for _, c in ranked[:10]), total),
+        "top_100_share": share(sum(c for _, c in ranked[:100]), total),
+        "top": [{"query": q, "count": c} for q, c in ranked[:top]],
+    }
+
+
+def cache_potential(records: List[Dict], faq_top: int) -> Dict:
+    """Share of traffic each cache could have served, next to what was actually served without a call"""
+    total = len(records)
+    last_seen: Dict[str, float] = {}
+    within_ttl = ever = 0
+    for record in sorted(records, key=lambda r: r.get("ts", 0)):
+        key = normalize_query(record["query"])
+        seen = last_seen.get(key)
+        if seen is not None:
+            ever += 1
+            if record.get("ts", 0) - seen <= ANSWER_TTL:
+                within_ttl += 1
+        last_seen[key] = record.get("ts", 0)
+
+    search = [r for r in records if r.get("route") in SEARCH_ROUTES]
+    faq_keys = Counter(question_key(r["query"]) for r in search)
+    faq_covered = sum(c for k, c in faq_keys.most_common(faq_top) if k)
+
+    sql_hashes = Counter(r["sql_hash"] for r in records if r.get("sql_hash"))
+    with_sql = sum(sql_hashes.values())
+    return {
+        "repeat_within_answer_ttl": share(within_ttl, total),
+        "repeat_any_time": share(ever, total),
+        f"search_covered_by_top_{faq_top}_faq": share(faq_covered, len(search)),
+        "sql_repeat": share(with_sql - len(sql_hashes), with_sql),
+        "observed": {
+            "answer_cache": share(sum(1 for r in records if r.get("cache_hits")), total),
+            "faq": share(sum(1 for r in records if r.get("route") == "faq"), total),
+            "local_index": share(sum(1 for r in records if r.get("route") == "local_index"), total),
+        },
+    }
+
+
+def latency(records: List[Dict]) -> Dict:
+    stages: Dict[str, List[float]] = defaultdict(list)
+    routes: Dict[str, List[float]] = defaultdict(list)
+    models: Dict[str, List[float]] = defaultdict(list)
+    for record in records:
+        routes[record.get("route") or "error"].append(record.get("total_ms", 0.0))
+        for stage, ms in (record.get("timings_ms") or {}).items():
+            stages[stage].append(ms)
+            model = (record.get("models") or {}).get(stage)
+            if model:
+                models[f"{model} / {stage}"].append(ms)
+    return {
+        "total": percentiles([r.get("total_ms", 0.0) for r in records]),
+        "by_stage": {stage: percentiles(v) for stage, v in sorted(stages.items())},
+        "by_route": {route: percentiles(v) for route, v in sorted(routes.items())},
+        "by_model": {model: percentiles(v) for model, v in sorted(models.items())},
+    }
+
+
+def report(records: List[Dict], top: int = 20, faq_top: int = 50) -> Dict:
+    tools = Counter(tool for r in records for tool in r.get("tools") or [])
+    return {
+        "frequency": frequency(records, top),
+        "cache_potential": cache_potential(records, faq_top),
+        "latency_ms": latency(records),
+        "routes": dict(Counter(r.get("route") or "error" for r in records).most_common()),
+        "tools": dict(tools.most_common()),
+        "errors": share(sum(1 for r in records if r.get("errors")), len(records)),
+        "response_chars": percentiles([r.get("text_chars", 0) for r in records]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=[QUERY_LOG_DIR], help="Log files or directories")
+    parser.add_argument("--days", type=float, help="Only the last N days")
+    parser.add_argument("--top", type=int, default=20, help="Most frequent questions to list")
+    parser.add_argument("--faq-top", type=int, default=50, help="Precomputed answers to size the FAQ estimate for")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else None
+    records = [r for r in read_records(args.paths, since) if r.get("query")]
+    print(json.dumps(report(records, args.top, args.faq_top), indent=2))
+
+
+if __name__ == "__main__":
+    main()
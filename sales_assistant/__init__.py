@@ -0,0 +1,27 @@
+"""
+Core of the Intelligent Sales Assistant, shared by the Streamlit apps and batch jobs
+
+    session    lazy Snowpark session, session pool and SQL execution
+    statements named bind-parameter lookups with latency histograms
+    transport  _snowflake / HTTPS transport for Cortex REST calls
+    client     Cortex Agent payloads and requests
+    semantic_model  per-question pruned semantic models for the analyst
+    agent      pre-configured agent management and threads
+    threads    per-user thread persistence across refreshes and workers
+    sse        SSE event parsing into AgentResult
+    router     client-side intent routing into an Answer
+    model_routing  per-call model choice from complexity and learned latency
+    citations  answer-level citation aggregation and document kinds
+    search_tuning  confidence-based search result pruning and per-topic max_results
+    hydrate    citation text / image URL lookups
+    faq        precomputed answers for the most asked policy questions
+    querylog   structured per-question log for workload analysis
+    cache      memory + host-wide SQLite cache tiers (answers, SQL results, chunks)
+
+Nothing here imports Streamlit or opens a session at import time; heavy dependencies
+(pyarrow, Snowpark, PyYAML, the local index) load on first use.
+"""
+
+from sales_assistant.results import AgentResult, Answer, Notice
+
+__all__ = ["AgentResult", "Answer", "Notice"]
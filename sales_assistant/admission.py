@@ -0,0 +1,395 @@
+"""
+Process-wide admission control for agent calls
+Every Streamlit session shares one controller: a token bucket per user limits how often
+each user can ask (a question's agent calls are charged once), a global cap limits agent
+calls in flight, and callers beyond the cap wait in a queue served round-robin across
+users. When the queue is full or a caller would wait longer than MAX_QUEUE_WAIT, the call
+is shed with a fast "busy" error instead of piling onto the warehouse and timing out at
+API_TIMEOUT. The cap counts underlying agent:run requests: one whose caller was cancelled
+or timed out keeps running on its worker thread, and keeps its slot until it ends.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Optional
+
+from sales_assistant.deadline import abandoned_calls, check_current
+
+MAX_IN_FLIGHT = 8  # concurrent agent:run calls per process
+USER_RATE = 0.2  # sustained questions per second per user (12 a minute)
+USER_BURST = 5  # questions a user can ask back to back
+MAX_QUEUE = 32  # waiting calls before new ones are shed
+MAX_QUEUE_WAIT = 15.0  # seconds; well under API_TIMEOUT so users hear "busy" quickly
+POLL_INTERVAL = 0.5  # how often waiters re-report their queue position
+MAX_TRACKED_USERS = 1024
+
+DEFAULT_USER = "anonymous"
+
+
+class AdmissionRejected(Exception):
+    """The call was not admitted; the message is meant for the user"""
+
+
+class RateLimited(AdmissionRejected):
+    def __init__(self, retry_after: float):
+        super().__init__(f"🚦 You're sending questions faster than we can answer them. Try again in {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+class Overloaded(AdmissionRejected):
+    def __init__(self):
+        super().__init__("🚦 The assistant is busy right now. Please try again in a few seconds.")
+
+
+class TokenBucket:
+    """rate tokens per second up to burst; take() returns 0 or the seconds until a token is available"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class _Ticket:
+    __slots__ = ("user", "granted")
+
+    def __init__(self, user: str):
+        self.user = user
+        self.granted = False
+
+
+class AdmissionController:
+    """Per-user token buckets, a global in-flight cap and a round-robin wait queue"""
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, user_rate: Optional[float] = USER_RATE,
+                 user_burst: int = USER_BURST, max_queue: int = MAX_QUEUE, max_wait: float = MAX_QUEUE_WAIT):
+        """user_rate=None disables per-user limiting (batch jobs)"""
+        self.max_in_flight = max_in_flight
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._queued = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Waiting tickets per user; the first user in the dict is served next
+        self._waiting: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.draining = 0  # slots held by requests whose caller stopped waiting
+
+    def _bucket(self, user: str) -> TokenBucket:
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_USERS:
+                # Users whose bucket refilled completely carry no state worth keeping
+                for idle in [u for u, b in self._buckets.items() if b.full()]:
+                    del self._buckets[idle]
+            bucket = self._buckets[user] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def _schedule(self):
+        """Waiting tickets in the order they will be admitted (round-robin across users)"""
+        queues = [list(q) for q in self._waiting.values()]
+        order = []
+        depth = 0
+        while len(order) < self._queued:
+            for queue in queues:
+                if depth < len(queue):
+                    order.append(queue[depth])
+            depth += 1
+        return order
+
+    def _dispatch(self):
+        while self._in_flight < self.max_in_flight and self._waiting:
+            user, queue = next(iter(self._waiting.items()))
+            ticket = queue.popleft()
+            del self._waiting[user]
+            if queue:
+                self._waiting[user] = queue  # back of the rotation
+            self._queued -= 1
+            self._in_flight += 1
+            ticket.granted = True
+        self._cond.notify_all()
+
+    def _withdraw(self, ticket: _Ticket):
+        queue = self._waiting.get(ticket.user)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            self._queued -= 1
+            if not queue:
+                del self._waiting[ticket.user]
+
+    @contextmanager
+    def admit(self, user: str = DEFAULT_USER, on_wait: Optional[Callable[[int], None]] = None, charge: bool = True):
+        """Hold an agent call slot for the duration of the block
+
+        The cap counts underlying requests, not waiting callers: a request the caller gave up on
+        (cancelled or timed out through Deadline.run) keeps its slot until it really ends.
+        on_wait(position) is called while queued, with 1 meaning next in line. charge=False skips
+        the user's rate limit (a further call for a question that was already charged).
+        Raises RateLimited or Overloaded instead of admitting.
+        """
+        with self._cond:
+            bucket = self._bucket(user) if self.user_rate and charge else None
+            retry_after = bucket.take() if bucket else 0.0
+            if retry_after > 0:
+                self.rate_limited += 1
+                raise RateLimited(retry_after)
+
+            ticket = _Ticket(user)
+            if self._in_flight < self.max_in_flight and not self._waiting:
+                self._in_flight += 1
+                ticket.granted = True
+            elif self._queued >= self.max_queue:
+                self.shed += 1
+                if bucket:
+                    bucket.refund()
+                raise Overloaded()
+            else:
+                self._waiting.setdefault(user, deque()).append(ticket)
+                self._queued += 1
+
+        deadline = time.monotonic() + self.max_wait
+        last_position = None
+        try:
+            while True:
+                check_current()  # a cancelled question gives up its place in line
+                with self._cond:
+                    if ticket.granted:
+                        self.admitted += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        if bucket:
+                            bucket.refund()
+                        raise Overloaded()
+                    position = self._schedule().index(ticket) + 1
+                # Report outside the lock so a slow UI update never blocks other sessions
+                if on_wait is not None and position != last_position:
+                    on_wait(position)
+                    last_position = position
+                with self._cond:
+                    if not ticket.granted:
+                        self._cond.wait(min(remaining, POLL_INTERVAL))
+        except BaseException:
+            # Shed, cancelled, or the caller went away (e.g. a Streamlit rerun) while queued
+            with self._cond:
+                if ticket.granted:
+                    self._in_flight -= 1
+                    self._dispatch()
+                else:
+                    self._withdraw(ticket)
+            raise
+
+        with abandoned_calls() as abandoned:
+            try:
+                yield
+            finally:
+                pending = [call for call in abandoned if not call.done.is_set()]
+                if pending:
+                    self._release_after(pending)
+                else:
+                    self._release()
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def _release_after(self, pending):
+        """Free the slot once every request the caller stopped waiting for has ended"""
+        remaining = [len(pending)]
+        lock = threading.Lock()
+        with self._cond:
+            self.draining += 1
+
+        def ended():
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            with self._cond:
+                self.draining -= 1
+            self._release()
+
+        for call in pending:
+            call.when_done(ended)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "draining": self.draining,
+                "queued": self._queued,
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+                "shed": self.shed,
+            }
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+class QueuePosition:
+    """Where a question's agent calls stand in the queue, shown only on the thread that asked
+
+    Calls run on worker threads (speculative tool calls) report here instead of calling the
+    view's on_wait themselves: UI callbacks such as Streamlit's only work on the script thread,
+    which picks the position up through report_queue_position() while it waits.
+    """
+
+    def __init__(self, on_wait: Callable[[int], None]):
+        self.on_wait = on_wait
+        self.owner = threading.get_ident()
+        self._lock = threading.Lock()
+        self._positions: Dict[int, int] = {}  # calling thread -> position
+        self._shown: Optional[int] = None
+
+    def update(self, position: int):
+        with self._lock:
+            self._positions[threading.get_ident()] = position
+        self.report()
+
+    def clear(self):
+        with self._lock:
+            self._positions.pop(threading.get_ident(), None)
+
+    def report(self):
+        """Show the best position among the question's queued calls; a no-op off the owner thread"""
+        if threading.get_ident() != self.owner:
+            return
+        with self._lock:
+            position = min(self._positions.values(), default=None)
+        if position is not None and position != self._shown:
+            self._shown = position
+            self.on_wait(position)
+
+
+class _Question:
+    """One question's claim on its user's rate limit, shared by all of its agent calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.charged = False
+
+    def claim(self) -> bool:
+        """True for the call that should be charged (the first one)"""
+        with self._lock:
+            first, self.charged = not self.charged, True
+            return first
+
+    def release(self):
+        with self._lock:
+            self.charged = False
+
+
+# Who the current agent call is for, set by the view around a question
+_current_user = contextvars.ContextVar("admission_user", default=DEFAULT_USER)
+_current_position = contextvars.ContextVar("admission_position", default=None)
+_current_question = contextvars.ContextVar("admission_question", default=None)
+
+
+def configure(**settings) -> AdmissionController:
+    """Replace the process-wide controller, e.g. configure(max_in_flight=16, user_rate=None) for batch jobs"""
+    global _controller
+    with _controller_lock:
+        _controller = AdmissionController(**settings)
+    return _controller
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController()
+    return _controller
+
+
+@contextmanager
+def acting_as(user: str, on_wait: Optional[Callable[[int], None]] = None):
+    """Attribute agent calls made inside the block to user, reporting queue positions to on_wait"""
+    user_token = _current_user.set(user or DEFAULT_USER)
+    position_token = _current_position.set(QueuePosition(on_wait) if on_wait is not None else None)
+    try:
+        yield
+    finally:
+        _current_user.reset(user_token)
+        _current_position.reset(position_token)
+
+
+def report_queue_position():
+    """Show the current question's queue position; call it from the view's thread while waiting"""
+    position = _current_position.get()
+    if position is not None:
+        position.report()
+
+
+@contextmanager
+def one_question():
+    """Agent calls inside the block (and threads copying its context) count once against the user's rate limit"""
+    token = _current_question.set(_Question())
+    try:
+        yield
+    finally:
+        _current_question.reset(token)
+
+
+@contextmanager
+def admit_current(timings: Optional[Dict[str, float]] = None):
+    """Admission for the calling context's user (see acting_as); within one_question only the first call is charged
+
+    timings, if given, gets admitted_at (perf_counter) once admitted and service_ms, the time
+    spent admitted, when the block exits; queue time is in neither.
+    """
+    question = _current_question.get()
+    charge = question.claim() if question is not None else True
+    position = _current_position.get()
+    try:
+        with get_admission_controller().admit(_current_user.get(), position and position.update, charge):
+            if position is not None:
+                position.clear()
+            admitted = time.perf_counter()
+            if timings is not None:
+                timings["admitted_at"] = admitted
+            try:
+                yield
+            finally:
+                if timings is not None:
+                    timings["service_ms"] = (time.perf_counter() - admitted) * 1000
+    except RateLimited:
+        if question is not None and charge:
+            question.release()  # nothing was charged; the next call tries again
+        raise
+    finally:
+        if position is not None:
+            position.clear()
@@ -0,0 +1,182 @@
+"""
+Pre-configured Cortex Agent: spec sync from CORTEX_AGENT_SALES.json, conversation threads
+and agent runs
+
+sync_agent() hashes the local agent_spec and compares it with the hash kept in the
+deployed agent's comment; the agent is created when missing and updated when the hashes
+differ, otherwise left alone. It runs once per process: the describe is one cheap GET, and
+an agent dropped or replaced after that is caught when agent:run answers 404, which
+re-syncs and retries the run once.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sales_assistant import client, sse
+from sales_assistant.results import AgentResult
+from sales_assistant.singleflight import get_single_flight, normalize_query
+
+AGENT_NAME = "CORTEX_SALES_AGENT"
+AGENT_DATABASE = "SNOWFLAKE_INTELLIGENCE"
+AGENT_SCHEMA = "AGENTS"
+AGENTS_ENDPOINT = f"/api/v2/databases/{AGENT_DATABASE.lower()}/schemas/{AGENT_SCHEMA.lower()}/agents"
+API_ENDPOINT = f"{AGENTS_ENDPOINT}/{AGENT_NAME}:run"
+THREAD_ENDPOINT = "/api/v2/cortex/threads"
+AGENT_CONFIG_FILE = "CORTEX_AGENT_SALES.json"
+THREAD_ORIGIN = "streamlit_sales_assistant"
+
+# The config file sits at the repo root, next to the apps
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), AGENT_CONFIG_FILE)
+
+SPEC_HASH_COMMENT = "spec_sha256="  # prefix of the hash in the agent's comment
+
+
+def load_agent_spec(path: str = CONFIG_PATH) -> dict:
+    """The agent_spec object from the config file; raises FileNotFoundError / json.JSONDecodeError"""
+    with open(path, 'r') as f:
+        return json.load(f).get('data', {}).get('agent_spec', {})
+
+
+def spec_hash(agent_spec: dict) -> str:
+    """Stable hash of a spec: key order and whitespace in the config file do not change it"""
+    canonical = json.dumps(agent_spec, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def create_payload(agent_spec: dict) -> dict:
+    # agent_spec has to be sent as a JSON string: {"name": "...", "agent_spec": "<json_string>"}
+    return {
+        "name": AGENT_NAME,
+        "agent_spec": json.dumps(agent_spec),
+        "comment": f"{SPEC_HASH_COMMENT}{spec_hash(agent_spec)}",
+    }
+
+
+def create_agent(agent_spec: dict):
+    """Create the agent; raises client.AgentApiError on failure"""
+    client.request("POST", AGENTS_ENDPOINT, create_payload(agent_spec))
+
+
+def update_agent(agent_spec: dict):
+    """Replace the deployed agent's spec; raises client.AgentApiError on failure"""
+    payload = create_payload(agent_spec)
+    del payload["name"]
+    client.request("PUT", f"{AGENTS_ENDPOINT}/{AGENT_NAME}", payload)
+
+
+def deployed_spec_hash() -> Optional[str]:
+    """Spec hash recorded on the deployed agent ("" when it has none), or None when the agent does not exist"""
+    try:
+        described = client.request("GET", f"{AGENTS_ENDPOINT}/{AGENT_NAME}")
+    except client.AgentApiError as e:
+        if e.response and e.response.get("status") == 404:
+            return None
+        raise
+    match = re.search(rf"{re.escape(SPEC_HASH_COMMENT)}([0-9a-f]+)", str((described or {}).get("comment") or ""))
+    return match.group(1) if match else ""
+
+
+@dataclass
+class SpecSync:
+    """What sync_agent did: 'unchanged', 'created' or 'updated'"""
+    action: str
+    spec_hash: str
+    elapsed_ms: float = 0.0
+    payload: dict = field(default_factory=dict)  # what was sent, when anything was
+
+
+_synced: Optional[SpecSync] = None
+_sync_lock = threading.Lock()
+
+
+def sync_agent(path: str = CONFIG_PATH) -> SpecSync:
+    """Create or update the agent when its deployed spec differs from the config file; once per process
+
+    Raises FileNotFoundError / json.JSONDecodeError / ValueError for a bad config file and
+    client.AgentApiError when Snowflake refuses; a failed sync is retried on the next call.
+    """
+    global _synced
+    if _synced is None:
+        with _sync_lock:
+            if _synced is None:
+                _synced = _sync(path)
+    return _synced
+
+
+def resync_agent(stale: Optional[SpecSync], path: str = CONFIG_PATH) -> SpecSync:
+    """Sync again after the deployed agent went missing; concurrent callers that saw the same stale sync share one"""
+    global _synced
+    with _sync_lock:
+        if _synced is None or _synced is stale:
+            _synced = _sync(path)
+        return _synced
+
+
+def _sync(path: str) -> SpecSync:
+    started = time.perf_counter()
+    agent_spec = load_agent_spec(path)
+    if not agent_spec:
+        raise ValueError(f"no agent_spec in {os.path.basename(path)}")
+    local = spec_hash(agent_spec)
+    deployed = deployed_spec_hash()
+    if deployed == local:
+        action, payload = "unchanged", {}
+    elif deployed is None:
+        create_agent(agent_spec)
+        action, payload = "created", create_payload(agent_spec)
+    else:
+        update_agent(agent_spec)
+        action, payload = "updated", create_payload(agent_spec)
+    return SpecSync(action, local, (time.perf_counter() - started) * 1000, payload)
+
+
+def create_thread(origin: str = THREAD_ORIGIN) -> Optional[str]:
+    """New server-side conversation thread; raises client.AgentApiError on failure"""
+    return client.request("POST", THREAD_ENDPOINT, {"origin_application": origin}).get('thread_id')
+
+
+def delete_thread(thread_id: str):
+    """Delete a server-side conversation thread; raises client.AgentApiError on failure"""
+    client.request("DELETE", f"{THREAD_ENDPOINT}/{thread_id}")
+
+
+def _run_agent(payload: dict, timings: Optional[dict] = None) -> list:
+    """agent:run against the deployed agent; a 404 means it was dropped since the sync, so re-sync and retry once"""
+    synced = _synced
+    try:
+        return client.run_agent(payload, API_ENDPOINT, timings=timings)
+    except client.AgentApiError as e:
+        if not (e.response and e.response.get("status") == 404):
+            raise
+    resync_agent(synced)
+    return client.run_agent(payload, API_ENDPOINT, timings=timings)
+
+
+def run(query: str, model: str = client.DEFAULT_MODEL, thread_id=None, parent_message_id=None,
+        timings: Optional[dict] = None) -> list:
+    """Raw SSE events from the pre-configured agent (tools are configured in Snowflake)
+
+    Questions outside a thread are coalesced with identical ones in flight; threaded
+    questions depend on their conversation and always get their own call. timings gets
+    admitted_at and service_ms (see admission.admit_current) if this caller made the call.
+    """
+    payload = client.agent_payload(query, model)
+    if thread_id is not None and parent_message_id is not None:
+        payload["thread_id"] = thread_id
+        payload["parent_message_id"] = parent_message_id
+        return _run_agent(payload, timings)
+
+    events, _ = get_single_flight().do(
+        (normalize_query(query), model, AGENT_NAME), lambda: _run_agent(payload, timings),
+    )
+    return events
+
+
+def ask(query: str, model: str = client.DEFAULT_MODEL, thread_id=None, parent_message_id=None) -> AgentResult:
+    return sse.parse_agent_response(run(query, model, thread_id, parent_message_id), query=query)
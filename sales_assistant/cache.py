@@ -0,0 +1,390 @@
+"""
+Two-tier caching: process memory in front of a host-wide SQLite store
+The disk tier survives redeploys and worker restarts and is shared by every Streamlit
+worker process on the host: SQLite in WAL mode with a memory-mapped read path, values
+stored as JSON (Arrow tables as LZ4 IPC) and zlib-compressed when that pays off; nothing
+read back is ever unpickled. Dataclasses are stored only if registered with @cacheable,
+other values JSON cannot hold stay in memory. The store is bounded by
+DISK_CACHE_MAX_BYTES, evicting expired entries first and then the least recently used.
+Each cache warm-loads its most recently used entries on first use.
+
+CACHE_DIR holds answers, SQL results and document text, so it must be private to the app's
+OS user: private_dir() creates it 0700 and refuses a directory another user owns.
+
+The disk tier is best-effort: if the file cannot be opened or is locked for too long,
+callers just see a miss. SALES_ASSISTANT_DISK_CACHE=0 turns it off.
+"""
+
+import dataclasses
+import functools
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def app_dir(name: str) -> str:
+    """Default location of an app directory in the temp dir, per OS user so another account cannot claim the name first"""
+    return os.path.join(tempfile.gettempdir(), f"{name}_{os.getuid()}" if hasattr(os, "getuid") else name)
+
+
+CACHE_DIR = os.environ.get("SALES_ASSISTANT_CACHE_DIR", app_dir("sales_assistant_cache"))
+CACHE_FILE = "cache.sqlite3"
+DISK_CACHE_ENABLED = os.environ.get("SALES_ASSISTANT_DISK_CACHE", "1") != "0"
+
+DISK_CACHE_MAX_BYTES = 256 * 1024 * 1024
+EVICT_TO = 0.8  # eviction frees space down to this share of the limit
+EVICT_EVERY = 64  # writes between size checks (per process)
+MMAP_BYTES = 256 * 1024 * 1024
+BUSY_TIMEOUT_MS = 2000
+ACCESS_RESOLUTION = 60.0  # seconds; last-access times are only rewritten this often
+COMPRESS_MIN_BYTES = 512
+WARM_ENTRIES = 256  # entries loaded into memory when a cache is first used
+
+MEMORY_MAX_ENTRIES = 4096
+
+MISS = object()
+
+# Value encodings: first byte of the stored blob; anything else (e.g. older pickled entries) reads as a miss
+_JSON = b"j"
+_JSON_ZLIB = b"c"
+_ARROW = b"a"
+
+_CACHEABLE: Dict[str, type] = {}  # dataclasses the disk tier may store, by name
+
+
+class UnsafeCacheDir(PermissionError):
+    """An app directory is not private to this OS user"""
+
+
+def private_dir(path: str) -> str:
+    """Create path 0700 (or tighten it) and return it; raise UnsafeCacheDir unless this user owns it"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise UnsafeCacheDir(f"{path} is not a directory")
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid():
+            raise UnsafeCacheDir(f"{path} is owned by another user")
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            os.chmod(path, 0o700)
+    return path
+
+
+def cacheable(cls):
+    """Class decorator: let the disk tier store instances of dataclass cls (by class name)"""
+    _CACHEABLE[cls.__name__] = cls
+    return cls
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Autocommit connection in WAL mode with memory-mapped reads, shared safely across processes"""
+    db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    return db
+
+
+def _encode_key(key: Hashable) -> str:
+    """Deterministic across processes, unlike hash()"""
+    return json.dumps(key, default=str, separators=(",", ":"))
+
+
+def _is_arrow_table(value) -> bool:
+    # Checked by name so plain values never import pyarrow
+    return type(value).__name__ == "Table" and type(value).__module__.startswith("pyarrow")
+
+
+def _json_default(value):
+    cls = type(value)
+    if dataclasses.is_dataclass(value) and _CACHEABLE.get(cls.__name__) is cls:
+        # Field by field rather than asdict(), so nested dataclasses keep their type
+        return {"__cacheable__": cls.__name__, "fields": {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}}
+    raise TypeError(f"{cls.__name__} values are not stored on disk")
+
+
+def _json_object(obj: dict):
+    name = obj.get("__cacheable__")
+    if name is None:
+        return obj
+    cls = _CACHEABLE.get(name)
+    if cls is None:
+        raise ValueError(f"unknown cached type {name}")
+    return cls(**obj["fields"])
+
+
+def encode_value(value) -> bytes:
+    """Blob for the disk tier; raises TypeError for values only the memory tier can hold"""
+    if _is_arrow_table(value):
+        import pyarrow as pa
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, value.schema, options=pa.ipc.IpcWriteOptions(compression="lz4")) as writer:
+            writer.write_table(value)
+        return _ARROW + sink.getvalue().to_pybytes()
+    data = json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+    if len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, 1)
+        if len(packed) < len(data):
+            return _JSON_ZLIB + packed
+    return _JSON + data
+
+
+def decode_value(blob: bytes):
+    tag, data = blob[:1], blob[1:]
+    if tag == _ARROW:
+        import pyarrow as pa
+
+        return pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+    if tag == _JSON_ZLIB:
+        data = zlib.decompress(data)
+    elif tag != _JSON:
+        raise ValueError("unknown cache encoding")
+    return json.loads(data, object_hook=_json_object)
+
+
+class DiskCache:
+    """Namespaced key-value store with expiry in one SQLite file; safe across threads and processes"""
+
+    def __init__(self, path: str, max_bytes: int = DISK_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+                " size INTEGER NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self.evict()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = connect(self.path)
+        return db
+
+    def get(self, namespace: str, key: Hashable) -> Tuple[Any, float]:
+        """(value, expires_at), or (MISS, 0) when absent, expired or unreadable"""
+        encoded = _encode_key(key)
+        now = time.time()
+        try:
+            db = self._connect()
+            row = db.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, encoded),
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return MISS, 0.0
+            if now - row[2] > ACCESS_RESOLUTION:
+                db.execute("UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, encoded))
+            value = decode_value(row[0])
+        except Exception:
+            self.misses += 1
+            return MISS, 0.0
+        self.hits += 1
+        return value, row[1]
+
+    def set(self, namespace: str, key: Hashable, value, ttl: float):
+        try:
+            blob = encode_value(value)
+            now = time.time()
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, _encode_key(key), blob, len(blob), now + ttl, now),
+            )
+        except Exception:
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def warm(self, namespace: str, limit: int = WARM_ENTRIES) -> List[Tuple[str, Any, float]]:
+        """Most recently used live entries of a namespace as (encoded key, value, expires_at)"""
+        try:
+            rows = self._connect().execute(
+                "SELECT key, value, expires_at FROM entries WHERE namespace = ? AND expires_at > ?"
+                " ORDER BY accessed_at DESC LIMIT ?",
+                (namespace, time.time(), limit),
+            ).fetchall()
+            return [(key, decode_value(value), expires_at) for key, value, expires_at in rows]
+        except Exception:
+            return []
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until the file is under its limit"""
+        try:
+            db = self._connect()
+            db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes * EVICT_TO
+            victims = []
+            for namespace, key, size in db.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at"):
+                victims.append((namespace, key))
+                excess -= size
+                if excess <= 0:
+                    break
+            db.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+        except Exception:
+            pass
+
+    def delete(self, namespace: str, key: Hashable):
+        try:
+            self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, _encode_key(key)))
+        except Exception:
+            pass
+
+    def clear(self, namespace: Optional[str] = None):
+        try:
+            if namespace is None:
+                self._connect().execute("DELETE FROM entries")
+            else:
+                self._connect().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+        except Exception:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        try:
+            count, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except Exception:
+            count, size = 0, 0
+        return {"entries": count, "mb": round(size / 1e6, 1), "hits": self.hits, "misses": self.misses}
+
+
+_disk: Optional[DiskCache] = None
+_disk_opened = False
+_disk_lock = threading.Lock()
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """The host-wide store, or None when disabled or unavailable"""
+    global _disk, _disk_opened
+    if not _disk_opened:
+        with _disk_lock:
+            if not _disk_opened:
+                if DISK_CACHE_ENABLED:
+                    try:
+                        _disk = DiskCache(os.path.join(private_dir(CACHE_DIR), CACHE_FILE))
+                    except Exception:
+                        _disk = None
+                _disk_opened = True
+    return _disk
+
+
+class TieredCache:
+    """Memory entries with a TTL, backed by the disk store under namespace (None keeps it in memory only)
+
+    The memory tier holds at most max_entries, dropping the least recently used one when full.
+    """
+
+    def __init__(self, namespace: Optional[str], ttl: float, max_entries: int = MEMORY_MAX_ENTRIES):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+        self._warmed = namespace is None
+
+    def _disk(self) -> Optional[DiskCache]:
+        return get_disk_cache() if self.namespace is not None else None
+
+    def _warm(self):
+        disk = self._disk()
+        entries = disk.warm(self.namespace, min(WARM_ENTRIES, self.max_entries)) if disk else []
+        with self._lock:
+            # Older than anything set in memory already: each goes in front, the least recent ending up first
+            for key, value, expires_at in entries:
+                if key not in self._entries and len(self._entries) < self.max_entries:
+                    self._entries[key] = (expires_at, value)
+                    self._entries.move_to_end(key, last=False)
+            self._warmed = True
+
+    def get(self, key: Hashable):
+        """The cached value or MISS"""
+        if not self._warmed:
+            self._warm()
+        encoded = _encode_key(key)
+        now = time.time()
+        with self._lock:
+            hit = self._entries.get(encoded)
+            if hit is not None:
+                if hit[0] > now:
+                    self._entries.move_to_end(encoded)
+                    return hit[1]
+                del self._entries[encoded]
+        disk = self._disk()
+        if disk is None:
+            return MISS
+        value, expires_at = disk.get(self.namespace, key)
+        if value is not MISS:
+            self._remember(encoded, value, expires_at)
+        return value
+
+    def set(self, key: Hashable, value):
+        self._remember(_encode_key(key), value, time.time() + self.ttl)
+        disk = self._disk()
+        if disk is not None:
+            disk.set(self.namespace, key, value, self.ttl)
+
+    def _remember(self, encoded: str, value, expires_at: float):
+        with self._lock:
+            self._entries[encoded] = (expires_at, value)
+            self._entries.move_to_end(encoded)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        """Forget one entry, in memory and on disk"""
+        with self._lock:
+            self._entries.pop(_encode_key(key), None)
+        disk = self._disk()
+        if disk is not None:
+            disk.delete(self.namespace, key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        disk = self._disk()
+        if disk is not None:
+            disk.clear(self.namespace)
+
+
+def ttl_cache(seconds: float, max_entries: int = MEMORY_MAX_ENTRIES, persist: Optional[str] = None):
+    """Memoize a function of hashable arguments for `seconds`, like st.cache_data(ttl=...)
+
+    With persist, results are also kept in the disk store under that namespace.
+    """
+    def decorator(fn: Callable):
+        cache = TieredCache(persist, seconds, max_entries)
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            value = cache.get(args)
+            if value is MISS:
+                value = fn(*args)
+                cache.set(args, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -0,0 +1,133 @@
+"""
+Answer-level citation aggregation
+Collapses search results and text annotations that point at the same document chunk,
+so each (doc_title, doc_chunk) is hydrated and rendered once, in score order
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CitationKey = Tuple[str, str]
+
+# Keys Cortex Search uses for relevance when returnConfidenceScores is requested
+SCORE_KEYS = ("confidence_score", "score", "@score")
+
+# Document types on the @DOCS stage: PDFs are cited by chunk text, images by a presigned URL
+TEXT_EXTENSIONS = (".pdf",)
+IMAGE_EXTENSIONS = (".jpeg", ".jpg")
+DOCUMENT_EXTENSIONS = TEXT_EXTENSIONS + IMAGE_EXTENSIONS
+
+
+def document_kind(name: str) -> Optional[str]:
+    """'image' for JPEG files (.jpeg or .jpg), 'text' for PDFs, None for anything else"""
+    name = (name or "").lower()
+    if name.endswith(IMAGE_EXTENSIONS):
+        return "image"
+    if name.endswith(TEXT_EXTENSIONS):
+        return "text"
+    return None
+
+
+def result_score(search_result: dict) -> Optional[float]:
+    """Confidence score of a search result, or None when the service did not return one"""
+    for key in SCORE_KEYS:
+        value = search_result.get(key)
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    scores = search_result.get("@scores")
+    if isinstance(scores, dict) and scores:
+        value = scores.get("cosine_similarity", next(iter(scores.values())))
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class CitationSet:
+    """Citations keyed on (doc_title, doc_chunk) keeping best rank, best score and all source ids"""
+
+    def __init__(self):
+        self._entries: Dict[CitationKey, dict] = {}
+        self.duplicates = 0
+
+    @staticmethod
+    def key(doc_title, doc_chunk) -> CitationKey:
+        # doc_id arrives as int from some events and as str from others
+        return (doc_title or "", "" if doc_chunk is None else str(doc_chunk))
+
+    def add(self, doc_title, doc_chunk, source_id=None, score: Optional[float] = None,
+            rank: Optional[int] = None, chunk: Optional[str] = None) -> dict:
+        """Add one citation occurrence, merging it into an existing entry for the same chunk"""
+        key = self.key(doc_title, doc_chunk)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {
+                'source_id': "" if source_id is None else source_id,
+                'source_ids': [],
+                'doc_title': doc_title or "",
+                'doc_chunk': doc_chunk,
+                'rank': rank,
+                'score': score,
+            }
+            self._entries[key] = entry
+        else:
+            self.duplicates += 1
+
+        if source_id not in (None, "") and source_id not in entry['source_ids']:
+            entry['source_ids'].append(source_id)
+            if entry['source_id'] in (None, ""):
+                entry['source_id'] = source_id
+        if score is not None and (entry['score'] is None or score > entry['score']):
+            entry['score'] = score
+        if rank is not None and (entry['rank'] is None or rank < entry['rank']):
+            entry['rank'] = rank
+        if chunk and not entry.get('chunk'):
+            entry['chunk'] = chunk
+        return entry
+
+    def add_search_result(self, search_result: dict, rank: Optional[int] = None) -> dict:
+        return self.add(
+            search_result.get('doc_title', ''),
+            search_result.get('doc_id'),
+            source_id=search_result.get('source_id', rank),
+            score=result_score(search_result),
+            rank=rank,
+        )
+
+    def extend(self, citations):
+        """Merge plain citation dicts (or another CitationSet) into this one"""
+        for citation in citations:
+            entry = self.add(
+                citation.get('doc_title', ''),
+                citation.get('doc_chunk'),
+                source_id=citation.get('source_id'),
+                score=citation.get('score'),
+                rank=citation.get('rank'),
+                chunk=citation.get('chunk'),
+            )
+            for source_id in citation.get('source_ids', []):
+                if source_id not in entry['source_ids']:
+                    entry['source_ids'].append(source_id)
+        return self
+
+    def ordered(self) -> List[dict]:
+        """Entries by descending score, then by rank, then by first appearance"""
+        entries = list(self._entries.values())
+        position = {id(entry): i for i, entry in enumerate(entries)}
+        return sorted(entries, key=lambda e: (
+            -(e['score'] if e['score'] is not None else float('-inf')),
+            e['rank'] if e['rank'] is not None else float('inf'),
+            position[id(e)],
+        ))
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.ordered())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
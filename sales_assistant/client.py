@@ -0,0 +1,125 @@
+"""
+Cortex Agent REST client
+Builds agent:run payloads for the Sales Analyst / Faq Search tools and sends requests;
+failures raise AgentApiError instead of being written to the UI
+"""
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+from sales_assistant import transport
+from sales_assistant.admission import admit_current
+
+API_ENDPOINT = "/api/v2/cortex/agent:run"
+API_TIMEOUT = 50000  # in milliseconds
+DEFAULT_MODEL = "claude-sonnet-4-5"
+
+CORTEX_SEARCH_DOCUMENTATION = "CORTEX_AGENTS.CORTEX_AGENTS_SALES.DOCS"
+SEMANTIC_MODEL = "@CORTEX_AGENTS.CORTEX_AGENTS_SALES.Cortex_Analyst_Stage/CORTEX_AGENT_SALES.yaml"
+
+ANALYST_TOOL = "Sales Analyst"
+SEARCH_TOOL = "Faq Search"
+ANALYST_TOOL_TYPE = "cortex_analyst_text_to_sql"
+SEARCH_TOOL_TYPE = "cortex_search"
+
+# Internal tool types mapped to the friendly names used in the UI
+TOOL_NAMES = {
+    SEARCH_TOOL_TYPE: SEARCH_TOOL,
+    ANALYST_TOOL_TYPE: ANALYST_TOOL,
+}
+TOOL_TYPES = {name: tool_type for tool_type, name in TOOL_NAMES.items()}
+
+ANALYST_INSTRUCTION = """You have access to the Sales Analyst tool which can query the sales database.
+Use it to answer any questions about orders, sales data, revenue, or metrics.
+Extract the data-related parts of the question and query the database."""
+
+SEARCH_INSTRUCTION = """You have access to the Faq Search tool which searches through documentation and policy documents.
+Use it to answer questions about policies, procedures, and guidelines.
+Extract the policy-related parts of the question and search the documentation."""
+
+BOTH_INSTRUCTION = """Answer the user's question using the available tools. Be concise and direct."""
+
+
+class AgentApiError(Exception):
+    """A Cortex REST call failed or returned a body that is not JSON"""
+
+    def __init__(self, message: str, response: Optional[dict] = None):
+        super().__init__(message)
+        self.response = response
+
+
+def request(method: str, path: str, body: Optional[dict] = None, stream: bool = False,
+            timeout_ms: int = API_TIMEOUT):
+    """Send one REST request and return the decoded JSON body (the event list when streaming)"""
+    resp = transport.send_snow_api_request(
+        method,
+        path,
+        {},  # headers
+        {'stream': True} if stream else {},  # query params
+        body if body is not None else {},
+        None,  # request_guid
+        timeout_ms,
+    )
+    if resp["status"] not in (200, 201):
+        raise AgentApiError(f"HTTP Error: {resp['status']} - {resp.get('reason', 'Unknown reason')}", resp)
+    try:
+        return json.loads(resp["content"])
+    except (json.JSONDecodeError, TypeError):
+        raise AgentApiError("Failed to parse API response. The server may have returned an invalid JSON format.", resp)
+
+
+def search_resource(max_results: int, service: str = CORTEX_SEARCH_DOCUMENTATION) -> dict:
+    return {
+        "name": service,
+        "max_results": max_results,
+        "title_column": "RELATIVE_PATH",
+        "id_column": "CHUNK_INDEX",
+        "experimental": {"returnConfidenceScores": True},
+    }
+
+
+def tool_config(tool_filter: Optional[str] = None, max_results: int = 3,
+                search_service: str = CORTEX_SEARCH_DOCUMENTATION,
+                semantic_model: str = SEMANTIC_MODEL) -> Tuple[List[dict], Dict[str, dict], str]:
+    """(tools, tool_resources, response_instruction) for tool_filter None (both tools), 'search_only' or 'analyst_only'"""
+    analyst = {"tool_spec": {"type": ANALYST_TOOL_TYPE, "name": ANALYST_TOOL}}
+    search = {"tool_spec": {"type": SEARCH_TOOL_TYPE, "name": SEARCH_TOOL}}
+
+    if tool_filter == 'analyst_only':
+        return [analyst], {ANALYST_TOOL: {"semantic_model_file": semantic_model}}, ANALYST_INSTRUCTION
+    if tool_filter == 'search_only':
+        return [search], {SEARCH_TOOL: search_resource(max_results, search_service)}, SEARCH_INSTRUCTION
+    return (
+        [analyst, search],
+        {
+            ANALYST_TOOL: {"semantic_model_file": semantic_model},
+            SEARCH_TOOL: search_resource(max_results, search_service),
+        },
+        BOTH_INSTRUCTION,
+    )
+
+
+def agent_payload(query: str, model: str = DEFAULT_MODEL, tools: Optional[List[dict]] = None,
+                  tool_resources: Optional[Dict[str, dict]] = None,
+                  response_instruction: Optional[str] = None) -> dict:
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": [{"type": "text", "text": query}]}],
+    }
+    if tools is not None:
+        payload["tools"] = tools
+        payload["tool_resources"] = tool_resources or {}
+    if response_instruction:
+        payload["response_instruction"] = response_instruction
+    return payload
+
+
+def run_agent(payload: dict, endpoint: str = API_ENDPOINT, timeout_ms: int = API_TIMEOUT,
+              timings: Optional[Dict[str, float]] = None) -> list:
+    """Streaming agent:run call; returns the list of SSE events
+
+    Admission controlled: raises admission.AdmissionRejected when the caller is rate limited or the app is busy.
+    timings gets the call's time after admission (see admission.admit_current).
+    """
+    with admit_current(timings):
+        return request("POST", endpoint, payload, stream=True, timeout_ms=timeout_ms)
@@ -0,0 +1,234 @@
+"""
+Per-question deadlines and cooperative cancellation
+A Deadline carries one question's total latency budget and a cancel flag. Each stage
+gets a timeout sized from its observed p95, capped by what is left of the budget
+after later stages are reserved their share. Blocking waits made inside within(deadline)
+(the REST call itself, a coalesced call, the admission queue) give up early with
+Cancelled or DeadlineExceeded. A call that is given up on keeps running on its worker
+thread until the transport's own timeout, and its result is discarded; code that accounts
+for the work (admission slots) collects such calls with abandoned_calls() and waits for
+them to really end.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+MIN_STAGE_TIMEOUT_MS = 3000.0  # never give a stage less, unless the budget itself is smaller
+STAGE_HEADROOM = 1.5  # stage timeout = observed p95 * headroom
+POLL_INTERVAL = 0.25  # seconds between heartbeats while waiting
+CANCEL_CHECK = 0.05  # how quickly a wait notices a cancel
+
+
+class Cancelled(Exception):
+    """The question was withdrawn: the user asked something new or reset the conversation"""
+
+
+class DeadlineExceeded(Exception):
+    """A stage or the whole question ran out of time; the message is meant for the user"""
+
+
+class PendingCall:
+    """A worker call run() stopped waiting for; callbacks run when it really ends"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def finish(self):
+        with self._lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def when_done(self, callback: Callable[[], None]):
+        """Run callback once the call ends (now, if it already has)"""
+        with self._lock:
+            if not self.done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+_abandoned = contextvars.ContextVar("abandoned_calls", default=None)
+
+
+@contextmanager
+def abandoned_calls():
+    """The PendingCalls that run() gave up on inside the block (still running or since finished)"""
+    calls: List[PendingCall] = []
+    token = _abandoned.set(calls)
+    try:
+        yield calls
+    finally:
+        _abandoned.reset(token)
+
+
+class Deadline:
+    """Latency budget and cancel flag for one question
+
+    heartbeat, if given, is called between polls while waiting; the Streamlit views use it
+    to reach a script checkpoint so a rerun can interrupt the wait. An exception from it
+    cancels the question and is kept in interrupt for the view to re-raise.
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None, heartbeat: Optional[Callable[[], None]] = None):
+        self.budget_ms = budget_ms
+        self.expires_at = None if budget_ms is None else time.monotonic() + budget_ms / 1000
+        self.heartbeat = heartbeat
+        self.interrupt: Optional[Exception] = None
+        self.parent: Optional["Deadline"] = None
+        self._cancelled = threading.Event()
+
+    def child(self) -> "Deadline":
+        """Same time limit, but cancellable on its own (e.g. one speculative call); cancelling self cancels it too"""
+        child = Deadline()
+        child.budget_ms, child.expires_at, child.parent = self.budget_ms, self.expires_at, self
+        return child
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        deadline = self
+        while deadline is not None:
+            if deadline._cancelled.is_set():
+                return True
+            deadline = deadline.parent
+        return False
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return (self.expires_at - time.monotonic()) * 1000
+
+    def check(self):
+        """Raise Cancelled or DeadlineExceeded if the question should stop"""
+        if self.cancelled:
+            raise Cancelled()
+        remaining = self.remaining_ms()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"⏱️ This question ran past its {self.budget_ms / 1000:.0f}s time limit.")
+
+    def stage_timeout_ms(self, p95_ms: Optional[float], ceiling_ms: float, reserve_ms: float = 0.0) -> int:
+        """Timeout for one stage: p95 with headroom (ceiling_ms when unknown), leaving reserve_ms for later stages"""
+        self.check()
+        timeout = ceiling_ms if p95_ms is None else max(MIN_STAGE_TIMEOUT_MS, p95_ms * STAGE_HEADROOM)
+        remaining = self.remaining_ms()
+        if remaining is not None:
+            timeout = min(timeout, max(remaining - reserve_ms, min(MIN_STAGE_TIMEOUT_MS, remaining)))
+        return int(min(timeout, ceiling_ms))
+
+    def wait(self, event: threading.Event, timeout_s: Optional[float] = None) -> bool:
+        """Wait for event like Event.wait, but raise as soon as the question is cancelled or out of time"""
+        until = None if timeout_s is None else time.monotonic() + timeout_s
+        while True:
+            self.check()
+            step = POLL_INTERVAL
+            remaining = self.remaining_ms()
+            if remaining is not None:
+                step = min(step, max(remaining / 1000, 0.0))
+            if until is not None:
+                step = min(step, max(until - time.monotonic(), 0.0))
+            if self._wait_step(event, step):
+                return True
+            if until is not None and time.monotonic() >= until:
+                return False
+            if self.heartbeat is not None:
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    # Raised as Cancelled so broad except clauses in between cannot swallow it
+                    self.interrupt = e
+                    self.cancel()
+                    raise Cancelled() from e
+
+    def _wait_step(self, event: threading.Event, seconds: float) -> bool:
+        """event.wait(seconds) that also returns within CANCEL_CHECK of a cancel"""
+        end = time.monotonic() + seconds
+        while True:
+            if event.wait(min(CANCEL_CHECK, max(end - time.monotonic(), 0.0))):
+                return True
+            if self.cancelled or time.monotonic() >= end:
+                return False
+
+    @staticmethod
+    def _abandon(call: PendingCall):
+        calls = _abandoned.get()
+        if calls is not None and not call.done.is_set():
+            calls.append(call)
+
+    def run(self, fn: Callable[[], T], timeout_ms: float) -> T:
+        """Run a blocking call on a worker thread; stop waiting for it on cancel or after timeout_ms
+
+        A call given up on is added to the enclosing abandoned_calls() block, if any.
+        """
+        call = PendingCall()
+        outcome = {}
+        context = contextvars.copy_context()
+
+        def work():
+            try:
+                outcome["result"] = context.run(fn)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                call.finish()
+
+        threading.Thread(target=work, name="cortex-call", daemon=True).start()
+        try:
+            finished = self.wait(call.done, timeout_ms / 1000)
+        except DeadlineExceeded:
+            self._abandon(call)
+            raise
+        except BaseException:
+            # Cancelled from another thread or by the heartbeat: stop the rest of the question too
+            self.cancel()
+            self._abandon(call)
+            raise
+        if not finished:
+            self._abandon(call)
+            raise DeadlineExceeded(f"⏱️ The request timed out after {timeout_ms / 1000:.1f}s.")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def within(deadline: Optional[Deadline]):
+    """Apply deadline to every Cortex call and wait made inside the block"""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def check_current():
+    """Raise if the calling context's question was cancelled or is out of time"""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def wait_for(event: threading.Event):
+    """event.wait() that respects the calling context's deadline"""
+    deadline = _current.get()
+    if deadline is None:
+        event.wait()
+    else:
+        deadline.wait(event)
@@ -0,0 +1,162 @@
+"""
+Typed events decoded from Cortex Agent SSE responses
+Both API dialects decode to the same compact objects:
+    agent:run with inline tools   message.delta -> delta.content[] (tool_use, tool_results, text)
+    pre-configured agents         response -> content[] (tool_use, tool_result, text + annotations), metadata
+    both                          error -> message (the run failed, e.g. a tool could not load its resource)
+Decoding is table driven: one function per event name and one per content item type.
+Consecutive text deltas are joined, so a token stream becomes a handful of objects.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+
+@dataclass
+class TextDelta:
+    __slots__ = ("text",)
+    text: str
+
+
+@dataclass
+class ToolUse:
+    __slots__ = ("name", "tool_type")
+    name: str
+    tool_type: str
+
+
+@dataclass
+class ToolResult:
+    __slots__ = ("text", "sql", "search_results")
+    text: str
+    sql: str
+    search_results: list
+
+
+@dataclass
+class Citation:
+    __slots__ = ("doc_title", "doc_id", "source_id")
+    doc_title: str
+    doc_id: str
+    source_id: int
+
+
+@dataclass
+class Metadata:
+    __slots__ = ("data",)
+    data: dict
+
+
+@dataclass
+class StreamError:
+    __slots__ = ("message",)
+    message: str
+
+
+_EMPTY: dict = {}
+
+
+class _Sink:
+    """Decoded events; adjacent text deltas are joined into one TextDelta instead of one per token"""
+    __slots__ = ("events", "text")
+
+    def __init__(self):
+        self.events: list = []
+        self.text: List[str] = []
+
+    def emit(self, event):
+        if self.text:
+            self.flush()
+        self.events.append(event)
+
+    def flush(self):
+        if self.text:
+            self.events.append(TextDelta("".join(self.text)))
+            self.text = []
+
+
+def _decode_text(item: dict, sink: _Sink):
+    text = item.get("text")
+    if text:
+        sink.text.append(text)
+    annotations = item.get("annotations")
+    if annotations:
+        for annotation in annotations:
+            if annotation.get("type") == "cortex_search_citation":
+                sink.emit(Citation(annotation.get("doc_title", ""), annotation.get("doc_id", ""), annotation.get("index", 0)))
+
+
+def _decode_tool_use(item: dict, sink: _Sink):
+    tool_use = item.get("tool_use") or _EMPTY
+    sink.emit(ToolUse(tool_use.get("name", ""), tool_use.get("type", "")))
+
+
+def _decode_json_results(results, sink: _Sink):
+    for result in results or ():
+        if result.get("type") == "json":
+            data = result.get("json") or _EMPTY
+            sink.emit(ToolResult(
+                data.get("text", ""),
+                data.get("sql", ""),
+                data.get("searchResults") or data.get("search_results") or [],
+            ))
+
+
+def _decode_tool_results(item: dict, sink: _Sink):
+    _decode_json_results((item.get("tool_results") or _EMPTY).get("content"), sink)
+
+
+def _decode_tool_result(item: dict, sink: _Sink):
+    _decode_json_results((item.get("tool_result") or _EMPTY).get("content"), sink)
+
+
+CONTENT_DECODERS: Dict[str, Callable[[dict, _Sink], None]] = {
+    "text": _decode_text,
+    "tool_use": _decode_tool_use,
+    "tool_results": _decode_tool_results,  # agent:run dialect
+    "tool_result": _decode_tool_result,  # pre-configured agent dialect
+}
+
+
+def _decode_content(items, sink: _Sink):
+    for item in items or ():
+        decoder = CONTENT_DECODERS.get(item.get("type"))
+        if decoder is not None:
+            decoder(item, sink)
+
+
+def _decode_message_delta(data: dict, sink: _Sink):
+    _decode_content((data.get("delta") or _EMPTY).get("content"), sink)
+
+
+def _decode_response(data: dict, sink: _Sink):
+    _decode_content(data.get("content"), sink)
+
+
+def _decode_metadata(data: dict, sink: _Sink):
+    sink.emit(Metadata(data))
+
+
+def _decode_error(data: dict, sink: _Sink):
+    sink.emit(StreamError(str(data.get("message") or data.get("code") or "unknown error")))
+
+
+EVENT_DECODERS: Dict[str, Callable[[dict, _Sink], None]] = {
+    "message.delta": _decode_message_delta,
+    "response": _decode_response,
+    "metadata": _decode_metadata,
+    "error": _decode_error,
+}
+
+
+def decode(raw_events) -> List[object]:
+    """Typed events in stream order; unknown event and content types are skipped"""
+    sink = _Sink()
+    for raw in raw_events:
+        decoder = EVENT_DECODERS.get(raw.get("event"))
+        if decoder is not None:
+            data = raw.get("data")
+            if isinstance(data, dict):
+                decoder(data, sink)
+    sink.flush()
+    return sink.events
@@ -0,0 +1,132 @@
+"""
+Precomputed answers for the most asked policy questions
+faq_precompute.py answers the top policy questions from the query log offline and stores
+them in FAQ_ANSWERS, tagged with a fingerprint of DOCS_CHUNKS_TABLE. The app keeps the
+rows for the current corpus in memory; a search-only question with the same key is
+answered without an agent call, and a re-ingested corpus retires every stored answer.
+Reloading runs on a background thread every FAQ_REFRESH_SECONDS; questions are served
+from the answers already loaded meanwhile.
+"""
+
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sales_assistant.session import borrowed_session, get_session
+from sales_assistant.statements import prepare
+
+FAQ_TABLE = "FAQ_ANSWERS"
+CHUNKS_TABLE = "DOCS_CHUNKS_TABLE"
+FAQ_REFRESH_SECONDS = 300  # how often the loaded answers are checked against the corpus
+
+# Changes whenever any chunk is added, removed or edited
+CORPUS_VERSION_SQL = f"SELECT TO_VARCHAR(HASH_AGG(RELATIVE_PATH, CHUNK_INDEX, CHUNK)) FROM {CHUNKS_TABLE}"
+
+# Words that do not change which FAQ a question asks for
+KEY_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "in", "on", "for", "and", "or",
+    "what", "whats", "how", "do", "does", "did", "can", "could", "i", "my", "me", "we", "our", "you",
+    "your", "it", "this", "that", "with", "about", "tell", "please", "there", "any", "if", "work",
+    "works", "explain", "describe", "s",
+}
+
+CORPUS_VERSION = prepare("corpus_version", CORPUS_VERSION_SQL)
+CURRENT_ANSWERS = prepare(
+    "faq_answers",
+    f"SELECT QUESTION_KEY, ANSWER, CITATIONS FROM {FAQ_TABLE} WHERE CORPUS_VERSION = ({CORPUS_VERSION_SQL})",
+)
+
+FaqAnswer = Tuple[str, str, List[dict]]  # (text, sql, citations), like the local index
+
+
+def question_key(question: str) -> str:
+    """Order-free content words with plurals folded: "How do refunds work?" -> "refund" """
+    words = set()
+    for word in re.findall(r"[a-z0-9]+", (question or "").lower()):
+        if word in KEY_STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return " ".join(sorted(words))
+
+
+def corpus_version(session) -> str:
+    return CORPUS_VERSION.scalar(session=session, default="")
+
+
+class FaqStore:
+    """In-memory copy of the precomputed answers that match the current corpus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._answers: Dict[str, FaqAnswer] = {}
+        self.loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, session):
+        rows = CURRENT_ANSWERS.rows(session=session)
+        answers = {row["QUESTION_KEY"]: (row["ANSWER"], "", json.loads(row["CITATIONS"] or "[]")) for row in rows}
+        with self._lock:
+            self._answers = answers
+            self.loaded_at = time.time()
+
+    def lookup(self, question: str) -> Optional[FaqAnswer]:
+        key = question_key(question)
+        with self._lock:
+            hit = self._answers.get(key) if key else None
+            if hit is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        text, sql, citations = hit
+        return text, sql, [dict(c) for c in citations]
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"answers": len(self._answers), "hits": self.hits, "misses": self.misses}
+
+
+_store = FaqStore()
+_refresh_lock = threading.Lock()
+_refresh_busy = False
+_refresh_checked_at = 0.0
+
+
+def get_faq_store() -> FaqStore:
+    return _store
+
+
+def _refresh():
+    """Reload the answers for the current corpus off the request path"""
+    global _refresh_busy
+    try:
+        with borrowed_session() as session:
+            _store.load(session)
+    except Exception:
+        pass  # no table yet, or no session: retried FAQ_REFRESH_SECONDS later
+    finally:
+        with _refresh_lock:
+            _refresh_busy = False
+
+
+def lookup_faq(question: str) -> Optional[FaqAnswer]:
+    """Precomputed answer for a search-only question; None means answer it another way
+
+    A due reload is started in the background, at most one at a time; this question is
+    looked up in what is loaded already (nothing before the first load finishes).
+    """
+    global _refresh_busy, _refresh_checked_at
+    with _refresh_lock:
+        due = time.time() - _refresh_checked_at > FAQ_REFRESH_SECONDS
+        if due and not _refresh_busy:
+            _refresh_busy, _refresh_checked_at = True, time.time()
+            try:
+                get_session()  # resolve the session on the request thread, where Streamlit provides it
+                threading.Thread(target=_refresh, name="faq-refresh", daemon=True).start()
+            except Exception:
+                _refresh_busy = False  # no session here: retried next interval
+    return _store.lookup(question)
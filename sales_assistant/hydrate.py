@@ -0,0 +1,60 @@
+"""
+Citation hydration: chunk text for PDF citations, presigned URLs for image citations
+Lookups are cached with a TTL in memory and in the host-wide disk store, so a chunk cited
+again is not re-queried, even after a restart; misses run as bound statements, side by
+side on pooled sessions
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from sales_assistant.cache import ttl_cache
+from sales_assistant.citations import CitationSet, document_kind
+from sales_assistant.session import get_session_pool
+from sales_assistant.statements import prepare
+
+CHUNK_TEXT_TTL = 3600
+PRESIGNED_URL_TTL = 1800  # below the URL's 1 hour expiry
+
+CHUNK_TEXT = prepare(
+    "chunk_text", "SELECT CHUNK FROM DOCS_CHUNKS_TABLE WHERE RELATIVE_PATH = ? AND CHUNK_INDEX = ?",
+)
+PRESIGNED_URL = prepare("presigned_url", "SELECT GET_PRESIGNED_URL('@DOCS', ?) AS URL")
+
+
+@ttl_cache(CHUNK_TEXT_TTL, persist="chunk_text")
+def fetch_chunk_text(doc_title: str, doc_chunk) -> str:
+    return CHUNK_TEXT.scalar([doc_title, doc_chunk], default="No text available")
+
+
+@ttl_cache(PRESIGNED_URL_TTL, persist="presigned_url")
+def fetch_presigned_url(doc_title: str) -> str:
+    return PRESIGNED_URL.scalar([doc_title], default="No URL available")
+
+
+def citation_kind(doc_title: str) -> Optional[str]:
+    """'image' for JPEG citations (.jpeg or .jpg), 'text' for PDF chunks, None for anything else"""
+    return document_kind(doc_title)
+
+
+def hydrate_citations(citations) -> List[dict]:
+    """One entry per (doc_title, doc_chunk), highest confidence first, with 'kind' and 'content' filled in
+
+    Chunk text already carried by a citation (local index answers) is used as-is.
+    """
+    def content(citation: dict, kind: str) -> str:
+        if kind == "image":
+            return fetch_presigned_url(citation["doc_title"])
+        return citation.get("chunk") or fetch_chunk_text(citation["doc_title"], citation.get("doc_chunk", ""))
+
+    wanted = []
+    for citation in CitationSet().extend(citations):
+        kind = citation_kind(citation.get("doc_title", ""))
+        if kind:
+            wanted.append((citation, kind))
+    if len(wanted) < 2:
+        return [{**c, "kind": kind, "content": content(c, kind)} for c, kind in wanted]
+    # Lookups for different citations do not depend on each other; the pool bounds how many run at once
+    with ThreadPoolExecutor(max_workers=min(len(wanted), get_session_pool().size)) as pool:
+        contents = list(pool.map(lambda item: content(*item), wanted))
+    return [{**c, "kind": kind, "content": text} for (c, kind), text in zip(wanted, contents)]
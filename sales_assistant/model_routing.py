@@ -0,0 +1,127 @@
+"""
+Model routing by call type, query complexity and latency budget
+The model picked in the sidebar is the most capable one a request may use. Cheap
+calls (the intent split, simple search summaries) go to the fastest model; analyst
+SQL and complex questions keep the selected model unless its observed latency no
+longer fits the request's remaining budget. Latency per (model, call type) is
+learned from recorded timings, starting from rough priors.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Most capable first; the app only offers these in the model selector
+MODELS = ["claude-sonnet-4-5", "claude-3-7-sonnet", "claude-3-5-sonnet"]
+
+# Starting p95 estimates (ms) per model until enough timings are recorded
+PRIOR_P95_MS = {
+    "claude-sonnet-4-5": 14000.0,
+    "claude-3-7-sonnet": 11000.0,
+    "claude-3-5-sonnet": 8000.0,
+}
+DEFAULT_PRIOR_MS = 12000.0
+
+LATENCY_BUDGET_MS = 45000.0  # end-to-end budget per question, below API_TIMEOUT
+WINDOW = 200  # recent timings kept per (model, call type)
+MIN_SAMPLES = 5  # timings needed before they replace the prior
+
+# Call types
+INTENT = "intent"
+SEARCH = "search"
+ANALYST = "analyst"
+AGENT = "agent"
+
+# Questions scoring below this are "simple"
+SIMPLE_COMPLEXITY = 0.35
+
+COMPLEX_PATTERNS = [
+    r"\bcompar", r"\bversus\b", r"\bvs\.?\b", r"\btrend", r"\bgrowth\b", r"\bbreakdown\b",
+    r"\bby (month|week|quarter|region|channel|category|customer|product)\b", r"\bper\b", r"\beach\b",
+    r"\btop \d+\b", r"\brank", r"\bratio\b", r"\bpercent", r"\bcorrelat", r"\byear over year\b",
+    r"\byoy\b", r"\bcohort", r"\bwhy\b", r"\bexcept\b", r"\bexcluding\b",
+]
+_COMPLEX_RE = re.compile("|".join(COMPLEX_PATTERNS))
+
+
+def query_complexity(query: str) -> float:
+    """0 (lookup-style question) .. 1 (multi-part analysis) from length, analysis words and clauses"""
+    text = (query or "").lower()
+    words = len(text.split())
+    signals = len(_COMPLEX_RE.findall(text))
+    clauses = text.count(" and ") + text.count(",")
+    return min(1.0, words / 40 + 0.25 * signals + 0.1 * clauses)
+
+
+class ModelRouter:
+    """Chooses a model per call and learns per-model latency from observed timings"""
+
+    def __init__(self, models: Optional[List[str]] = None):
+        self.models = list(models or MODELS)
+        self._lock = threading.Lock()
+        self._timings: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def record(self, model: str, call_type: str, elapsed_ms: float):
+        with self._lock:
+            self._timings.setdefault((model, call_type), deque(maxlen=WINDOW)).append(elapsed_ms)
+
+    def p95(self, model: str, call_type: str) -> float:
+        with self._lock:
+            samples = list(self._timings.get((model, call_type), ()))
+        if len(samples) < MIN_SAMPLES:
+            return PRIOR_P95_MS.get(model, DEFAULT_PRIOR_MS)
+        samples.sort()
+        return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+    def candidates(self, preferred: str) -> List[str]:
+        """The preferred model and every less capable (cheaper) one"""
+        if preferred not in self.models:
+            return [preferred]
+        return self.models[self.models.index(preferred):]
+
+    def fastest(self, models: List[str], call_type: str) -> str:
+        return min(models, key=lambda m: self.p95(m, call_type))
+
+    def choose(self, call_type: str, query: str, preferred: str, remaining_ms: Optional[float] = None) -> str:
+        candidates = self.candidates(preferred)
+        if len(candidates) == 1:
+            return preferred
+
+        if call_type == INTENT:
+            return self.fastest(candidates, call_type)
+        if call_type == SEARCH and query_complexity(query) < SIMPLE_COMPLEXITY:
+            return self.fastest(candidates, call_type)
+
+        # Quality matters: the most capable model that still fits the remaining budget
+        if remaining_ms is not None:
+            for model in candidates:
+                if self.p95(model, call_type) <= remaining_ms:
+                    return model
+            return self.fastest(candidates, call_type)
+        return preferred
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            keys = list(self._timings)
+        return {f"{model}/{call_type}": round(self.p95(model, call_type)) for model, call_type in sorted(keys)}
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def set_model_router(router: Optional[ModelRouter]):
+    """Replace the process-wide router (e.g. one with a simulated clock); None starts a fresh one"""
+    global _router
+    with _router_lock:
+        _router = router
+
+
+def get_model_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
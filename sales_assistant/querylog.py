@@ -0,0 +1,209 @@
+"""
+Structured query log
+One JSON line per answered question: the question, routing (route, intent flags, tools
+called, model per stage), the generated SQL and its hash, cited chunks, per-stage
+latencies and response sizes. Records are buffered in memory and appended by a background thread
+every FLUSH_INTERVAL seconds, so logging never blocks an answer; each process writes its
+own daily file under QUERY_LOG_DIR, which (like the cache directory) is created 0700 and
+never written to if another OS user owns it. query_log_report.py, faq_precompute.py and
+verified_queries.py read them.
+
+SALES_ASSISTANT_QUERY_LOG=0 turns logging off.
+"""
+
+import atexit
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+from sales_assistant.cache import app_dir, private_dir
+from sales_assistant.client import TOOL_TYPES
+from sales_assistant.results import AgentResult, Answer
+
+QUERY_LOG_DIR = os.environ.get("SALES_ASSISTANT_QUERY_LOG_DIR", app_dir("sales_assistant_query_log"))
+QUERY_LOG_ENABLED = os.environ.get("SALES_ASSISTANT_QUERY_LOG", "1") != "0"
+
+FLUSH_INTERVAL = 2.0  # seconds between background flushes
+MAX_BUFFERED = 10000  # records held while the disk is slow; newer ones are dropped beyond this
+
+
+def sql_hash(sql: str) -> Optional[str]:
+    """Stable id of a generated statement, ignoring case and whitespace"""
+    if not sql or not sql.strip():
+        return None
+    return hashlib.sha1(" ".join(sql.lower().split()).encode("utf-8")).hexdigest()[:16]
+
+
+def citation_ids(citations: List[dict]) -> List[str]:
+    ids = []
+    for citation in citations:
+        if citation.get("doc_title"):
+            ids.append(f"{citation['doc_title']}#{citation.get('doc_chunk', '')}")
+        elif citation.get("source_id") is not None:
+            ids.append(str(citation["source_id"]))
+    return ids
+
+
+def answer_record(app: str, query: str, model: str, answer: Answer, total_ms: float) -> Dict:
+    """Log record for a routed answer (the client-side orchestration app and batch jobs)"""
+    return {
+        "ts": time.time(),
+        "app": app,
+        "query": query,
+        "route": answer.route,
+        "intent": answer.intent,
+        "model": model,
+        "models": answer.models,
+        "tools": answer.tools_called,
+        "tool_types": [TOOL_TYPES[name] for name in answer.tools_called if name in TOOL_TYPES],
+        "cache_hits": answer.cache_hits,
+        "sql_hash": sql_hash(answer.sql),
+        "sql": answer.sql,
+        "citations": citation_ids(answer.citations),
+        "timings_ms": {stage: round(ms, 1) for stage, ms in answer.timings_ms.items()},
+        "total_ms": round(total_ms, 1),
+        "text_chars": len(answer.text),
+        "sql_chars": len(answer.sql),
+        "errors": [n.message for n in answer.notices if n.level in ("warning", "error")],
+    }
+
+
+def agent_record(app: str, query: str, model: str, result: AgentResult, total_ms: float,
+                 timings_ms: Optional[Dict[str, float]] = None) -> Dict:
+    """Log record for a question the pre-configured agent orchestrated itself
+
+    timings_ms: per-stage times (queue, agent, parse); without them the whole total counts as agent time.
+    """
+    return {
+        "ts": time.time(),
+        "app": app,
+        "query": query,
+        "route": "agent",
+        "intent": {},
+        "model": model,
+        "models": {"agent": model},
+        "tools": result.tools_called,
+        "tool_types": result.tool_types,  # the agent spec names its tools; the types are stable
+        "cache_hits": ["agent"] if result.cached else [],
+        "sql_hash": sql_hash(result.sql),
+        "sql": result.sql,
+        "citations": citation_ids(result.citations),
+        "timings_ms": {stage: round(ms, 1) for stage, ms in (timings_ms or {"agent": total_ms}).items()},
+        "total_ms": round(total_ms, 1),
+        "text_chars": len(result.text),
+        "sql_chars": len(result.sql),
+        "errors": [n.message for n in result.notices if n.level in ("warning", "error")],
+    }
+
+
+class QueryLog:
+    """Append-only JSONL log with a buffered, asynchronous writer"""
+
+    def __init__(self, directory: str, flush_interval: float = FLUSH_INTERVAL, max_buffered: int = MAX_BUFFERED):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._buffer: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+
+    def log(self, record: Dict):
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            if len(self._buffer) >= self.max_buffered:
+                self.dropped += 1
+                return
+            self._buffer.append(line)
+            self.logged += 1
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="query-log", daemon=True)
+                self._writer.start()
+
+    def path(self) -> str:
+        return os.path.join(self.directory, f"queries-{time.strftime('%Y%m%d')}-{os.getpid()}.jsonl")
+
+    def flush(self):
+        """Write everything buffered so far"""
+        with self._write_lock:
+            with self._lock:
+                lines = list(self._buffer)
+                self._buffer.clear()
+            if not lines:
+                return
+            try:
+                private_dir(self.directory)
+                with open(self.path(), "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            except OSError:  # including UnsafeCacheDir
+                with self._lock:
+                    self.dropped += len(lines)
+                return
+            with self._lock:
+                self.written += len(lines)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"logged": self.logged, "written": self.written, "dropped": self.dropped,
+                    "buffered": len(self._buffer)}
+
+
+_log: Optional[QueryLog] = None
+_log_lock = threading.Lock()
+
+
+def get_query_log() -> Optional[QueryLog]:
+    """The process-wide log, or None when disabled"""
+    global _log
+    if _log is None and QUERY_LOG_ENABLED:
+        with _log_lock:
+            if _log is None:
+                _log = QueryLog(QUERY_LOG_DIR)
+                atexit.register(_log.flush)
+    return _log
+
+
+def log_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories into the log files they hold"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "queries-*.jsonl"))))
+        else:
+            files.append(path)
+    return files
+
+
+def read_records(paths: Iterable[str], since: Optional[float] = None) -> Iterator[Dict]:
+    """Records from log files and directories, oldest file first; lines cut short by a crash mid-flush are skipped"""
+    for path in log_files(paths):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+
+def log_query(record: Dict):
+    query_log = get_query_log()
+    if query_log is not None:
+        query_log.log(record)
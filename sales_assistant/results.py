@@ -0,0 +1,50 @@
+"""
+Result objects returned by the core instead of writing to the UI
+Views decide how to render notices; batch jobs just read the fields
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sales_assistant.cache import cacheable
+
+
+@cacheable
+@dataclass
+class Notice:
+    """A message for the user; debug notices are only meant for debug mode"""
+    level: str  # "info", "success", "warning" or "error", i.e. st.<level> in the apps
+    message: str
+    debug: bool = False
+
+
+@cacheable
+@dataclass
+class AgentResult:
+    """Everything extracted from one agent SSE response"""
+    text: str = ""
+    sql: str = ""
+    citations: List[dict] = field(default_factory=list)
+    dropped: List[dict] = field(default_factory=list)
+    tools_called: List[str] = field(default_factory=list)
+    tool_types: List[str] = field(default_factory=list)  # e.g. cortex_analyst_text_to_sql, whatever the tool's name
+    metadata: Dict = field(default_factory=dict)
+    event_count: int = 0
+    notices: List[Notice] = field(default_factory=list)
+    cached: bool = False  # served from the answer cache, no agent call made
+    service_ms: float = 0.0  # agent:run time once admitted, without queueing or waiting on a shared call
+
+
+@dataclass
+class Answer:
+    """A routed answer to one user question"""
+    text: str = ""
+    sql: str = ""
+    citations: List[dict] = field(default_factory=list)
+    route: str = ""
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    models: Dict[str, str] = field(default_factory=dict)  # stage -> model that served it
+    notices: List[Notice] = field(default_factory=list)
+    intent: Dict[str, bool] = field(default_factory=dict)  # needs_search / needs_analyst / needs_both
+    tools_called: List[str] = field(default_factory=list)
+    cache_hits: List[str] = field(default_factory=list)  # stages served from the answer cache
@@ -0,0 +1,613 @@
+"""
+Client-side orchestration
+Decides which tools a question needs (keywords, plus an LLM split for compound
+questions), answers search-only questions from the local index when it is confident,
+and calls the agent once per tool otherwise. Compound questions start both tool calls
+with the full question while the split runs, and only restart the ones whose split
+sub-query asks something the full question did not.
+"""
+
+import contextvars
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Dict, Optional, Tuple
+
+from sales_assistant import client, sse
+from sales_assistant.admission import POLL_INTERVAL, AdmissionRejected, admit_current, one_question, report_queue_position
+from sales_assistant.cache import MISS, TieredCache
+from sales_assistant.deadline import Cancelled, Deadline, DeadlineExceeded, current_deadline, within
+from sales_assistant.faq import lookup_faq
+from sales_assistant.model_routing import INTENT, LATENCY_BUDGET_MS, get_model_router
+from sales_assistant.results import AgentResult, Answer, Notice
+from sales_assistant.search_tuning import get_search_tuner
+from sales_assistant.semantic_model import forget_variant, semantic_model_for
+from sales_assistant.session import borrowed_session, get_session
+from sales_assistant.statements import prepare
+from sales_assistant.singleflight import get_single_flight, normalize_query
+
+CLIENT_SIDE = "Client-Side (Reliable)"
+LLM_BASED = "LLM-Based (Experimental)"
+
+LOCAL_INDEX_REFRESH_SECONDS = 300  # how often the local FAQ index checks DOCS_CHUNKS_TABLE for new chunks
+GROUNDED_ANSWER_TIMEOUT_MS = 8000  # longest a local-index answer waits for its completion before showing excerpts
+ANSWER_TTL = 600  # how long a tool call's answer is reused for the same question
+
+# Keywords that indicate FAQ/Policy search needs
+SEARCH_KEYWORDS = ['policy', 'procedure', 'how do i', 'how to', 'what is the process',
+                   'refund', 'return policy', 'shipping', 'warranty', 'faq', 'guidelines',
+                   'rules', 'documentation', 'manual', 'instructions']
+
+# Keywords that indicate database query needs
+ANALYST_KEYWORDS = ['how many', 'count', 'total', 'number of', 'sum', 'average',
+                    'orders', 'revenue', 'sales', 'metrics', 'statistics', 'data',
+                    '2024', '2025', 'last year', 'this year', 'yesterday', 'today',
+                    'last month', 'last week', 'quarter', 'ytd', 'amount', 'returned']
+
+SPLIT_PROMPT = """Analyze this user query and split it into two parts:
+
+User Query: "{query}"
+
+Instructions:
+1. SEARCH_QUERY: Extract ONLY the parts asking about policies, procedures, guidelines, or documentation (e.g., return policy, refund policy, shipping policy)
+2. ANALYST_QUERY: Extract ONLY the parts asking for data, metrics, counts, or quantitative information from the database (e.g., order counts, amounts, revenue)
+
+Rules:
+- Each part should be a complete, standalone question
+- If a part of the query needs both tools, include it in BOTH queries
+- Preserve the original wording and intent
+- Return ONLY valid JSON, no additional text
+
+Return EXACTLY this JSON format:
+{{
+    "search_query": "the policy/documentation question",
+    "analyst_query": "the data/metrics question"
+}}"""
+
+# A split sub-query that keeps less than this share of the question's content words is a narrower question
+SPECULATION_COVERAGE = 0.8
+FILLER_WORDS = {"a", "an", "the", "is", "are", "was", "were", "what", "whats", "how", "do", "does",
+                "of", "for", "in", "on", "to", "our", "we", "i", "my", "me", "you", "your", "please"}
+
+_local_index = None
+_local_index_lock = threading.Lock()
+_local_index_busy = False  # a build or refresh is running in the background
+_local_index_checked_at = 0.0  # when the last build or refresh started
+
+# Short completion that turns locally retrieved chunks into the answer
+GROUNDED_ANSWER = prepare("grounded_answer", "SELECT SNOWFLAKE.CORTEX.COMPLETE(?, ?) AS ANSWER")
+_answers = TieredCache("agent_result", ANSWER_TTL, max_entries=1024)
+
+
+@contextmanager
+def timed_stage(timings: Optional[dict], stage: str):
+    """Add the wall time of the block to timings[stage] in milliseconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def split_query(query: str, model: str = client.DEFAULT_MODEL, timeout_ms: int = client.API_TIMEOUT,
+                timings: Optional[dict] = None) -> dict:
+    """Ask the LLM to split a compound question into its search and analyst parts
+
+    timings gets the call's time after admission (see admission.admit_current).
+    """
+    payload = client.agent_payload(
+        SPLIT_PROMPT.format(query=query),
+        model,
+        response_instruction="Return only valid JSON with search_query and analyst_query fields. No markdown formatting.",
+    )
+    # Same agent:run endpoint as the tool calls, so it takes a slot like them
+    with admit_current(timings):
+        llm_text = sse.message_text(client.request("POST", client.API_ENDPOINT, payload, timeout_ms=timeout_ms)).strip()
+
+    # Remove markdown code blocks if present
+    if llm_text.startswith('```'):
+        llm_text = llm_text.split('```')[1]
+        if llm_text.startswith('json'):
+            llm_text = llm_text[4:]
+    return json.loads(llm_text.strip())
+
+
+def keyword_intent(query: str) -> dict:
+    """Keyword routing only: which tools the question needs, with the full question as both sub-queries"""
+    query_lower = query.lower()
+    needs_search = any(keyword in query_lower for keyword in SEARCH_KEYWORDS)
+    needs_analyst = any(keyword in query_lower for keyword in ANALYST_KEYWORDS)
+    return {
+        'needs_search': needs_search,
+        'needs_analyst': needs_analyst,
+        'needs_both': needs_search and needs_analyst,
+        'query': query,
+        'search_query': query,
+        'analyst_query': query,
+    }
+
+
+def analyze_query_intent(query: str, model: str = client.DEFAULT_MODEL, timeout_ms: int = client.API_TIMEOUT,
+                         timings: Optional[dict] = None) -> dict:
+    """Keyword routing; compound questions are split into tool-specific sub-queries by the LLM
+
+    timings gets the split call's service time, if this caller made it (not when it shared one in flight).
+    """
+    intent = keyword_intent(query)
+    if intent['needs_both']:
+        try:
+            parsed, _ = get_single_flight().do(
+                ('split', normalize_query(query), model), lambda: split_query(query, model, timeout_ms, timings),
+            )
+            intent['search_query'] = parsed.get('search_query', query).strip()
+            intent['analyst_query'] = parsed.get('analyst_query', query).strip()
+        except Cancelled:
+            raise
+        except Exception:
+            # If LLM analysis fails, fall back to original query for both
+            pass
+    return intent
+
+
+def restart_reason(query: str, sub_query: str) -> Optional[str]:
+    """Why a call started on the full question cannot stand in for sub_query; None when it can
+
+    The split keeps the question's wording, so every content word of a sub-query is usually in
+    the question; what matters is what the sub-query leaves out. 'narrowed': it drops a large
+    share of the question's content words (the other tool's part). 'reworded': any other change,
+    which may still change what the tool returns. Only a sub-query the split left as it was
+    (e.g. the split failed and fell back to the question) keeps the speculative call.
+    """
+    if normalize_query(sub_query) == normalize_query(query):
+        return None
+    asked = set(re.findall(r"[a-z0-9]+", query.lower())) - FILLER_WORDS
+    kept = set(re.findall(r"[a-z0-9]+", sub_query.lower())) & asked
+    if asked and len(kept) / len(asked) < SPECULATION_COVERAGE:
+        return "narrowed"
+    return "reworded"
+
+
+def ask_agent(query: str, model: str = client.DEFAULT_MODEL, tool_filter: Optional[str] = None,
+              timeout_ms: int = client.API_TIMEOUT, timings: Optional[dict] = None) -> AgentResult:
+    """One agent:run call restricted by tool_filter (None, 'search_only' or 'analyst_only')
+
+    Identical questions already in flight are not sent again; the caller shares that call's result.
+    AgentResult.service_ms is the agent call's time once admitted; timings gets admitted_at as
+    well, if this caller made the call.
+    Clean answers are cached for ANSWER_TTL (also on disk, across restarts and worker processes).
+    A call that fails against a pruned semantic model is retried once with the full model.
+    Cancelled and DeadlineExceeded propagate so the caller can stop the question.
+    """
+    key = (normalize_query(query), model, tool_filter)
+    cached = _answers.get(key)
+    if cached is not MISS:
+        return replace(
+            cached,
+            citations=list(cached.citations),
+            dropped=list(cached.dropped),
+            tools_called=list(cached.tools_called),
+            notices=cached.notices + [Notice("info", "💾 Answer from cache", debug=True)],
+            cached=True,
+        )
+
+    def run(semantic_model: str) -> AgentResult:
+        # Search depth adapts to how confident recent results for this topic were
+        tools, tool_resources, instruction = client.tool_config(
+            tool_filter, get_search_tuner().max_results(query), semantic_model=semantic_model)
+        service = {} if timings is None else timings
+        events = client.run_agent(client.agent_payload(query, model, tools, tool_resources, instruction),
+                                  timeout_ms=timeout_ms, timings=service)
+        return replace(sse.parse_agent_run(events, query=query), service_ms=service["service_ms"])
+
+    def call() -> AgentResult:
+        # The analyst gets only the part of the semantic model this question refers to
+        semantic_model = client.SEMANTIC_MODEL if tool_filter == "search_only" else semantic_model_for(query)
+        if semantic_model == client.SEMANTIC_MODEL:
+            return run(semantic_model)
+        try:
+            result = run(semantic_model)
+            if not any(n.level == "error" for n in result.notices):
+                return result
+        except client.AgentApiError:
+            pass
+        # The variant may be gone from the stage or miss what the question needs: once more with the full model
+        forget_variant(semantic_model)
+        return run(client.SEMANTIC_MODEL)
+
+    try:
+        result, shared = get_single_flight().do(key, call)
+    except (Cancelled, DeadlineExceeded):
+        raise
+    except AdmissionRejected as e:
+        return AgentResult(notices=[Notice("warning", str(e))])
+    except client.AgentApiError as e:
+        return AgentResult(notices=[Notice("error", f"❌ {e}")])
+    except Exception as e:
+        return AgentResult(notices=[Notice("error", f"Error making request: {str(e)}")])
+
+    if not shared:
+        if result.event_count and not any(n.level in ("warning", "error") for n in result.notices):
+            _answers.set(key, result)
+        return result
+    # Every waiter gets its own lists, so one view cannot change another's answer
+    return replace(
+        result,
+        citations=list(result.citations),
+        dropped=list(result.dropped),
+        tools_called=list(result.tools_called),
+        notices=result.notices + [Notice("info", "🔁 Shared the answer of an identical request in flight", debug=True)],
+    )
+
+
+def clear_answer_cache():
+    """Forget cached agent answers, e.g. between evaluation runs"""
+    _answers.clear()
+
+
+class SpeculationStats:
+    """How often a tool call started before the split could be kept; restarts are extra agent calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.kept = 0
+        self.restarted: Dict[str, int] = {}  # restart_reason -> count
+
+    def record(self, started: int = 0, kept: int = 0, restarted: Optional[str] = None):
+        with self._lock:
+            self.started += started
+            self.kept += kept
+            if restarted:
+                self.restarted[restarted] = self.restarted.get(restarted, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            restarted = sum(self.restarted.values())
+            decided = self.kept + restarted
+            return {
+                "started": self.started,
+                "kept": self.kept,
+                "restarted": restarted,
+                "restarted_by_reason": dict(self.restarted),
+                "kept_rate": round(self.kept / decided, 3) if decided else None,
+                "restart_rate": round(restarted / decided, 3) if decided else None,
+            }
+
+
+_speculation = SpeculationStats()
+
+
+def get_speculation_stats() -> SpeculationStats:
+    return _speculation
+
+
+def _maintain_local_index():
+    """Build the index, or pick up changed chunks, off the request path"""
+    global _local_index, _local_index_busy
+    try:
+        with borrowed_session() as session:
+            if _local_index is None:
+                from local_search import LocalDocsIndex
+
+                index = LocalDocsIndex()
+                index.snapshot(session)
+                _local_index = index
+            else:
+                _local_index.refresh(session)
+    except Exception:
+        pass  # retried LOCAL_INDEX_REFRESH_SECONDS later; meanwhile questions go to the agent
+    finally:
+        with _local_index_lock:
+            _local_index_busy = False
+
+
+def get_local_docs_index():
+    """Process-wide local BM25/embedding index over DOCS_CHUNKS_TABLE, or None until first built
+
+    Building and refreshing run on a background thread, at most one at a time, so no question
+    waits for them; a question arriving before the first build is answered by the agent.
+    """
+    global _local_index_busy, _local_index_checked_at
+    with _local_index_lock:
+        due = time.time() - _local_index_checked_at > LOCAL_INDEX_REFRESH_SECONDS
+        if due and not _local_index_busy:
+            _local_index_busy, _local_index_checked_at = True, time.time()
+            get_session()  # resolve the session on the request thread, where Streamlit provides it
+            threading.Thread(target=_maintain_local_index, name="local-index", daemon=True).start()
+        return _local_index
+
+
+def answer_from_local_index(query: str, model: str):
+    """(text, sql, citations, generated) for a search-only question; None means fall back to the agent
+
+    The index retrieves and cites; a completion grounded on those chunks writes the text. It is
+    a Cortex call like the agent's: it takes an admission slot and runs against the question's
+    deadline (at most GROUNDED_ANSWER_TIMEOUT_MS). When it is rejected, times out or fails, the
+    chunks are shown as labelled excerpts (generated is False).
+    """
+    try:
+        from local_search import excerpts, grounded_prompt
+
+        index = get_local_docs_index()
+        results = index.retrieve(query) if index is not None else None
+        if not results:
+            return None
+    except Exception:
+        return None
+    def complete() -> str:
+        return GROUNDED_ANSWER.scalar([model, grounded_prompt(query, results)], default="") or ""
+
+    deadline = current_deadline()
+    try:
+        with admit_current():
+            if deadline is None:
+                text = complete().strip()
+            else:
+                text = deadline.run(complete, deadline.stage_timeout_ms(None, GROUNDED_ANSWER_TIMEOUT_MS)).strip()
+    except Cancelled:
+        raise
+    except Exception:
+        text = ""  # rejected, out of time or failed: the excerpts still answer
+    if text:
+        return text, "", results, True
+    return excerpts(results), "", results, False
+
+
+class _ModelPicker:
+    """Per-question model choice and stage timeouts against the question's deadline"""
+
+    def __init__(self, answer: Answer, model: str, deadline: Deadline, enabled: bool):
+        self.answer = answer
+        self.model = model
+        self.deadline = deadline
+        self.enabled = enabled
+
+    def choose(self, call_type: str, query: str) -> str:
+        if not self.enabled:
+            return self.model
+        return get_model_router().choose(call_type, query, self.model, self.deadline.remaining_ms())
+
+    def used(self, call_type: str, model: str):
+        self.answer.models[call_type] = model
+        if model != self.model:
+            self.answer.notices.append(Notice("info", f"🧭 {call_type}: routed to {model}", debug=True))
+
+    def pick(self, call_type: str, query: str) -> str:
+        model = self.choose(call_type, query)
+        self.used(call_type, model)
+        return model
+
+    def timeout_ms(self, call_type: str, model: str, reserve_ms: float = 0.0) -> int:
+        """Stage timeout from the model's observed p95, leaving reserve_ms for the stages after it"""
+        return self.deadline.stage_timeout_ms(get_model_router().p95(model, call_type), client.API_TIMEOUT, reserve_ms)
+
+    def reserve_ms(self, call_type: str, query: str) -> float:
+        """What a later stage is expected to need"""
+        return get_model_router().p95(self.choose(call_type, query), call_type)
+
+
+def _timed_ask(answer: Answer, picker: _ModelPicker, stage: str, query: str,
+               tool_filter: Optional[str] = None) -> AgentResult:
+    # Model latency is learned from the agent call's own time: queueing for admission or
+    # waiting on an identical call in flight says nothing about the model
+    service = {}
+    try:
+        model = picker.pick(stage, query)
+        with timed_stage(answer.timings_ms, stage):
+            result = ask_agent(query, model, tool_filter, picker.timeout_ms(stage, model), service)
+    except DeadlineExceeded as e:
+        answer.notices.append(Notice("warning", str(e)))
+        if stage in answer.models and "admitted_at" in service:
+            # A timeout is a (censored) latency sample too; dropping it would keep p95 optimistic
+            get_model_router().record(answer.models[stage], stage, (time.perf_counter() - service["admitted_at"]) * 1000)
+        return AgentResult()
+    answer.notices.extend(result.notices)
+    answer.tools_called.extend(result.tools_called)
+    if result.cached:
+        answer.cache_hits.append(stage)
+    # Rejections, errors and cache hits return fast and would make a model look quicker than it is
+    if result.event_count and not result.cached and result.service_ms:
+        get_model_router().record(model, stage, result.service_ms)
+    return result
+
+
+class _ToolCall:
+    """One tool call on its own thread, recorded into a scratch Answer until it is used
+
+    It runs under a child of the question's deadline, so it can be cancelled alone (a
+    speculative call the split made obsolete) and goes away with the question.
+    """
+
+    def __init__(self, picker: _ModelPicker, stage: str, query: str, tool_filter: str):
+        self.stage = stage
+        self.query = query
+        self.scratch = Answer()
+        self.picker = _ModelPicker(self.scratch, picker.model, picker.deadline.child(), picker.enabled)
+        self.result = AgentResult()
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+        # Carries the admission user along; the deadline is set inside _work
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._work, tool_filter), name=f"tool-{stage}", daemon=True).start()
+
+    def _work(self, tool_filter: str):
+        try:
+            with within(self.picker.deadline):
+                self.result = _timed_ask(self.scratch, self.picker, self.stage, self.query, tool_filter)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def cancel(self):
+        self.picker.deadline.cancel()
+
+    def join(self, answer: Answer, deadline: Deadline) -> AgentResult:
+        """Wait (cancellable through deadline), then merge timings, models and notices into answer
+
+        Called on the asking thread, which shows the call's queue position while it waits.
+        """
+        while not deadline.wait(self.done, POLL_INTERVAL):
+            report_queue_position()
+        if self.error is not None:
+            raise self.error
+        answer.timings_ms.update(self.scratch.timings_ms)
+        answer.models.update(self.scratch.models)
+        answer.notices.extend(self.scratch.notices)
+        answer.tools_called.extend(self.scratch.tools_called)
+        answer.cache_hits.extend(self.scratch.cache_hits)
+        return self.result
+
+
+def _ask_both(answer: Answer, picker: _ModelPicker, query: str, speculate: bool) -> Tuple[dict, AgentResult, AgentResult]:
+    """Split a compound question and run its search and analyst calls concurrently
+
+    With speculate, both calls start on the full question before the split returns; a call
+    is restarted with its sub-query unless the split left the question as it was (see restart_reason).
+    """
+    tools = (('search', 'search_query', 'search_only'), ('analyst', 'analyst_query', 'analyst_only'))
+    calls = {}
+    if speculate:
+        calls = {stage: _ToolCall(picker, stage, query, tool_filter) for stage, _, tool_filter in tools}
+        _speculation.record(started=len(calls))
+
+    split = {}
+    try:
+        intent_model = picker.choose(INTENT, query)
+        with timed_stage(answer.timings_ms, 'intent'):
+            # The split is optional: keep most of the budget for the tool calls after it
+            intent = analyze_query_intent(
+                query, model=intent_model,
+                timeout_ms=picker.timeout_ms(INTENT, intent_model, picker.reserve_ms('analyst', query)),
+                timings=split,
+            )
+    except BaseException:
+        for call in calls.values():
+            call.cancel()
+        raise
+    picker.used(INTENT, intent_model)
+    if "service_ms" in split:
+        get_model_router().record(intent_model, INTENT, split["service_ms"])
+
+    for stage, sub_query_key, tool_filter in tools:
+        sub_query = intent[sub_query_key]
+        call = calls.get(stage)
+        if call is not None:
+            reason = restart_reason(query, sub_query)
+            if reason is None:
+                _speculation.record(kept=1)
+                answer.notices.append(Notice("info", f"⚡ Kept the {stage} call started before the split", debug=True))
+                continue
+            call.cancel()
+            _speculation.record(restarted=reason)
+            answer.notices.append(Notice("info", f"🔄 Restarted {stage} with the split query ({reason})", debug=True))
+        calls[stage] = _ToolCall(picker, stage, sub_query, tool_filter)
+
+    return intent, calls['search'].join(answer, picker.deadline), calls['analyst'].join(answer, picker.deadline)
+
+
+def answer_query(query: str, model: str = client.DEFAULT_MODEL, orchestration_mode: str = CLIENT_SIDE,
+                 use_local_index: bool = True, latency_budget_ms: Optional[float] = LATENCY_BUDGET_MS,
+                 route_models: bool = True, deadline: Optional[Deadline] = None, speculate: bool = True,
+                 use_faq: bool = True) -> Answer:
+    """Route one question through the tools
+
+    Timings are recorded per stage (intent, faq, local_index, search, analyst, agent) in Answer.timings_ms.
+    Search-only questions are answered from precomputed FAQ answers (use_faq), then the local index
+    (use_local_index), before the agent.
+    With route_models, model is the most capable model any call may use: cheap calls go to the
+    fastest one and the rest to the best one whose learned p95 fits the remaining latency budget
+    (Answer.models records the choice per stage).
+
+    The question runs against deadline (the caller's, else a new one of latency_budget_ms): each
+    stage gets a timeout from its observed p95 within what is left, a stage that times out leaves
+    a warning notice, and raises Cancelled once deadline.cancel() is called.
+
+    With speculate, compound questions start their tool calls before the LLM split returns
+    (see get_speculation_stats() for how often that pays off).
+    """
+    deadline = deadline or current_deadline() or Deadline(latency_budget_ms)
+    answer = Answer()
+    # All of the question's agent calls (split, speculative and restarted tool calls) count once against the user
+    with within(deadline), one_question():
+        try:
+            _route(answer, _ModelPicker(answer, model, deadline, route_models), query, orchestration_mode,
+                   use_local_index, speculate, use_faq)
+        except DeadlineExceeded as e:
+            answer.notices.append(Notice("warning", str(e)))
+    answer.text = answer.text.replace("【†", "[").replace("†】", "]")
+    return answer
+
+
+def _route(answer: Answer, picker: _ModelPicker, query: str, orchestration_mode: str, use_local_index: bool,
+           speculate: bool, use_faq: bool):
+    if orchestration_mode != CLIENT_SIDE:
+        # LLM-based orchestration: Let the model decide (original behavior)
+        answer.route = 'agent'
+        answer.notices.append(Notice("info", "🤖 Processing with AI model...", debug=True))
+        result = _timed_ask(answer, picker, 'agent', query)
+        answer.text, answer.sql, answer.citations = result.text, result.sql, result.citations
+        return
+
+    intent = keyword_intent(query)
+    answer.intent = {flag: intent[flag] for flag in ('needs_search', 'needs_analyst', 'needs_both')}
+
+    if intent['needs_both']:
+        answer.route = 'both'
+        answer.notices.append(Notice("info", "🎯 Fetching policy information and data analytics...", debug=True))
+        intent, search, analyst = _ask_both(answer, picker, query, speculate)
+        answer.notices += [
+            Notice("info", f"🔍 Search query: '{intent['search_query']}'", debug=True),
+            Notice("info", f"📊 Analyst query: '{intent['analyst_query']}'", debug=True),
+        ]
+        if analyst.text.strip():
+            answer.notices.append(Notice("info", f"✅ Analyst returned: {len(analyst.text)} characters", debug=True))
+        else:
+            answer.notices.append(Notice("warning", "⚠️ Analyst returned empty response", debug=True))
+
+        # Combine results: policy first, then data
+        combined_parts = [part.strip() for part in (search.text, analyst.text) if part.strip()]
+        answer.text = "\n\n".join(combined_parts) if combined_parts else "No response generated."
+        answer.sql = analyst.sql
+        answer.citations = search.citations
+        answer.notices.append(Notice("success", "✅ Retrieved information from both sources", debug=True))
+
+    elif intent['needs_search']:
+        with timed_stage(answer.timings_ms, 'faq'):
+            precomputed = lookup_faq(query) if use_faq else None
+        local_answer = None
+        if not precomputed:
+            with timed_stage(answer.timings_ms, 'local_index'):
+                local_answer = answer_from_local_index(query, picker.model) if use_local_index else None
+        if precomputed:
+            answer.route = 'faq'
+            answer.notices.append(Notice("info", "📌 Answered from precomputed FAQ answers", debug=True))
+            answer.text, answer.sql, answer.citations = precomputed
+        elif local_answer:
+            answer.route = 'local_index'
+            answer.text, answer.sql, answer.citations, generated = local_answer
+            if generated:
+                answer.notices.append(Notice("info", "⚡ Answered from local FAQ index", debug=True))
+            else:
+                answer.notices.append(Notice("info", "📄 Showing document excerpts; an answer could not be generated"))
+        else:
+            answer.route = 'search'
+            answer.notices.append(Notice("info", "🔍 Searching documentation...", debug=True))
+            result = _timed_ask(answer, picker, 'search', query, 'search_only')
+            answer.text, answer.sql, answer.citations = result.text, result.sql, result.citations
+
+    elif intent['needs_analyst']:
+        answer.route = 'analyst'
+        answer.notices.append(Notice("info", "📊 Analyzing sales data...", debug=True))
+        result = _timed_ask(answer, picker, 'analyst', query, 'analyst_only')
+        answer.text, answer.sql, answer.citations = result.text, result.sql, result.citations
+
+    else:
+        # General query - let LLM decide (both tools available)
+        answer.route = 'agent'
+        result = _timed_ask(answer, picker, 'agent', query)
+        answer.text, answer.sql, answer.citations = result.text, result.sql, result.citations
@@ -0,0 +1,142 @@
+"""
+Confidence-aware tuning of Cortex Search retrieval
+Prunes low-confidence search results before they are hydrated, adapts max_results
+per query topic from the observed score distribution and keeps score histograms
+"""
+
+import logging
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RESULTS = 3
+MIN_MAX_RESULTS = 1
+MAX_MAX_RESULTS = 8
+
+# Results below this absolute confidence, or below this share of the best score, are dropped
+MIN_CONFIDENCE = 0.3
+RELATIVE_CUTOFF = 0.5
+
+# The lowest kept score still being this high means relevant chunks were probably cut off
+HIGH_CONFIDENCE = 0.7
+
+HISTOGRAM_BINS = 10
+LOG_EVERY = 50  # log the histogram after this many scored results
+
+# Words that decide which topic bucket a search query's max_results comes from
+TOPIC_WORDS = {
+    "return", "returns", "refund", "refunds", "shipping", "delivery", "warranty", "policy",
+    "exchange", "replacement", "contract", "cancel", "cancellation", "damaged", "payment",
+}
+
+
+def prune_citations(citations: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """Split citations into (kept, dropped) by confidence; unscored citations are always kept
+
+    The top-scored citation is kept even below MIN_CONFIDENCE: the answer text already
+    carries its marker, and a marker with nothing behind it is worse than a weak source.
+    """
+    scores = [c['score'] for c in citations if c.get('score') is not None]
+    if not scores:
+        return list(citations), []
+
+    best = max(scores)
+    threshold = min(best, max(MIN_CONFIDENCE, best * RELATIVE_CUTOFF))
+    kept, dropped = [], []
+    for citation in citations:
+        score = citation.get('score')
+        (dropped if score is not None and score < threshold else kept).append(citation)
+    return kept, dropped
+
+
+def query_topic(query: str) -> str:
+    """Coarse topic key for a search query, so similar questions share one max_results setting"""
+    words = sorted(set(re.findall(r"[a-z]+", query.lower())) & TOPIC_WORDS)
+    return " ".join(words) or "*"
+
+
+class ScoreHistogram:
+    """Fixed-bin histogram of confidence scores in [0, 1]"""
+
+    def __init__(self, bins: int = HISTOGRAM_BINS):
+        self.counts = [0] * bins
+        self.total = 0
+
+    def add(self, score: float):
+        index = min(int(max(score, 0.0) * len(self.counts)), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.total += 1
+
+    def render(self, width: int = 30) -> str:
+        peak = max(self.counts) or 1
+        step = 1.0 / len(self.counts)
+        lines = []
+        for i, count in enumerate(self.counts):
+            bar = "#" * round(width * count / peak)
+            lines.append(f"{i * step:.1f}-{(i + 1) * step:.1f} | {bar} {count}")
+        return "\n".join(lines)
+
+
+class SearchTuner:
+    """Process-wide adaptive max_results per query topic plus kept/dropped score histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._max_results: Dict[str, int] = defaultdict(lambda: DEFAULT_MAX_RESULTS)
+        self.kept = ScoreHistogram()
+        self.dropped = ScoreHistogram()
+        self._since_log = 0
+
+    def max_results(self, query: Optional[str]) -> int:
+        with self._lock:
+            return self._max_results[query_topic(query or "")]
+
+    def observe(self, query: Optional[str], kept: Iterable[dict], dropped: Iterable[dict]):
+        """Record one search answer and adjust max_results for its topic"""
+        kept_scores = [c['score'] for c in kept if c.get('score') is not None]
+        dropped_scores = [c['score'] for c in dropped if c.get('score') is not None]
+        if not kept_scores and not dropped_scores:
+            return
+
+        topic = query_topic(query or "")
+        with self._lock:
+            for score in kept_scores:
+                self.kept.add(score)
+            for score in dropped_scores:
+                self.dropped.add(score)
+
+            current = self._max_results[topic]
+            returned = len(kept_scores) + len(dropped_scores)
+            if returned >= current and not dropped_scores and min(kept_scores) >= HIGH_CONFIDENCE:
+                # Every slot came back highly relevant: ask for one more next time
+                self._max_results[topic] = min(current + 1, MAX_MAX_RESULTS)
+            elif dropped_scores and len(kept_scores) < current:
+                # Results were wasted on low-confidence chunks: ask for fewer
+                self._max_results[topic] = max(len(kept_scores), MIN_MAX_RESULTS)
+
+            self._since_log += len(kept_scores) + len(dropped_scores)
+            if self._since_log >= LOG_EVERY:
+                self._since_log = 0
+                logger.info("Search confidence (kept, n=%d):\n%s", self.kept.total, self.kept.render())
+                logger.info("Search confidence (dropped, n=%d):\n%s", self.dropped.total, self.dropped.render())
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._max_results)
+
+
+_tuner: Optional[SearchTuner] = None
+_tuner_lock = threading.Lock()
+
+
+def get_search_tuner() -> SearchTuner:
+    """Process-wide tuner shared by every app session and batch worker"""
+    global _tuner
+    if _tuner is None:
+        with _tuner_lock:
+            if _tuner is None:
+                _tuner = SearchTuner()
+    return _tuner
@@ -0,0 +1,387 @@
+"""
+Per-question semantic model pruning for Cortex Analyst calls
+The full semantic model (CORTEX_AGENT_SALES.yaml: nine tables with long synonym lists)
+goes into every analyst prompt. This resolves which tables a question refers to (table and
+column names, synonyms and sample values, longest match first), adds the tables needed to
+join them along the relationships graph, and writes a minimal variant: referenced tables
+in full, bridge tables reduced to their keys, join columns and facts, and only the relationships
+among them. Each variant is uploaded once to the analyst stage under a content-addressed
+name and reused; questions that resolve to no table, or to all of them, use the full model.
+A new variant is uploaded on a background thread and the question asking for it gets the
+full model; when the analyst fails on a variant, forget_variant() drops the upload record
+so the next question uploads it again.
+
+The local CORTEX_AGENT_SALES.yaml is taken to be the staged model. Pruning is best-effort:
+any failure falls back to the full model. SALES_ASSISTANT_PRUNE_SEMANTIC_MODEL=0 turns it off.
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sales_assistant.cache import MISS, TieredCache
+from sales_assistant.client import SEMANTIC_MODEL
+from sales_assistant.session import get_session
+
+SEMANTIC_MODEL_YAML = os.environ.get(
+    "SALES_ASSISTANT_SEMANTIC_MODEL_YAML",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CORTEX_AGENT_SALES.yaml"),
+)
+PRUNING_ENABLED = os.environ.get("SALES_ASSISTANT_PRUNE_SEMANTIC_MODEL", "1") != "0"
+
+VARIANT_DIR = "pruned"  # under the semantic model's stage directory
+VARIANT_TTL = 7 * 24 * 3600  # how long an upload is trusted to still be on the stage
+MAX_VARIANTS = 64  # pruned models kept in memory, one per table subset asked about
+COLUMN_KINDS = ("dimensions", "time_dimensions", "facts", "measures", "metrics")
+MIN_STEM = 5  # table-name stems this long also match inflections ("refund" -> "refunded")
+
+# Business words that name a table without appearing in the model
+EXTRA_TERMS = {
+    "revenue": "ORDERS", "sale": "ORDERS", "purchase": "ORDERS", "spend": "ORDERS",
+    "sold": "ORDER_ITEMS", "unit": "ORDER_ITEMS",
+    "stock": "INVENTORY",
+    "delay": "SHIPMENTS", "delayed": "SHIPMENTS", "delivery": "SHIPMENTS",
+    "promo": "CAMPAIGNS", "promotion": "CAMPAIGNS",
+}
+# Synonyms too generic to point at one table ("total" and "amount" are QUANTITY synonyms)
+GENERIC_TERMS = {"total", "amount", "count", "number", "value", "id", "name", "date", "type"}
+
+
+def _fold(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _tokens(text: str) -> Tuple[str, ...]:
+    return tuple(_fold(w) for w in re.findall(r"[a-z0-9]+", str(text).lower().replace("_", " ")))
+
+
+@dataclass
+class Resolution:
+    """Tables a question refers to, the matched columns, and the tables added only to join them"""
+    tables: Set[str] = field(default_factory=set)
+    columns: Dict[str, Set[str]] = field(default_factory=dict)
+    bridges: Set[str] = field(default_factory=set)
+
+    @property
+    def kept(self) -> FrozenSet[str]:
+        return frozenset(self.tables | self.bridges)
+
+
+class SemanticModel:
+    """A parsed semantic model with a term index over its tables and a join graph"""
+
+    def __init__(self, model: dict):
+        self.model = model
+        self.tables = {t["name"]: t for t in model.get("tables", [])}
+        self.relationships = model.get("relationships", []) or []
+        self.full_bytes = len(self.dump(model))
+        # term -> {(table, column or None for the table itself): exact}; exact hits are names, not synonyms
+        self._terms: Dict[Tuple[str, ...], Dict[Tuple[str, Optional[str]], bool]] = {}
+        self._stems: Dict[str, str] = {}
+        for name, table in self.tables.items():
+            self._add_term(name, name, None, exact=True)
+            for phrase in table.get("synonyms", []) or []:
+                self._add_term(phrase, name, None)
+            stem = _tokens(name)[-1]
+            if len(stem) >= MIN_STEM:
+                self._stems[stem] = name
+            for kind in COLUMN_KINDS:
+                for column in table.get(kind, []) or []:
+                    self._add_term(column["name"], name, column["name"], exact=True)
+                    for phrase in column.get("synonyms") or []:
+                        self._add_term(phrase, name, column["name"])
+                    for value in column.get("sample_values") or []:
+                        if isinstance(value, str) and re.search(r"[a-zA-Z]{3}", value):
+                            self._add_term(value, name, column["name"])
+        for word, name in EXTRA_TERMS.items():
+            if name in self.tables:
+                self._add_term(word, name, None, exact=True)
+        self._longest = max((len(t) for t in self._terms), default=1)
+        self._graph: Dict[str, Set[str]] = {name: set() for name in self.tables}
+        for rel in self.relationships:
+            left, right = rel.get("left_table"), rel.get("right_table")
+            if left in self._graph and right in self._graph:
+                self._graph[left].add(right)
+                self._graph[right].add(left)
+
+    @classmethod
+    def load(cls, path: str = SEMANTIC_MODEL_YAML) -> "SemanticModel":
+        import yaml
+
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(yaml.safe_load(f))
+
+    @staticmethod
+    def dump(model: dict) -> str:
+        import yaml
+
+        return yaml.safe_dump(model, sort_keys=False, allow_unicode=True)
+
+    def _add_term(self, phrase: str, table: str, column: Optional[str], exact: bool = False):
+        tokens = _tokens(phrase)
+        if tokens and (exact or tokens not in {(word,) for word in GENERIC_TERMS}):
+            hits = self._terms.setdefault(tokens, {})
+            hits[(table, column)] = hits.get((table, column), False) or exact
+
+    def _hits(self, tokens: Tuple[str, ...]) -> Set[Tuple[str, Optional[str]]]:
+        """What a term refers to; a table or column it names outranks ones it is only a synonym of"""
+        hits = self._terms.get(tokens, {})
+        exact = {hit for hit, is_exact in hits.items() if is_exact}
+        return exact or set(hits)
+
+    def resolve(self, question: str) -> Resolution:
+        words = _tokens(question)
+        matches = []  # (length, start, hits)
+        for start in range(len(words)):
+            for length in range(min(self._longest, len(words) - start), 0, -1):
+                hits = self._hits(words[start:start + length])
+                if hits:
+                    matches.append((length, start, hits))
+            for stem, table in self._stems.items():
+                if words[start] != stem and words[start].startswith(stem):
+                    matches.append((1, start, {(table, None)}))
+
+        # Longest phrases first; a phrase inside an accepted one ("electronics" in a campaign name) is ignored
+        taken: Set[int] = set()
+        accepted = []
+        for length, start, hits in sorted(matches, key=lambda m: (-m[0], m[1])):
+            span = set(range(start, start + length))
+            if not span & taken:
+                taken |= span
+                accepted.append(hits)
+
+        resolution = Resolution()
+        ambiguous = []
+        for hits in accepted:
+            tables = {table for table, _ in hits}
+            if len(tables) == 1:
+                resolution.tables |= tables
+            else:
+                ambiguous.append(hits)
+        for hits in ambiguous:
+            # A column several tables share (REGION, CUSTOMER_ID) counts for a table already referenced
+            if not {table for table, _ in hits} & resolution.tables:
+                resolution.tables |= {table for table, _ in hits}
+        for hits in accepted:
+            for table, column in hits:
+                if column and table in resolution.tables:
+                    resolution.columns.setdefault(table, set()).add(column)
+        resolution.bridges = self._connect(resolution.tables) - resolution.tables
+        return resolution
+
+    def _connect(self, tables: Set[str]) -> Set[str]:
+        """tables plus the fewest-hop paths joining each of them to the rest"""
+        if len(tables) < 2:
+            return set(tables)
+        ordered = sorted(tables)
+        connected = {ordered[0]}
+        for target in ordered[1:]:
+            if target in connected:
+                continue
+            path = self._path(connected, target)
+            connected |= set(path) if path else {target}
+        return connected
+
+    def _path(self, sources: Set[str], target: str) -> List[str]:
+        previous = {source: None for source in sources}
+        queue = deque(sources)
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = previous[node]
+                return path
+            for neighbour in sorted(self._graph.get(node, ())):
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        return []
+
+    def prune(self, resolution: Resolution) -> dict:
+        """The model restricted to the resolved tables; bridge tables keep only keys, join columns and facts"""
+        kept = resolution.kept
+        relationships = [r for r in self.relationships if r.get("left_table") in kept and r.get("right_table") in kept]
+        join_columns: Dict[str, Set[str]] = {}
+        for rel in relationships:
+            for pair in rel.get("relationship_columns", []):
+                join_columns.setdefault(rel["left_table"], set()).add(pair.get("left_column"))
+                join_columns.setdefault(rel["right_table"], set()).add(pair.get("right_column"))
+
+        tables = []
+        for name, table in self.tables.items():
+            if name in resolution.tables:
+                tables.append(table)
+            elif name in resolution.bridges:
+                needed = join_columns.get(name, set()) | set((table.get("primary_key") or {}).get("columns", []))
+                bridge = {key: value for key, value in table.items() if key not in COLUMN_KINDS}
+                for kind in COLUMN_KINDS:
+                    # Facts stay: a measure often lives on the table that joins the others (QUANTITY, UNIT_PRICE)
+                    columns = [c for c in table.get(kind, []) or [] if kind == "facts" or c["name"] in needed]
+                    if columns:
+                        bridge[kind] = columns
+                tables.append(bridge)
+
+        pruned = {key: value for key, value in self.model.items() if key not in ("tables", "relationships")}
+        pruned["tables"] = tables
+        if relationships:
+            pruned["relationships"] = relationships
+        if "verified_queries" in pruned:
+            # Verified queries name logical tables as __<TABLE>, older ones the table itself
+            dropped = [name for name in self.tables if name not in kept]
+            pruned["verified_queries"] = [
+                q for q in pruned["verified_queries"]
+                if not any(re.search(rf"(?<![\w$])(?:__)?{re.escape(name)}(?![\w$])", q.get("sql", ""), re.IGNORECASE)
+                           for name in dropped)
+            ]
+        return pruned
+
+
+class VariantStats:
+    """How many analyst calls got a pruned model, and how much smaller it was"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.pruned = 0
+        self.uploads = 0
+        self.failed = 0
+        self.full_bytes = 0
+        self.sent_bytes = 0
+
+    def record(self, full_bytes: int, sent_bytes: int):
+        with self._lock:
+            self.calls += 1
+            self.pruned += sent_bytes < full_bytes
+            self.full_bytes += full_bytes
+            self.sent_bytes += sent_bytes
+
+    def record_upload(self):
+        with self._lock:
+            self.uploads += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "pruned": self.pruned,
+                "uploads": self.uploads,
+                "failed": self.failed,
+                "size_saved": round(1 - self.sent_bytes / self.full_bytes, 3) if self.full_bytes else None,
+            }
+
+
+_model: Optional[SemanticModel] = None
+_model_failed = False
+_model_lock = threading.Lock()
+_uploaded = TieredCache("semantic_variant", VARIANT_TTL, max_entries=256)
+_variants = TieredCache(None, VARIANT_TTL, max_entries=MAX_VARIANTS)  # (tables, bridges) -> (path, yaml)
+_uploading: Set[str] = set()  # variant paths being uploaded in the background
+_upload_lock = threading.Lock()
+_stats = VariantStats()
+
+
+def get_semantic_model() -> Optional[SemanticModel]:
+    """The local semantic model, or None when it cannot be read"""
+    global _model, _model_failed
+    if _model is None and not _model_failed:
+        with _model_lock:
+            if _model is None and not _model_failed:
+                try:
+                    _model = SemanticModel.load()
+                except Exception:
+                    _model_failed = True
+    return _model
+
+
+def get_variant_stats() -> VariantStats:
+    return _stats
+
+
+def variant_path(variant_yaml: str, base: str = SEMANTIC_MODEL) -> str:
+    """Stage path of a variant: next to the full model, named by its content"""
+    directory, name = base.rsplit("/", 1)
+    digest = hashlib.sha1(variant_yaml.encode("utf-8")).hexdigest()[:12]
+    return f"{directory}/{VARIANT_DIR}/{name.rsplit('.', 1)[0]}__{digest}.yaml"
+
+
+def upload_model(path: str, model_yaml: str):
+    """Write a semantic model file to the stage path, replacing any file there"""
+    get_session().file.put_stream(io.BytesIO(model_yaml.encode("utf-8")), path, auto_compress=False, overwrite=True)
+
+
+def _upload_variant(path: str, variant_yaml: str):
+    try:
+        upload_model(path, variant_yaml)
+        _uploaded.set(path, True)
+        _stats.record_upload()
+    except Exception:
+        pass  # the full model is used until a later question uploads it
+    finally:
+        with _upload_lock:
+            _uploading.discard(path)
+
+
+def semantic_model_for(question: str, base: str = SEMANTIC_MODEL, wait: bool = False) -> str:
+    """Stage path of the smallest semantic model that covers question (base when pruning does not apply)
+
+    A variant not on the stage yet is uploaded in the background and base is returned meanwhile;
+    wait=True uploads it before returning instead (benchmarks and scripts).
+    """
+    model = get_semantic_model() if PRUNING_ENABLED else None
+    if model is None:
+        return base
+    try:
+        resolution = model.resolve(question)
+        if not resolution.tables or len(resolution.kept) == len(model.tables):
+            _stats.record(model.full_bytes, model.full_bytes)
+            return base
+        subset = (sorted(resolution.tables), sorted(resolution.bridges))
+        variant = _variants.get(subset)
+        if variant is MISS:
+            # Dumping takes a few ms; only the table subsets asked about recently are kept
+            variant_yaml = model.dump(model.prune(resolution))
+            variant = (variant_path(variant_yaml, base), variant_yaml)
+            _variants.set(subset, variant)
+        path, variant_yaml = variant
+        if _uploaded.get(path) is MISS:
+            if wait:
+                upload_model(path, variant_yaml)
+                _uploaded.set(path, True)
+                _stats.record_upload()
+            else:
+                get_session()  # resolve the session on the request thread, where Streamlit provides it
+                with _upload_lock:
+                    start = path not in _uploading
+                    _uploading.add(path)
+                if start:
+                    threading.Thread(target=_upload_variant, args=(path, variant_yaml), name="semantic-variant",
+                                     daemon=True).start()
+                _stats.record(model.full_bytes, model.full_bytes)
+                return base
+        _stats.record(model.full_bytes, len(variant_yaml))
+        return path
+    except Exception:
+        return base
+
+
+def forget_variant(path: str):
+    """The analyst failed on this variant: upload it again before it is next used"""
+    _uploaded.discard(path)
+    _stats.record_failure()
+
+
+def table_subsets(questions: Iterable[str]) -> Dict[str, FrozenSet[str]]:
+    """Resolved tables (including bridges) per question, e.g. to pre-upload the common variants"""
+    model = get_semantic_model()
+    return {q: model.resolve(q).kept if model else frozenset() for q in questions}
@@ -0,0 +1,282 @@
+"""
+Lazy Snowpark session acquisition and a bounded session pool for app queries
+Inside Streamlit in Snowflake the active session is picked up on first use; batch jobs
+and benchmarks call configure() with their own session first.
+
+Generated SQL and citation lookups borrow a session from the process-wide SessionPool.
+With a factory each slot opens its own session with the pool's warehouse and query tag, so
+concurrent users' queries run side by side instead of queuing behind one connection; idle
+ones are pinged before reuse and replaced when they fail. default_factory() picks one: a
+named connection (SALES_ASSISTANT_CONNECTION, for local runs; batch_qa.py passes its
+--connection), or in Snowflake's container runtime the service's OAuth token with the
+active session's warehouse, database and schema. Warehouse-runtime Streamlit in Snowflake
+can open neither, so there the pool is only a concurrency cap: up to size borrowers share
+the app's active session and its one connection, each query on its own cursor, and that
+session is left as the app configured it (no warehouse, query tag or replacement). Borrow
+waits and timeouts are tracked for the debug sidebar.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Optional, Tuple
+
+from sales_assistant.cache import MISS, TieredCache
+
+SQL_RESULT_TTL = 300  # generated SQL for a repeated question returns the same rows for a few minutes
+
+POOL_SIZE = int(os.environ.get("SALES_ASSISTANT_SESSION_POOL_SIZE", "4"))  # queries in flight per process
+POOL_WAREHOUSE = os.environ.get("SALES_ASSISTANT_WAREHOUSE") or None  # None keeps the session's own
+POOL_QUERY_TAG = os.environ.get("SALES_ASSISTANT_QUERY_TAG", "sales_assistant")
+BORROW_TIMEOUT = 30.0  # seconds a query waits for a free session before failing
+HEALTH_CHECK_AFTER = 300.0  # seconds idle (or any failure) before a session is pinged on borrow
+HEALTH_CHECK_SQL = "SELECT 1"
+POOL_CONNECTION = os.environ.get("SALES_ASSISTANT_CONNECTION") or None  # named connection pool sessions are opened from
+CONTAINER_TOKEN_PATH = "/snowflake/session/token"  # OAuth token Snowflake mounts into container-runtime apps
+
+_session = None
+_sql_results = TieredCache("sql_result", SQL_RESULT_TTL, max_entries=256)
+_lock = threading.Lock()
+
+
+def configure(session):
+    """Use an explicit Snowpark session instead of the Streamlit in Snowflake one"""
+    global _session
+    with _lock:
+        _session = session
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                from snowflake.snowpark.context import get_active_session
+                _session = get_active_session()
+    return _session
+
+
+class PoolTimeout(Exception):
+    """No session came free within the borrow timeout; the message is meant for the user"""
+
+
+class SessionPool:
+    """At most size sessions lent out at once, one borrower each (shared mode: size borrowers of the one active session)"""
+
+    def __init__(self, size: int = POOL_SIZE, factory: Optional[Callable[[], object]] = None,
+                 warehouse: Optional[str] = POOL_WAREHOUSE, query_tag: Optional[str] = POOL_QUERY_TAG,
+                 borrow_timeout: float = BORROW_TIMEOUT, health_check_after: float = HEALTH_CHECK_AFTER):
+        # statements imports this module, so its histogram is imported here rather than at the top
+        from sales_assistant.statements import LatencyHistogram
+
+        self.size = max(size, 1)
+        self.factory = factory
+        self.warehouse = warehouse
+        self.query_tag = query_tag
+        self.borrow_timeout = borrow_timeout
+        self.health_check_after = health_check_after
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: Deque[Tuple[object, float]] = deque()  # (session, last known healthy)
+        self._lock = threading.Lock()
+        self._wait = LatencyHistogram()
+        self.in_use = 0
+        self.borrows = 0
+        self.timeouts = 0
+        self.opened = 0
+        self.replaced = 0
+
+    @contextmanager
+    def borrow(self):
+        """A session for the duration of the block; raises PoolTimeout when none frees up in time"""
+        session = self._acquire()
+        ok = False
+        try:
+            yield session
+            ok = True
+        finally:
+            # A failed query may mean a dead connection: ping before lending it again
+            with self._lock:
+                if self.factory:
+                    self._idle.append((session, time.monotonic() if ok else 0.0))
+                self.in_use -= 1
+            self._slots.release()
+
+    def _acquire(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.borrow_timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout("🚦 All warehouse sessions are busy. Please try again in a moment.")
+        with self._lock:
+            self._wait.observe((time.perf_counter() - started) * 1000)
+            self.borrows += 1
+            self.in_use += 1
+        try:
+            return self._checkout()
+        except BaseException:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+            raise
+
+    def _checkout(self):
+        if not self.factory:
+            # The app's one session: nothing to open, and replacing it would only return the same object
+            return get_session()
+        while True:
+            with self._lock:
+                # Most recently used first: it is the likeliest to still be connected
+                session, healthy_at = self._idle.pop() if self._idle else (None, 0.0)
+            if session is None:
+                return self._open()
+            if time.monotonic() - healthy_at < self.health_check_after or self._healthy(session):
+                return session
+            self._discard(session)
+
+    def _open(self):
+        """A new session of the pool's own, set to its warehouse and query tag"""
+        session = self.factory()
+        if self.warehouse:
+            session.use_warehouse(self.warehouse)
+        if self.query_tag:
+            session.query_tag = self.query_tag
+        with self._lock:
+            self.opened += 1
+        return session
+
+    @staticmethod
+    def _healthy(session) -> bool:
+        try:
+            session.sql(HEALTH_CHECK_SQL).collect()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, session):
+        with self._lock:
+            self.replaced += 1
+        try:
+            session.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close the idle sessions this pool opened"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for session, _ in idle:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "shared": self.factory is None,
+                # Streamlit in Snowflake gets a cap on concurrent queries, not separate connections
+                "mode": "concurrency cap on the shared session" if self.factory is None else "own sessions",
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "borrows": self.borrows,
+                "timeouts": self.timeouts,
+                "opened": self.opened,
+                "replaced": self.replaced,
+                "wait_p50_ms": self._wait.percentile(0.5),
+                "wait_p95_ms": self._wait.percentile(0.95),
+            }
+
+
+_pool: Optional[SessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(**settings) -> SessionPool:
+    """Replace the process-wide pool, e.g. configure_pool(size=8, factory=open_session) for batch jobs"""
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, SessionPool(**settings)
+    if previous is not None:
+        previous.close()
+    return _pool
+
+
+def connection_factory(connection_name: str) -> Callable[[], object]:
+    """Opens a new Snowpark session from a named connection (connections.toml)"""
+    def open_session():
+        from snowflake.snowpark import Session
+
+        return Session.builder.config("connection_name", connection_name).create()
+    return open_session
+
+
+def _unquoted(name: Optional[str]) -> Optional[str]:
+    return name[1:-1] if name and len(name) > 1 and name[0] == name[-1] == '"' else name
+
+
+def container_factory() -> Callable[[], object]:
+    """Opens a new session with the container runtime's OAuth token, in the active session's warehouse, database and schema"""
+    def open_session():
+        from snowflake.snowpark import Session
+
+        active = get_session()
+        with open(CONTAINER_TOKEN_PATH, "r") as f:
+            token = f.read().strip()  # refreshed by Snowflake, so read for every new session
+        settings = {
+            "host": os.environ["SNOWFLAKE_HOST"],
+            "account": os.environ["SNOWFLAKE_ACCOUNT"],
+            "authenticator": "oauth",
+            "token": token,
+            "warehouse": _unquoted(active.get_current_warehouse()),
+            "database": _unquoted(active.get_current_database()),
+            "schema": _unquoted(active.get_current_schema()),
+        }
+        return Session.builder.configs({k: v for k, v in settings.items() if v}).create()
+    return open_session
+
+
+def default_factory() -> Optional[Callable[[], object]]:
+    """How the process-wide pool opens sessions of its own; None where it can only share the active one"""
+    if POOL_CONNECTION:
+        return connection_factory(POOL_CONNECTION)
+    if os.path.exists(CONTAINER_TOKEN_PATH) and os.environ.get("SNOWFLAKE_HOST") and os.environ.get("SNOWFLAKE_ACCOUNT"):
+        return container_factory()
+    return None
+
+
+def get_session_pool() -> SessionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SessionPool(factory=default_factory())
+    return _pool
+
+
+@contextmanager
+def borrowed_session():
+    """A pooled session for one query (or a few back to back)"""
+    with get_session_pool().borrow() as session:
+        yield session
+
+
+def run_sql(query: str, params=None, cache: bool = True):
+    """Execute SQL on a pooled session and return the result as an Arrow table; errors propagate to the caller
+
+    Results are cached for SQL_RESULT_TTL in memory and in the disk store unless cache=False.
+    """
+    from arrow_results import fetch_arrow_table
+
+    key = (query, list(params) if params is not None else None)
+    if cache:
+        table = _sql_results.get(key)
+        if table is not MISS:
+            return table
+    with borrowed_session() as session:
+        table = fetch_arrow_table(session, query, params)
+    if cache:
+        _sql_results.set(key, table)
+    return table
@@ -0,0 +1,78 @@
+"""
+Single-flight request coalescing
+Concurrent calls with the same key wait on the first one (the leader) and share its
+result, so a burst of identical questions costs one Cortex call. Only successes are
+shared: if the leader fails, each waiter makes its own call, because failures such as
+a per-user rate limit belong to the leader alone.
+"""
+
+import re
+import threading
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+from sales_assistant.deadline import wait_for
+
+T = TypeVar("T")
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer"""
+    return re.sub(r"\s+", " ", (query or "").strip().lower()).rstrip("?.! ")
+
+
+class _Call:
+    __slots__ = ("done", "result", "failed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Process-wide map of in-flight calls keyed by request identity"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """(result, shared): run fn, or wait for the identical call already in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            wait_for(call.done)  # a cancelled follower stops waiting; the leader carries on
+            if call.failed:
+                return fn(), False
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+_flights = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _flights
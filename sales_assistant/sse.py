@@ -0,0 +1,118 @@
+"""
+SSE response parsing for Cortex Agent responses
+Raw events are decoded into typed events (sales_assistant.events) and folded into an
+AgentResult with low-confidence citations already pruned. The two dialects differ only
+in how tools are named and whether tool result text is part of the answer.
+"""
+
+from typing import Optional
+
+from sales_assistant.citations import CitationSet
+from sales_assistant.client import ANALYST_TOOL, SEARCH_TOOL, TOOL_NAMES
+from sales_assistant.events import Citation, Metadata, StreamError, TextDelta, ToolResult, ToolUse, decode
+from sales_assistant.results import AgentResult, Notice
+from sales_assistant.search_tuning import get_search_tuner, prune_citations
+
+
+def message_text(events) -> str:
+    """Concatenated text of a response (used for non-tool completions)"""
+    return "".join(event.text for event in decode(events or ()) if type(event) is TextDelta)
+
+
+def _finish(result: AgentResult, citations: CitationSet, query: Optional[str]) -> AgentResult:
+    # Drop low-confidence chunks before the view hydrates them
+    result.citations, result.dropped = prune_citations(citations.ordered())
+    get_search_tuner().observe(query, result.citations, result.dropped)
+    if result.dropped:
+        result.notices.append(Notice("info", f"✂️ Skipped {len(result.dropped)} low-confidence search result(s)", debug=True))
+    return result
+
+
+def _fold(raw_events, result: AgentResult, citations: CitationSet, agent_dialect: bool):
+    text = []
+    notices = result.notices
+    for event in decode(raw_events):
+        kind = type(event)
+        if kind is TextDelta:
+            text.append(event.text)
+        elif kind is ToolResult:
+            if event.text and not agent_dialect:
+                text.append(event.text)
+            if event.sql:
+                # Keep the last non-empty SQL
+                result.sql = event.sql
+            for rank, search_result in enumerate(event.search_results, start=1):
+                citations.add_search_result(search_result, rank=rank)
+        elif kind is Citation:
+            # The same chunks also arrive as search results; CitationSet merges them
+            citations.add(event.doc_title, event.doc_id, source_id=event.source_id)
+        elif kind is ToolUse:
+            if agent_dialect:
+                tool_name = event.name or event.tool_type
+                notices.append(Notice("info", f"🔧 Tool called: {tool_name}", debug=True))
+            else:
+                tool_name = TOOL_NAMES.get(event.tool_type, event.tool_type or 'Unknown')
+                notices.append(Notice("info", f"🔧 Calling tool: {tool_name}", debug=True))
+            result.tools_called.append(tool_name)
+            if event.tool_type:
+                result.tool_types.append(event.tool_type)
+        elif kind is Metadata:
+            result.metadata = event.data
+            notices.append(Notice(
+                "info",
+                f"📨 Metadata: message_id={event.data.get('message_id')}, role={event.data.get('role')}",
+                debug=True,
+            ))
+        elif kind is StreamError:
+            notices.append(Notice("error", f"❌ Agent error: {event.message}"))
+    result.text = "".join(text)
+
+
+def parse_agent_run(events, query: Optional[str] = None) -> AgentResult:
+    """Parse a cortex/agent:run stream
+
+    query: the question sent to the agent, used to tune search depth for similar questions
+    """
+    result = AgentResult()
+    citations = CitationSet()
+    if not events or isinstance(events, str):
+        return _finish(result, citations, query)
+
+    try:
+        result.event_count = len(events)
+        _fold(events, result, citations, agent_dialect=False)
+
+        unique_tools = set(result.tools_called)
+        if SEARCH_TOOL in unique_tools and ANALYST_TOOL in unique_tools:
+            result.notices.append(Notice("success", "✅ Both tools used", debug=True))
+        elif unique_tools:
+            result.notices.append(Notice("info", f"📊 Used: {', '.join(unique_tools)}", debug=True))
+
+    except Exception as e:
+        result.notices.append(Notice("error", f"Error processing events: {str(e)}"))
+
+    return _finish(result, citations, query)
+
+
+def parse_agent_response(events, query: Optional[str] = None) -> AgentResult:
+    """Parse a pre-configured agent stream ("response" content plus "metadata" for threading)"""
+    result = AgentResult()
+    citations = CitationSet()
+    if not events or isinstance(events, str):
+        return _finish(result, citations, query)
+
+    try:
+        result.event_count = len(events)
+        _fold(events, result, citations, agent_dialect=True)
+
+        result.notices.append(Notice("info", f"📊 Processed {result.event_count} events", debug=True))
+        unique_tools = set(result.tools_called)
+        if len(unique_tools) > 1:
+            result.notices.append(Notice("success", f"✅ Multiple tools used: {', '.join(unique_tools)}", debug=True))
+        elif unique_tools:
+            result.notices.append(Notice("info", f"📊 Tool used: {', '.join(unique_tools)}", debug=True))
+
+    except Exception as e:
+        result.notices.append(Notice("error", f"Error processing events: {str(e)}"))
+
+    return _finish(result, citations, query)
@@ -0,0 +1,128 @@
+"""
+Named statements with bind parameters for the lookups the app issues itself
+Citation chunk text, presigned URLs and the FAQ tables are read through Statements: fixed
+SQL text with ? placeholders, prepared once per process. Values are bound, never pasted
+into the SQL, so quotes in a file name cannot break a lookup, and every execution sends
+identical text, which lets Snowflake reuse the compiled statement (and cached results for
+repeated values) instead of compiling new SQL per citation. Each statement keeps a small
+latency histogram for the debug sidebar.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Sequence
+
+from sales_assistant.session import borrowed_session
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency counts; percentiles are reported as bucket upper bounds (capped at the max)"""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        count = sum(self.counts)
+        if not count:
+            return None
+        seen = 0
+        for i, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= q * count:
+                # Never above the slowest observation, which the open-ended bucket also reports
+                return min(self.bounds[i], round(self.max_ms, 1)) if i < len(self.bounds) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def snapshot(self) -> Dict[str, float]:
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "mean_ms": round(self.total_ms / count, 1) if count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class Statement:
+    """One parameterized query; execute it with exactly as many values as it has placeholders"""
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.param_count = sql.count("?")
+        self._lock = threading.Lock()
+        self._latency = LatencyHistogram()
+        self.errors = 0
+
+    def table(self, params: Sequence = (), session=None, encode: bool = False):
+        """Result as an Arrow table, on session or else a pooled one"""
+        from arrow_results import fetch_arrow_table
+
+        params = list(params)
+        if len(params) != self.param_count:
+            raise ValueError(f"statement {self.name} takes {self.param_count} values, got {len(params)}")
+        started = None
+        try:
+            with nullcontext(session) if session is not None else borrowed_session() as session:
+                started = time.perf_counter()  # execution only, not the wait for a session
+                return fetch_arrow_table(session, self.sql, params or None, encode=encode)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            if started is not None:
+                elapsed = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self._latency.observe(elapsed)
+
+    def rows(self, params: Sequence = (), session=None) -> List[dict]:
+        return self.table(params, session).to_pylist()
+
+    def scalar(self, params: Sequence = (), session=None, default=None):
+        """First column of the first row"""
+        table = self.table(params, session)
+        if table.num_rows == 0 or table.num_columns == 0:
+            return default
+        return table.column(0)[0].as_py()
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {**self._latency.snapshot(), "errors": self.errors}
+
+
+_statements: Dict[str, Statement] = {}
+_statements_lock = threading.Lock()
+
+
+def prepare(name: str, sql: str) -> Statement:
+    """The process-wide statement called name, created on first use"""
+    with _statements_lock:
+        statement = _statements.get(name)
+        if statement is None:
+            statement = _statements[name] = Statement(name, sql)
+        elif statement.sql != sql:
+            raise ValueError(f"statement {name} is already prepared with different SQL")
+        return statement
+
+
+def statement_stats() -> Dict[str, Dict[str, float]]:
+    """Latency histogram summary per statement that has run"""
+    with _statements_lock:
+        statements = list(_statements.values())
+    snapshots = {s.name: s.snapshot() for s in statements}
+    return {name: snapshot for name, snapshot in snapshots.items() if snapshot["count"]}
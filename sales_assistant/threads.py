@@ -0,0 +1,161 @@
+"""
+Per-tab conversation threads that outlive the Streamlit session
+Maps each (user, browser tab) to its Cortex thread (thread_id, last parent_message_id and
+the chat transcript) in a SQLite file next to the disk cache, so a browser refresh or a
+reconnect to another worker resumes the tab's thread instead of starting over, while two
+tabs of the same user keep separate conversations. A thread only resumes for the user who
+started it. Threads idle for longer than THREAD_IDLE_TTL are dropped and deleted server-side.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from sales_assistant.cache import CACHE_DIR, connect, private_dir
+
+THREADS_FILE = "threads.sqlite3"
+THREAD_IDLE_TTL = 24 * 3600  # a thread unused this long is not resumed
+GC_INTERVAL = 600  # seconds between stale-thread sweeps per process
+GC_BATCH = 20  # server-side deletions per sweep
+MAX_TRANSCRIPT = 50  # messages kept for re-rendering a resumed chat
+
+
+@dataclass
+class ConversationThread:
+    thread_id: str
+    parent_message_id: int = 0
+    messages: List[dict] = field(default_factory=list)  # chat transcript, for re-rendering after a reconnect
+    resumed: bool = False
+
+
+class ThreadStore:
+    """(user, tab) -> thread mapping shared by every worker process on the host"""
+
+    def __init__(self, path: str, idle_ttl: float = THREAD_IDLE_TTL):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_gc = 0.0
+        self.created = 0
+        self.resumed = 0
+        self.turns = 0
+        db = self._connect()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS tab_threads ("
+            " user TEXT NOT NULL, tab TEXT NOT NULL, thread_id TEXT NOT NULL, parent_message_id INTEGER NOT NULL,"
+            " transcript TEXT NOT NULL, turns INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (user, tab))"
+        )
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = connect(self.path)
+        return db
+
+    def resume(self, user: str, tab: str) -> Optional[ConversationThread]:
+        row = self._connect().execute(
+            "SELECT thread_id, parent_message_id, transcript FROM tab_threads WHERE user = ? AND tab = ? AND updated_at > ?",
+            (user, tab, time.time() - self.idle_ttl),
+        ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self.resumed += 1
+        return ConversationThread(row[0], row[1], json.loads(row[2]), resumed=True)
+
+    def start(self, user: str, tab: str, thread_id: str) -> ConversationThread:
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO tab_threads VALUES (?, ?, ?, 0, '[]', 0, ?, ?)", (user, tab, thread_id, now, now),
+        )
+        with self._lock:
+            self.created += 1
+        return ConversationThread(thread_id)
+
+    def record_turn(self, user: str, tab: str, thread: ConversationThread):
+        """Save the thread's position and transcript after an answered question"""
+        self._connect().execute(
+            "UPDATE tab_threads SET parent_message_id = ?, transcript = ?, turns = turns + 1, updated_at = ?"
+            " WHERE user = ? AND tab = ? AND thread_id = ?",
+            (thread.parent_message_id, json.dumps(thread.messages[-MAX_TRANSCRIPT:]), time.time(),
+             user, tab, thread.thread_id),
+        )
+        with self._lock:
+            self.turns += 1
+
+    def forget(self, user: str, tab: str) -> Optional[str]:
+        """Drop the tab's thread (New Conversation); returns its id for server-side deletion"""
+        db = self._connect()
+        row = db.execute("SELECT thread_id FROM tab_threads WHERE user = ? AND tab = ?", (user, tab)).fetchone()
+        db.execute("DELETE FROM tab_threads WHERE user = ? AND tab = ?", (user, tab))
+        return row[0] if row else None
+
+    def collect_stale(self, limit: int = GC_BATCH) -> List[str]:
+        """Remove up to limit idle threads and return their ids"""
+        db = self._connect()
+        rows = db.execute(
+            "SELECT user, tab, thread_id FROM tab_threads WHERE updated_at <= ? ORDER BY updated_at LIMIT ?",
+            (time.time() - self.idle_ttl, limit),
+        ).fetchall()
+        db.executemany("DELETE FROM tab_threads WHERE user = ? AND tab = ? AND thread_id = ?", rows)
+        return [thread_id for _, _, thread_id in rows]
+
+    def gc_due(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_gc < GC_INTERVAL:
+                return False
+            self._last_gc = now
+            return True
+
+    def snapshot(self) -> Dict[str, float]:
+        """Reuse in this process (resumed vs created threads) and host-wide thread depth"""
+        active, avg_turns = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(AVG(turns), 0) FROM tab_threads WHERE updated_at > ?",
+            (time.time() - self.idle_ttl,),
+        ).fetchone()
+        with self._lock:
+            opened = self.created + self.resumed
+            return {
+                "active_threads": active,
+                "avg_turns": round(avg_turns, 1),
+                "created": self.created,
+                "resumed": self.resumed,
+                "reuse_rate": round(self.resumed / opened, 3) if opened else None,
+                "turns": self.turns,
+            }
+
+
+def open_thread(store: ThreadStore, user: str, tab: str, create: Callable[[], Optional[str]],
+                delete: Callable[[str], None]) -> Optional[ConversationThread]:
+    """Resume the tab's thread or create a new one; stale threads are swept along the way"""
+    if store.gc_due():
+        for thread_id in store.collect_stale():
+            try:
+                delete(thread_id)
+            except Exception:
+                pass  # the server expires threads on its own eventually
+    thread = store.resume(user, tab)
+    if thread is not None:
+        return thread
+    thread_id = create()
+    return store.start(user, tab, thread_id) if thread_id else None
+
+
+_store: Optional[ThreadStore] = None
+_store_lock = threading.Lock()
+
+
+def get_thread_store() -> ThreadStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                # Transcripts are as private as the cache; refuses (UnsafeCacheDir) a directory another user owns
+                _store = ThreadStore(os.path.join(private_dir(CACHE_DIR), THREADS_FILE))
+    return _store
@@ -0,0 +1,92 @@
+"""
+Transport for Cortex REST calls
+Inside Streamlit in Snowflake requests go through _snowflake.send_snow_api_request;
+outside it (batch jobs, local runs) the same calls go over HTTPS with the Snowpark
+session's token, and the SSE stream is parsed into the same list of events.
+"""
+
+import json
+from typing import Callable, Optional
+
+from sales_assistant.deadline import current_deadline
+from sales_assistant.session import get_session
+
+try:  # Only importable inside Streamlit in Snowflake
+    import _snowflake
+except ImportError:
+    _snowflake = None
+
+_transport: Optional[Callable] = None
+
+
+def set_transport(transport: Optional[Callable]):
+    """Route every request through transport (same signature as send_snow_api_request); None restores the default"""
+    global _transport
+    _transport = transport
+
+
+def parse_sse(body: str) -> list:
+    """Split a text/event-stream body into [{'event': ..., 'data': ...}] like _snowflake returns"""
+    events = []
+    event, data = None, []
+    for line in body.splitlines() + [""]:
+        if not line:
+            if data:
+                payload = "\n".join(data)
+                try:
+                    payload = json.loads(payload)
+                except json.JSONDecodeError:
+                    pass
+                events.append({"event": event or "message", "data": payload})
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].lstrip())
+    return events
+
+
+def rest_transport(method, path, headers, params, body, request_guid, timeout_ms):
+    """send_snow_api_request over HTTPS using the configured session's connection"""
+    import requests
+
+    connection = get_session().connection
+    response = requests.request(
+        method,
+        f"https://{connection.host}{path}",
+        headers={
+            "Authorization": f'Snowflake Token="{connection.rest.token}"',
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream" if params.get("stream") else "application/json",
+            **(headers or {}),
+        },
+        json=body,
+        timeout=timeout_ms / 1000,
+    )
+    content = response.text
+    if "text/event-stream" in response.headers.get("Content-Type", ""):
+        content = json.dumps(parse_sse(content))
+    return {"status": response.status_code, "reason": response.reason, "content": content}
+
+
+def _send(method, path, headers, params, body, request_guid, timeout_ms):
+    if _transport is not None:
+        return _transport(method, path, headers, params, body, request_guid, timeout_ms)
+    if _snowflake is not None:
+        return _snowflake.send_snow_api_request(method, path, headers, params, body, request_guid, timeout_ms)
+    return rest_transport(method, path, headers, params, body, request_guid, timeout_ms)
+
+
+def send_snow_api_request(method, path, headers, params, body, request_guid, timeout_ms):
+    """Drop-in for _snowflake.send_snow_api_request that also works outside Snowflake
+
+    Inside deadline.within(...) the timeout is capped by the question's remaining budget and
+    the caller stops waiting as soon as the question is cancelled.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return _send(method, path, headers, params, body, request_guid, timeout_ms)
+    timeout_ms = deadline.stage_timeout_ms(None, timeout_ms)
+    return deadline.run(
+        lambda: _send(method, path, headers, params, body, request_guid, timeout_ms), timeout_ms,
+    )
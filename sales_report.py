@@ -0,0 +1,327 @@
+"""
+Data-driven sales report deck
+Runs the metric queries as one concurrent batch through the app's Arrow query executor,
+caches their results on disk and renders chart/table slides with python-pptx.
+Regeneration is incremental: queries only re-run when their source tables changed,
+and only slides whose data changed are rebuilt in the existing deck.
+
+Usage: python sales_report.py --connection NAME [--output Sales_Report.pptx] [--full]
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.dml.color import RGBColor
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+from pptx.util import Inches, Pt
+
+from arrow_results import fetch_arrow_table, fetch_arrow_tables
+from create_presentation import (
+    BLANK_LAYOUT, DARK_BLUE, DARK_GRAY, LIGHT_GRAY, SNOWFLAKE_BLUE,
+    add_slide_title, add_text, new_presentation,
+)
+
+SALES_SCHEMA = "CORTEX_AGENTS.CORTEX_AGENTS_SALES"
+OUTPUT_FILE = "Sales_Report.pptx"
+CACHE_DIR = ".report_cache"
+
+# Each metric lists the tables it reads so unchanged tables skip the query entirely
+METRICS = {
+    "revenue_by_month_region": {
+        "tables": ["ORDERS"],
+        "sql": f"""
+            SELECT TO_CHAR(DATE_TRUNC('month', order_date), 'YYYY-MM') AS MONTH,
+                   region AS REGION,
+                   COUNT(*) AS ORDERS,
+                   SUM(total_amount) AS REVENUE
+            FROM {SALES_SCHEMA}.ORDERS
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """,
+    },
+    "refunds_by_month": {
+        "tables": ["REFUNDS"],
+        "sql": f"""
+            SELECT TO_CHAR(DATE_TRUNC('month', refund_date), 'YYYY-MM') AS MONTH,
+                   COUNT(*) AS REFUNDS,
+                   SUM(refund_amount) AS REFUND_AMOUNT
+            FROM {SALES_SCHEMA}.REFUNDS
+            GROUP BY 1
+            ORDER BY 1
+        """,
+    },
+    "shipping_delays": {
+        "tables": ["SHIPMENTS"],
+        "sql": f"""
+            SELECT supplier_id AS SUPPLIER_ID,
+                   COUNT(*) AS SHIPMENTS,
+                   ROUND(AVG(shipping_delay_days), 2) AS AVG_DELAY_DAYS,
+                   MAX(shipping_delay_days) AS MAX_DELAY_DAYS
+            FROM {SALES_SCHEMA}.SHIPMENTS
+            GROUP BY 1
+            ORDER BY 3 DESC
+        """,
+    },
+}
+
+# Slides in deck order; "metric" names the data each slide is built from
+REPORT_SLIDES = [
+    {"key": "revenue_trend", "type": "line_chart", "metric": "revenue_by_month_region",
+     "title": "Revenue by Month and Region", "category": "MONTH", "series": "REGION", "value": "REVENUE"},
+    {"key": "revenue_regions", "type": "region_table", "metric": "revenue_by_month_region",
+     "title": "Revenue by Region"},
+    {"key": "refunds", "type": "column_chart", "metric": "refunds_by_month",
+     "title": "Refunds by Month", "category": "MONTH", "value": "REFUND_AMOUNT"},
+    {"key": "shipping", "type": "table", "metric": "shipping_delays",
+     "title": "Shipping Delays by Supplier", "columns": ["SUPPLIER_ID", "SHIPMENTS", "AVG_DELAY_DAYS", "MAX_DELAY_DAYS"]},
+]
+
+# ----------------------------------------------------------------------------
+# Metric batch + cache
+# ----------------------------------------------------------------------------
+
+def _cache_path(name: str) -> str:
+    return os.path.join(CACHE_DIR, f"{name}.arrow")
+
+
+def _manifest_path() -> str:
+    return os.path.join(CACHE_DIR, "manifest.json")
+
+
+def load_manifest() -> Dict:
+    try:
+        with open(_manifest_path(), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"metrics": {}, "slides": {}}
+
+
+def save_manifest(manifest: Dict):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(_manifest_path(), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _write_cached(name: str, table: pa.Table) -> str:
+    """Store a metric result as an Arrow IPC file and return the content hash"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    sink = pa.BufferOutputStream()
+    with ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    data = sink.getvalue().to_pybytes()
+    with open(_cache_path(name), "wb") as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_cached(name: str) -> Optional[pa.Table]:
+    try:
+        with pa.memory_map(_cache_path(name), "r") as source:
+            return ipc.open_file(source).read_all()
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def table_versions(session, tables: List[str]) -> Dict[str, str]:
+    """LAST_ALTERED per source table, read in a single metadata query"""
+    database, schema = SALES_SCHEMA.split(".")
+    placeholders = ", ".join("?" for _ in tables)
+    rows = fetch_arrow_table(
+        session,
+        f"SELECT TABLE_NAME, TO_VARCHAR(LAST_ALTERED) AS LAST_ALTERED FROM {database}.INFORMATION_SCHEMA.TABLES "
+        f"WHERE TABLE_SCHEMA = ? AND TABLE_NAME IN ({placeholders})",
+        params=[schema, *tables],
+        encode=False,
+    ).to_pylist()
+    return {row["TABLE_NAME"]: row["LAST_ALTERED"] for row in rows}
+
+
+def refresh_metrics(session, manifest: Dict, full: bool = False) -> Dict[str, pa.Table]:
+    """Re-run only metrics whose source tables changed (all of them with full=True), as one batch"""
+    versions = table_versions(session, sorted({t for m in METRICS.values() for t in m["tables"]}))
+    stale = {}
+    results = {}
+    for name, metric in METRICS.items():
+        seen = manifest["metrics"].get(name, {})
+        current = {t: versions.get(t) for t in metric["tables"]}
+        cached = None if full or seen.get("tables") != current else _read_cached(name)
+        if cached is None:
+            stale[name] = metric["sql"]
+        else:
+            results[name] = cached
+
+    for name, table in fetch_arrow_tables(session, stale).items():
+        manifest["metrics"][name] = {
+            "tables": {t: versions.get(t) for t in METRICS[name]["tables"]},
+            "hash": _write_cached(name, table),
+            "fetched_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        results[name] = table
+    return results
+
+# ----------------------------------------------------------------------------
+# Slide renderers
+# ----------------------------------------------------------------------------
+
+def _chart(slide, chart_type, chart_data, legend: bool):
+    chart = slide.shapes.add_chart(chart_type, Inches(0.5), Inches(1.4), Inches(9), Inches(5.6), chart_data).chart
+    chart.has_legend = legend
+    if legend:
+        chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+        chart.legend.include_in_layout = False
+    chart.font.size = Pt(10)
+    return chart
+
+
+def render_line_chart(slide, spec, table: pa.Table):
+    rows = table.to_pylist()
+    categories = sorted({r[spec["category"]] for r in rows})
+    chart_data = CategoryChartData()
+    chart_data.categories = categories
+    for series in sorted({r[spec["series"]] for r in rows}):
+        values = {r[spec["category"]]: float(r[spec["value"]] or 0) for r in rows if r[spec["series"]] == series}
+        chart_data.add_series(str(series), [values.get(c, 0) for c in categories])
+    _chart(slide, XL_CHART_TYPE.LINE_MARKERS, chart_data, legend=True)
+
+
+def render_column_chart(slide, spec, table: pa.Table):
+    rows = table.to_pylist()
+    chart_data = CategoryChartData()
+    chart_data.categories = [r[spec["category"]] for r in rows]
+    chart_data.add_series(spec["value"].replace("_", " ").title(), [float(r[spec["value"]] or 0) for r in rows])
+    chart = _chart(slide, XL_CHART_TYPE.COLUMN_CLUSTERED, chart_data, legend=False)
+    chart.plots[0].series[0].format.fill.solid()
+    chart.plots[0].series[0].format.fill.fore_color.rgb = RGBColor.from_string(SNOWFLAKE_BLUE)
+
+
+def _table(slide, headers: List[str], rows: List[List]):
+    shape = slide.shapes.add_table(len(rows) + 1, len(headers), Inches(0.5), Inches(1.5), Inches(9),
+                                   Inches(0.4) * (len(rows) + 1))
+    grid = shape.table
+    for j, header in enumerate(headers):
+        grid.cell(0, j).text = header.replace("_", " ").title()
+    for i, row in enumerate(rows, start=1):
+        for j, value in enumerate(row):
+            cell = grid.cell(i, j)
+            cell.text = f"{value:,.2f}" if isinstance(value, float) else str(value)
+            cell.text_frame.paragraphs[0].font.size = Pt(11)
+
+
+def render_table(slide, spec, table: pa.Table):
+    rows = table.select(spec["columns"]).to_pylist()[:12]
+    _table(slide, spec["columns"], [[r[c] for c in spec["columns"]] for r in rows])
+
+
+def render_region_table(slide, spec, table: pa.Table):
+    totals = table.group_by("REGION").aggregate([("ORDERS", "sum"), ("REVENUE", "sum")]).to_pylist()
+    totals.sort(key=lambda r: -float(r["REVENUE_sum"] or 0))
+    rows = [[r["REGION"], int(r["ORDERS_sum"]), float(r["REVENUE_sum"] or 0),
+             float(r["REVENUE_sum"] or 0) / max(int(r["ORDERS_sum"]), 1)] for r in totals]
+    _table(slide, ["REGION", "ORDERS", "REVENUE", "AVG_ORDER_VALUE"], rows)
+
+
+def render_report_title(slide):
+    slide.background.fill.solid()
+    slide.background.fill.fore_color.rgb = RGBColor.from_string(LIGHT_GRAY)
+    add_text(slide, 0.5, 2.5, 9, 1.2, "Sales Performance Report", 44, color=DARK_BLUE, bold=True)
+    add_text(slide, 0.5, 3.7, 9, 0.6, f"Generated {datetime.date.today().isoformat()} from live sales data",
+             18, color=DARK_GRAY)
+
+
+SLIDE_RENDERERS = {
+    "line_chart": render_line_chart,
+    "column_chart": render_column_chart,
+    "table": render_table,
+    "region_table": render_region_table,
+}
+
+
+def _slide_hash(spec: Dict, manifest: Dict) -> str:
+    payload = json.dumps([spec, manifest["metrics"][spec["metric"]]["hash"]], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _build_slide(prs, key: str, data: Dict[str, pa.Table], manifest: Dict):
+    slide = prs.slides.add_slide(prs.slide_layouts[BLANK_LAYOUT])
+    if key == "title":
+        render_report_title(slide)
+        return slide
+    spec = next(s for s in REPORT_SLIDES if s["key"] == key)
+    add_slide_title(slide, spec["title"], DARK_BLUE)
+    SLIDE_RENDERERS[spec["type"]](slide, spec, data[spec["metric"]])
+    return slide
+
+
+def _replace_slide(prs, index: int, key: str, data, manifest):
+    """Rebuild one slide in place: append the new slide, move it to index, drop the old one"""
+    _build_slide(prs, key, data, manifest)
+    slide_ids = prs.slides._sldIdLst
+    new_id = slide_ids[-1]
+    slide_ids.remove(new_id)
+    slide_ids.insert(index, new_id)
+    old_id = slide_ids[index + 1]
+    prs.part.drop_rel(old_id.rId)
+    slide_ids.remove(old_id)
+    # add_slide names parts by slide count, so keep part names sequential after the swap
+    prs.part.rename_slide_parts([sld_id.rId for sld_id in slide_ids])
+
+# ----------------------------------------------------------------------------
+# Report generation
+# ----------------------------------------------------------------------------
+
+def generate_report(session, output_path: str = OUTPUT_FILE, full: bool = False) -> Dict:
+    manifest = load_manifest()
+    data = refresh_metrics(session, manifest, full=full)
+
+    keys = ["title"] + [s["key"] for s in REPORT_SLIDES]
+    hashes = {s["key"]: _slide_hash(s, manifest) for s in REPORT_SLIDES}
+    hashes["title"] = hashlib.sha256("".join(sorted(hashes.values())).encode()).hexdigest()
+
+    previous = manifest.get("slides", {})
+    incremental = (not full and os.path.exists(output_path) and manifest.get("slide_order") == keys)
+    if incremental:
+        prs = Presentation(output_path)
+        rebuilt = [k for k in keys if previous.get(k) != hashes[k]]
+        for key in rebuilt:
+            _replace_slide(prs, keys.index(key), key, data, manifest)
+    else:
+        prs = new_presentation()
+        rebuilt = keys
+        for key in keys:
+            _build_slide(prs, key, data, manifest)
+
+    if rebuilt:
+        prs.save(output_path)
+    manifest["slides"] = hashes
+    manifest["slide_order"] = keys
+    save_manifest(manifest)
+    return {"output": output_path, "rebuilt_slides": rebuilt, "incremental": incremental}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connection", required=True, help="Snowflake connection name")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--full", action="store_true", help="Re-run every query and rebuild every slide")
+    args = parser.parse_args()
+
+    from snowflake.snowpark import Session
+
+    session = Session.builder.config("connection_name", args.connection).create()
+    try:
+        summary = generate_report(session, args.output, args.full)
+    finally:
+        session.close()
+    print(f"✅ {summary['output']}: rebuilt {len(summary['rebuilt_slides'])} slide(s) {summary['rebuilt_slides']}")
+
+
+if __name__ == "__main__":
+    main()
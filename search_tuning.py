@@ -0,0 +1,6 @@
+"""
+Confidence-aware tuning of Cortex Search retrieval; moved to sales_assistant.search_tuning,
+re-exported here for scripts that still import it from the repo root
+"""
+
+from sales_assistant.search_tuning import *  # noqa: F401,F403
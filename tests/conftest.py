@@ -0,0 +1,9 @@
+import os
+import sys
+
+# No host-wide cache file or query log from test runs; set before sales_assistant is imported
+os.environ.setdefault("SALES_ASSISTANT_DISK_CACHE", "0")
+os.environ.setdefault("SALES_ASSISTANT_QUERY_LOG", "0")
+
+# The scripts (ingest_docs, verified_queries) sit at the repo root, next to sales_assistant
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
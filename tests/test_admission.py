@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from sales_assistant.admission import AdmissionController, Overloaded, RateLimited, TokenBucket
+from sales_assistant.deadline import Deadline, DeadlineExceeded
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_token_bucket_allows_burst_then_reports_wait():
+    bucket = TokenBucket(rate=1.0, burst=2)
+    assert bucket.take() == 0.0
+    assert bucket.take() == 0.0
+    assert bucket.take() == pytest.approx(1.0, abs=0.05)
+
+
+def test_token_bucket_refills_and_refunds():
+    bucket = TokenBucket(rate=2.0, burst=1)
+    bucket.take()
+    assert not bucket.full()
+    bucket.updated -= 0.5  # half a second at two tokens a second
+    assert bucket.full()
+    bucket.take()
+    bucket.refund()
+    assert bucket.take() == 0.0
+
+
+def test_rate_limit_charges_once_per_question():
+    controller = AdmissionController(max_in_flight=4, user_rate=0.001, user_burst=1)
+    with controller.admit("alice"):
+        pass
+    with pytest.raises(RateLimited):
+        with controller.admit("alice"):
+            pass
+    with controller.admit("alice", charge=False):
+        pass
+    with controller.admit("bob"):
+        pass
+    assert controller.snapshot()["rate_limited"] == 1
+
+
+def test_full_queue_sheds():
+    controller = AdmissionController(max_in_flight=1, user_rate=None, max_queue=0)
+    with controller.admit("alice"):
+        with pytest.raises(Overloaded):
+            with controller.admit("bob"):
+                pass
+    assert controller.snapshot()["shed"] == 1
+
+
+def test_queue_wait_limit_sheds():
+    controller = AdmissionController(max_in_flight=1, user_rate=None, max_wait=0.05)
+    with controller.admit("alice"):
+        started = time.monotonic()
+        with pytest.raises(Overloaded):
+            with controller.admit("bob"):
+                pass
+        assert time.monotonic() - started < 1.0
+    assert controller.snapshot()["in_flight"] == 0
+
+
+def test_waiters_are_served_round_robin_across_users():
+    controller = AdmissionController(max_in_flight=1, user_rate=None)
+    admitted = []
+    positions = {}
+
+    def ask(label, user):
+        def on_wait(position):
+            positions.setdefault(label, position)
+        with controller.admit(user, on_wait=on_wait):
+            admitted.append(label)
+
+    threads = []
+    with controller.admit("holder"):
+        for label, user in (("a1", "alice"), ("a2", "alice"), ("b1", "bob")):
+            thread = threading.Thread(target=ask, args=(label, user))
+            thread.start()
+            threads.append(thread)
+            queued = len(threads)
+            wait_until(lambda: controller.snapshot()["queued"] == queued)
+    for thread in threads:
+        thread.join(2)
+
+    assert admitted == ["a1", "b1", "a2"]
+    assert positions["a1"] == 1
+    assert controller.snapshot()["in_flight"] == 0
+
+
+def test_abandoned_request_keeps_its_slot_until_it_ends():
+    controller = AdmissionController(max_in_flight=1, user_rate=None)
+    release = threading.Event()
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit("alice"):
+            Deadline().run(lambda: release.wait(2), timeout_ms=50)
+
+    assert controller.snapshot()["in_flight"] == 1
+    assert controller.snapshot()["draining"] == 1
+    release.set()
+    wait_until(lambda: controller.snapshot()["in_flight"] == 0)
+    assert controller.snapshot()["draining"] == 0
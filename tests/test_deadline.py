@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from sales_assistant.deadline import (
+    MIN_STAGE_TIMEOUT_MS, STAGE_HEADROOM, Cancelled, Deadline, DeadlineExceeded, abandoned_calls, current_deadline,
+    within,
+)
+
+
+def test_run_returns_result_and_reraises_errors():
+    deadline = Deadline(5000)
+    assert deadline.run(lambda: 42, timeout_ms=1000) == 42
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        deadline.run(fail, timeout_ms=1000)
+
+
+def test_run_times_out_and_records_the_abandoned_call():
+    release = threading.Event()
+    with abandoned_calls() as abandoned:
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            Deadline().run(lambda: release.wait(2), timeout_ms=50)
+        assert time.monotonic() - started < 1.0
+    assert len(abandoned) == 1
+    assert not abandoned[0].done.is_set()
+    release.set()
+    assert abandoned[0].done.wait(2)
+
+
+def test_budget_caps_the_stage_timeout():
+    deadline = Deadline(100)
+    with pytest.raises(DeadlineExceeded):
+        deadline.run(lambda: time.sleep(2), timeout_ms=5000)
+
+
+def test_cancel_from_another_thread_stops_the_wait():
+    deadline = Deadline()
+    threading.Timer(0.05, deadline.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(Cancelled):
+        deadline.run(lambda: time.sleep(2), timeout_ms=5000)
+    assert time.monotonic() - started < 1.0
+
+
+class Rerun(Exception):
+    """Stands in for the exception a Streamlit rerun raises at a script checkpoint"""
+
+
+def test_heartbeat_error_cancels_and_is_kept():
+    def heartbeat():
+        raise Rerun()
+
+    deadline = Deadline(heartbeat=heartbeat)
+    with pytest.raises(Cancelled):
+        deadline.wait(threading.Event(), timeout_s=2)
+    assert deadline.cancelled
+    assert isinstance(deadline.interrupt, Rerun)
+
+
+def test_child_is_cancelled_with_its_parent_only():
+    parent = Deadline(5000)
+    child = parent.child()
+    child.cancel()
+    assert child.cancelled and not parent.cancelled
+
+    other = parent.child()
+    parent.cancel()
+    assert other.cancelled
+    with pytest.raises(Cancelled):
+        other.check()
+
+
+def test_stage_timeout_from_p95_and_remaining_budget():
+    assert Deadline().stage_timeout_ms(None, 8000) == 8000
+    assert Deadline().stage_timeout_ms(10000, 50000) == 10000 * STAGE_HEADROOM
+    assert Deadline().stage_timeout_ms(100, 50000) == MIN_STAGE_TIMEOUT_MS
+    assert Deadline(20000).stage_timeout_ms(None, 50000, reserve_ms=5000) <= 15000
+    # Reserving more than is left still leaves the stage its minimum
+    assert Deadline(20000).stage_timeout_ms(None, 50000, reserve_ms=19000) >= MIN_STAGE_TIMEOUT_MS - 50
+
+
+def test_within_sets_the_current_deadline():
+    deadline = Deadline()
+    assert current_deadline() is None
+    with within(deadline):
+        assert current_deadline() is deadline
+    assert current_deadline() is None
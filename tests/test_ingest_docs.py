@@ -0,0 +1,37 @@
+import json
+
+from ingest_docs import plan_chunk_delta
+
+
+def write_chunks(path, chunks):
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk, md5 in chunks:
+            f.write(json.dumps({"chunk": chunk, "md5": md5}) + "\n")
+    return str(path)
+
+
+def test_unchanged_chunks_keep_their_index(tmp_path):
+    existing = {"a": [0], "b": [1], "c": [2]}
+    path = write_chunks(tmp_path / "chunks.jsonl", [("A", "a"), ("B", "b"), ("C", "c")])
+    assert plan_chunk_delta(existing, path) == ([], [])
+
+
+def test_edit_in_the_middle_does_not_renumber_the_rest(tmp_path):
+    existing = {"a": [0], "b": [1], "c": [2]}
+    path = write_chunks(tmp_path / "chunks.jsonl", [("A", "a"), ("B2", "b2"), ("C", "c")])
+    inserts, deletes = plan_chunk_delta(existing, path)
+    assert inserts == [("B2", 3)]
+    assert deletes == [1]
+
+
+def test_repeated_chunks_are_matched_one_for_one(tmp_path):
+    existing = {"a": [4, 0], "b": [1]}
+    path = write_chunks(tmp_path / "chunks.jsonl", [("A", "a"), ("B", "b"), ("B", "b")])
+    inserts, deletes = plan_chunk_delta(existing, path)
+    assert inserts == [("B", 5)]
+    assert deletes == [4]
+
+
+def test_new_document_is_numbered_from_zero(tmp_path):
+    path = write_chunks(tmp_path / "chunks.jsonl", [("A", "a"), ("B", "b")])
+    assert plan_chunk_delta({}, path) == ([("A", 0), ("B", 1)], [])
@@ -0,0 +1,23 @@
+import json
+
+from sales_assistant.querylog import agent_record, read_records
+from sales_assistant.results import AgentResult
+
+
+def test_read_records_skips_blank_and_cut_short_lines(tmp_path):
+    (tmp_path / "queries-2026-01-01-1.jsonl").write_text(
+        json.dumps({"query": "a", "ts": 1}) + "\n\n" + json.dumps({"query": "b", "ts": 5}) + "\n",
+        encoding="utf-8")
+    (tmp_path / "queries-2026-01-02-1.jsonl").write_text(
+        json.dumps({"query": "c", "ts": 9}) + '\n{"query": "cut sh', encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("not a log\n", encoding="utf-8")
+
+    assert [r["query"] for r in read_records([str(tmp_path)])] == ["a", "b", "c"]
+    assert [r["query"] for r in read_records([str(tmp_path)], since=5)] == ["b", "c"]
+
+
+def test_agent_record_keeps_per_stage_timings():
+    stages = {"queue": 12.34, "agent": 900.01, "parse": 1.26}
+    record = agent_record("agent", "q", "m", AgentResult(), 913.6, stages)
+    assert record["timings_ms"] == {"queue": 12.3, "agent": 900.0, "parse": 1.3}
+    assert agent_record("agent", "q", "m", AgentResult(), 913.6)["timings_ms"] == {"agent": 913.6}
@@ -0,0 +1,120 @@
+import pytest
+
+pytest.importorskip("yaml")
+
+from sales_assistant.semantic_model import SemanticModel  # noqa: E402
+
+MODEL = {
+    "name": "sales",
+    "tables": [
+        {
+            "name": "CUSTOMERS",
+            "base_table": {"database": "SALES_DB", "schema": "PUBLIC", "table": "CUSTOMERS"},
+            "primary_key": {"columns": ["CUSTOMER_ID"]},
+            "dimensions": [
+                {"name": "CUSTOMER_ID", "expr": "CUSTOMER_ID"},
+                {"name": "REGION", "expr": "REGION", "sample_values": ["North America", "Europe"]},
+            ],
+        },
+        {
+            "name": "ORDERS",
+            "base_table": {"database": "SALES_DB", "schema": "PUBLIC", "table": "ORDERS"},
+            "primary_key": {"columns": ["ORDER_ID"]},
+            "dimensions": [
+                {"name": "ORDER_ID", "expr": "ORDER_ID"},
+                {"name": "CUSTOMER_ID", "expr": "CUSTOMER_ID"},
+                {"name": "REGION", "expr": "REGION"},
+            ],
+            "facts": [{"name": "ORDER_TOTAL", "expr": "ORDER_TOTAL", "synonyms": ["order value"]}],
+        },
+        {
+            "name": "ORDER_ITEMS",
+            "base_table": {"database": "SALES_DB", "schema": "PUBLIC", "table": "ORDER_ITEMS"},
+            "primary_key": {"columns": ["ORDER_ITEM_ID"]},
+            "dimensions": [
+                {"name": "ORDER_ITEM_ID", "expr": "ORDER_ITEM_ID"},
+                {"name": "ORDER_ID", "expr": "ORDER_ID"},
+                {"name": "PRODUCT_ID", "expr": "PRODUCT_ID"},
+                {"name": "LINE_NOTE", "expr": "LINE_NOTE"},
+            ],
+            "facts": [{"name": "QUANTITY", "expr": "QUANTITY"}],
+        },
+        {
+            "name": "PRODUCTS",
+            "base_table": {"database": "SALES_DB", "schema": "PUBLIC", "table": "PRODUCTS"},
+            "primary_key": {"columns": ["PRODUCT_ID"]},
+            "dimensions": [
+                {"name": "PRODUCT_ID", "expr": "PRODUCT_ID"},
+                {"name": "CATEGORY", "expr": "CATEGORY", "sample_values": ["Electronics", "Furniture"]},
+            ],
+        },
+    ],
+    "relationships": [
+        {"name": "orders_customers", "left_table": "ORDERS", "right_table": "CUSTOMERS",
+         "relationship_columns": [{"left_column": "CUSTOMER_ID", "right_column": "CUSTOMER_ID"}]},
+        {"name": "items_orders", "left_table": "ORDER_ITEMS", "right_table": "ORDERS",
+         "relationship_columns": [{"left_column": "ORDER_ID", "right_column": "ORDER_ID"}]},
+        {"name": "items_products", "left_table": "ORDER_ITEMS", "right_table": "PRODUCTS",
+         "relationship_columns": [{"left_column": "PRODUCT_ID", "right_column": "PRODUCT_ID"}]},
+    ],
+    "verified_queries": [
+        {"name": "orders_by_region", "sql": "SELECT REGION, COUNT(*) FROM __ORDERS GROUP BY REGION"},
+        {"name": "units_by_category", "sql": "SELECT CATEGORY, SUM(QUANTITY) FROM __ORDER_ITEMS JOIN __PRODUCTS"},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def model():
+    return SemanticModel(MODEL)
+
+
+def test_resolves_table_names_synonyms_and_business_words(model):
+    assert model.resolve("how many orders last month").tables == {"ORDERS"}
+    assert model.resolve("average order value").tables == {"ORDERS"}
+    assert model.resolve("total revenue").tables == {"ORDERS"}
+
+
+def test_sample_values_point_at_their_column(model):
+    resolution = model.resolve("sales of electronics")
+    assert "PRODUCTS" in resolution.tables
+    assert resolution.columns["PRODUCTS"] == {"CATEGORY"}
+
+
+def test_shared_column_counts_for_a_table_already_referenced(model):
+    # REGION is on CUSTOMERS and ORDERS; orders are already referenced
+    assert model.resolve("orders by region").tables == {"ORDERS"}
+
+
+def test_bridge_tables_join_the_referenced_ones(model):
+    resolution = model.resolve("revenue by product category")
+    assert resolution.tables == {"ORDERS", "PRODUCTS"}
+    assert resolution.bridges == {"ORDER_ITEMS"}
+    assert resolution.kept == {"ORDERS", "PRODUCTS", "ORDER_ITEMS"}
+
+
+def test_unrelated_question_resolves_to_nothing(model):
+    assert not model.resolve("what is the weather like").tables
+
+
+def test_prune_keeps_referenced_tables_whole_and_bridges_to_their_keys(model):
+    pruned = model.prune(model.resolve("revenue by product category"))
+    tables = {t["name"]: t for t in pruned["tables"]}
+    assert set(tables) == {"ORDERS", "ORDER_ITEMS", "PRODUCTS"}
+    assert tables["ORDERS"] == MODEL["tables"][1]
+    bridge = tables["ORDER_ITEMS"]
+    assert [c["name"] for c in bridge["dimensions"]] == ["ORDER_ITEM_ID", "ORDER_ID", "PRODUCT_ID"]
+    assert [c["name"] for c in bridge["facts"]] == ["QUANTITY"]
+    assert {r["name"] for r in pruned["relationships"]} == {"items_orders", "items_products"}
+
+
+def test_prune_drops_verified_queries_on_dropped_tables(model):
+    pruned = model.prune(model.resolve("orders by region"))
+    assert [q["name"] for q in pruned["verified_queries"]] == ["orders_by_region"]
+    assert "relationships" not in pruned
+
+
+def test_pruned_model_is_smaller_and_round_trips(model):
+    pruned = model.dump(model.prune(model.resolve("orders by region")))
+    assert len(pruned) < model.full_bytes
+    assert SemanticModel.dump(SemanticModel(MODEL).model) == SemanticModel.dump(MODEL)
@@ -0,0 +1,93 @@
+from sales_assistant.events import Citation, Metadata, StreamError, TextDelta, ToolResult, ToolUse, decode
+from sales_assistant.sse import message_text, parse_agent_response, parse_agent_run
+
+
+def delta(*content):
+    return {"event": "message.delta", "data": {"delta": {"content": list(content)}}}
+
+
+def text(value):
+    return {"type": "text", "text": value}
+
+
+AGENT_RUN = [
+    delta({"type": "tool_use", "tool_use": {"type": "cortex_analyst_text_to_sql", "name": "Sales Analyst"}}),
+    delta({"type": "tool_results", "tool_results": {"content": [
+        {"type": "json", "json": {"text": "Revenue was ", "sql": "SELECT SUM(total) FROM __ORDERS"}},
+    ]}}),
+    delta({"type": "tool_use", "tool_use": {"type": "cortex_search", "name": "Faq Search"}}),
+    delta({"type": "tool_results", "tool_results": {"content": [
+        {"type": "json", "json": {"searchResults": [
+            {"doc_title": "refunds.pdf", "doc_id": 3, "source_id": 1},
+            {"doc_title": "shipping.pdf", "doc_id": "7", "source_id": 2},
+        ]}},
+    ]}}),
+    delta(text("$1.2M")),
+    delta(text(" in Q3.")),
+    {"event": "done", "data": "[DONE]"},
+]
+
+
+def test_decode_joins_adjacent_text_and_skips_unknown_events():
+    events = decode([delta(text("a")), delta(text("b")), {"event": "ping", "data": {}}, delta(text("c"))])
+    assert events == [TextDelta("abc")]
+    assert message_text([delta(text("Hello")), delta(text(", world"))]) == "Hello, world"
+
+
+def test_decode_typed_events():
+    events = decode(AGENT_RUN)
+    assert [type(e) for e in events] == [ToolUse, ToolResult, ToolUse, ToolResult, TextDelta]
+    assert events[0] == ToolUse("Sales Analyst", "cortex_analyst_text_to_sql")
+    assert events[1].sql == "SELECT SUM(total) FROM __ORDERS"
+    assert events[-1] == TextDelta("$1.2M in Q3.")
+
+
+def test_parse_agent_run_folds_text_sql_tools_and_citations():
+    result = parse_agent_run(AGENT_RUN)
+    assert result.text == "Revenue was $1.2M in Q3."
+    assert result.sql == "SELECT SUM(total) FROM __ORDERS"
+    assert result.tools_called == ["Sales Analyst", "Faq Search"]
+    assert result.tool_types == ["cortex_analyst_text_to_sql", "cortex_search"]
+    assert [(c["doc_title"], c["doc_chunk"], c["rank"]) for c in result.citations] == [
+        ("refunds.pdf", 3, 1), ("shipping.pdf", "7", 2),
+    ]
+    assert result.event_count == len(AGENT_RUN)
+    assert not [n for n in result.notices if n.level == "error"]
+
+
+def test_parse_agent_response_reads_annotations_and_metadata():
+    events = [
+        {"event": "response", "data": {"content": [
+            {"type": "tool_use", "tool_use": {"type": "cortex_search", "name": "Policy Docs"}},
+            {"type": "tool_result", "tool_result": {"content": [
+                {"type": "json", "json": {"text": "ignored in this dialect", "search_results": [
+                    {"doc_title": "refunds.pdf", "doc_id": 3, "source_id": 1},
+                ]}},
+            ]}},
+            {"type": "text", "text": "Refunds take 5 days.", "annotations": [
+                {"type": "cortex_search_citation", "doc_title": "refunds.pdf", "doc_id": "3", "index": 1},
+            ]},
+        ]}},
+        {"event": "metadata", "data": {"message_id": 42, "role": "assistant"}},
+    ]
+    assert [type(e) for e in decode(events)] == [ToolUse, ToolResult, TextDelta, Citation, Metadata]
+    result = parse_agent_response(events)
+    assert result.text == "Refunds take 5 days."
+    assert result.tools_called == ["Policy Docs"]
+    assert result.metadata == {"message_id": 42, "role": "assistant"}
+    # The search result and the annotation are the same chunk
+    assert len(result.citations) == 1
+    assert result.citations[0]["source_ids"] == [1]
+
+
+def test_error_event_becomes_an_error_notice():
+    events = [{"event": "error", "data": {"code": "399504", "message": "semantic model file not found"}}]
+    assert decode(events) == [StreamError("semantic model file not found")]
+    result = parse_agent_run(events)
+    assert [n.message for n in result.notices if n.level == "error"] == ["❌ Agent error: semantic model file not found"]
+
+
+def test_empty_or_unparsed_streams():
+    assert parse_agent_run([]).text == ""
+    assert parse_agent_run("not json").event_count == 0
+    assert decode([{"event": "metadata", "data": "not a dict"}]) == []
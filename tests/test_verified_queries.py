@@ -0,0 +1,85 @@
+import pytest
+
+pytest.importorskip("yaml")
+
+from sales_assistant.semantic_model import SemanticModel  # noqa: E402
+from verified_queries import expanded_sql, is_candidate, is_single_select, logical_sql, split_ctes  # noqa: E402
+
+MODEL = SemanticModel({
+    "name": "sales",
+    "tables": [
+        {
+            "name": "ORDERS",
+            "base_table": {"database": "SALES_DB", "schema": "PUBLIC", "table": "ORDERS"},
+            "dimensions": [{"name": "REGION", "expr": "REGION"}],
+            "facts": [{"name": "ORDER_TOTAL", "expr": "TOTAL_AMOUNT"}],
+        },
+        {
+            "name": "CUSTOMERS",
+            "base_table": {"database": "SALES_DB", "schema": "PUBLIC", "table": "CUSTOMERS"},
+            "dimensions": [{"name": "CUSTOMER_ID", "expr": "ID"}],
+        },
+    ],
+})
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1",
+    "select region, sum(total) from orders group by region;",
+    "WITH t AS (SELECT 1 AS x) SELECT x FROM t",
+    "SELECT 'drop table orders; --' AS note",
+    "SELECT GET(payload, 'k') FROM events",
+])
+def test_single_read_only_queries_pass(sql):
+    assert is_single_select(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "",
+    "DELETE FROM orders",
+    "SELECT 1; DROP TABLE orders",
+    "WITH t AS (SELECT 1) INSERT INTO x SELECT * FROM t",
+    "SELECT SYSTEM$WAIT(10)",
+    "CALL refresh_all()",
+    "/* SELECT */ UPDATE orders SET total = 0",
+])
+def test_writes_and_multiple_statements_fail(sql):
+    assert not is_single_select(sql)
+
+
+def test_split_ctes_respects_nesting_and_literals():
+    ctes, query = split_ctes("WITH a AS (SELECT '(' AS p), b AS (SELECT (1 + 2) AS q FROM a) SELECT * FROM b")
+    assert ctes == [("a", "SELECT '(' AS p"), ("b", "SELECT (1 + 2) AS q FROM a")]
+    assert query == "SELECT * FROM b"
+    assert split_ctes("SELECT 1") == ([], "SELECT 1")
+
+
+def test_logical_sql_drops_the_analyst_table_ctes():
+    sql = (
+        "WITH __orders AS (\n  SELECT region, total_amount AS order_total FROM sales_db.public.orders\n),\n"
+        "top AS (SELECT region FROM __orders)\n"
+        "SELECT region, SUM(order_total) FROM __orders WHERE region IN (SELECT region FROM top) GROUP BY region"
+    )
+    logical = logical_sql(sql, MODEL)
+    assert "__orders AS" not in logical
+    assert logical.startswith("WITH top AS (\nSELECT region FROM __orders\n)\n")
+    assert "sales_db" not in logical.lower()
+
+
+def test_logical_sql_replaces_base_table_names():
+    logical = logical_sql('SELECT COUNT(*) FROM "SALES_DB"."PUBLIC"."CUSTOMERS" c JOIN sales_db.public.orders o', MODEL)
+    assert logical == "SELECT COUNT(*) FROM __CUSTOMERS c JOIN __ORDERS o"
+
+
+def test_expanded_sql_defines_the_logical_tables_it_uses():
+    expanded = expanded_sql("SELECT region, SUM(order_total) FROM __ORDERS GROUP BY region", MODEL)
+    assert expanded.startswith("WITH __ORDERS AS (\nSELECT REGION AS REGION, TOTAL_AMOUNT AS ORDER_TOTAL\n"
+                               "FROM SALES_DB.PUBLIC.ORDERS\n)\n")
+    assert "__CUSTOMERS" not in expanded
+
+
+def test_candidates_are_matched_by_tool_type():
+    answer = {"route": "analyst_only", "sql": "SELECT 1", "errors": [], "question": "q"}
+    assert is_candidate({**answer, "tool_types": ["cortex_analyst_text_to_sql"], "tools": ["Revenue Tool"]})
+    assert not is_candidate({**answer, "tool_types": ["cortex_analyst_text_to_sql", "cortex_search"]})
+    assert is_candidate({**answer, "tools": ["Sales Analyst"]})
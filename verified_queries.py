@@ -0,0 +1,328 @@
+"""
+Mine verified_queries for the semantic model from answers that worked
+Reads the query log (sales_assistant.querylog) for analyst-only questions answered without
+errors, groups near-duplicate wordings by sales_assistant.faq.question_key, and keeps the
+SQL most of a group's answers agreed on; groups that produced the same SQL are merged.
+Each surviving SQL is rewritten into the form verified_queries use: logical tables referred
+to as __<TABLE>, with the __<table> CTEs Cortex Analyst generates to map them onto base
+tables removed, and any remaining base table names replaced. That exact string is what gets
+published, so it is what is checked: expanded back over the model's base tables and run
+(wrapped in LIMIT 0) against today's tables; queries that fail are dropped. Existing
+verified queries are kept unless a mined one covers the same question.
+
+The log is input the script runs and publishes, so it is only read from a directory private
+to this OS user (see sales_assistant.cache.private_dir), and SQL that is not a single
+read-only SELECT is dropped before anything is run. Review the --dry-run output before
+--publish.
+
+The result is written as a new version, CORTEX_AGENT_SALES.<UTC timestamp>.yaml, next to
+the model file. --publish uploads it to the analyst stage (under versions/, where older
+versions stay for rollback), replaces the staged CORTEX_AGENT_SALES.yaml and the local copy
+with it. Apps pick it up on restart.
+
+Usage: python verified_queries.py --connection NAME --log LOG_DIR [--min-count 3] [--min-agreement 0.6]
+                                  [--top 100] [--model-file CORTEX_AGENT_SALES.yaml] [--publish] [--dry-run]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sales_assistant import session as core_session
+from sales_assistant.cache import private_dir
+from sales_assistant.client import ANALYST_TOOL_TYPE, SEARCH_TOOL_TYPE, SEMANTIC_MODEL, TOOL_TYPES
+from sales_assistant.faq import question_key
+from sales_assistant.querylog import read_records, sql_hash
+from sales_assistant.semantic_model import SEMANTIC_MODEL_YAML, SemanticModel, upload_model
+
+VERSIONS_DIR = "versions"  # under the semantic model's stage directory
+
+# Quoted strings and identifiers, and comments: blanked before looking at the statement's keywords
+_LITERALS_AND_COMMENTS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|//[^\n]*|/\*.*?\*/", re.DOTALL)
+# Start of a CTE in a WITH clause: name AS (
+_CTE_HEAD = re.compile(r'\s*("(?:[^"]|"")+"|[A-Za-z_][\w$]*)\s+AS\s*\(', re.IGNORECASE)
+COLUMN_KINDS = ("dimensions", "time_dimensions", "facts", "measures")  # the columns a logical table exposes
+WRITE_KEYWORDS = {
+    "ALTER", "BEGIN", "CALL", "COMMIT", "COPY", "CREATE", "DELETE", "DROP", "EXECUTE", "GRANT",
+    "INSERT", "MERGE", "PUT", "REMOVE", "REVOKE", "ROLLBACK", "SET", "TRUNCATE", "UNDROP", "UNSET", "UPDATE", "USE",
+}
+
+
+def is_candidate(record: Dict) -> bool:
+    """An analyst-only answer with SQL and no errors; compound answers' SQL covers only part of the question
+
+    Tools are matched by type: the agent app's tool names come from its agent spec. Records
+    from before tool types were logged fall back to the client-side app's tool names.
+    """
+    types = record.get("tool_types") or [TOOL_TYPES.get(name) for name in record.get("tools") or []]
+    return bool(
+        (record.get("sql") or "").strip()
+        and not record.get("errors")
+        and ANALYST_TOOL_TYPE in types and SEARCH_TOOL_TYPE not in types
+    )
+
+
+def read_log(paths: Iterable[str]) -> Iterable[Dict]:
+    for record in read_records(paths):
+        if record.get("query") and is_candidate(record):
+            yield record
+
+
+def mine_queries(records: Iterable[Dict], min_count: int = 3, min_agreement: float = 0.6,
+                 top: int = 100) -> List[Dict]:
+    """Most asked questions with the SQL their answers agreed on, one per distinct SQL"""
+    counts: Counter = Counter()
+    wordings: Dict[str, Counter] = defaultdict(Counter)
+    statements: Dict[str, Counter] = defaultdict(Counter)
+    latest: Dict[Tuple[str, str], Tuple[float, str]] = {}
+    for record in records:
+        key = question_key(record["query"])
+        if not key:
+            continue
+        digest = sql_hash(record["sql"])
+        counts[key] += 1
+        wordings[key][record["query"]] += 1
+        statements[key][digest] += 1
+        ts = record.get("ts", 0)
+        if ts >= latest.get((key, digest), (-1, ""))[0]:
+            latest[(key, digest)] = (ts, record["sql"])
+
+    by_sql: Dict[str, Dict] = {}
+    for key, count in counts.most_common():
+        if count < min_count:
+            break
+        digest, agreed = statements[key].most_common(1)[0]
+        if agreed / count < min_agreement:
+            continue  # the analyst answers this question inconsistently; nothing to verify yet
+        merged = by_sql.get(digest)
+        if merged:
+            merged["count"] += count  # another wording of a question already kept
+            continue
+        by_sql[digest] = {
+            "key": key,
+            "question": wordings[key].most_common(1)[0][0],
+            "count": count,
+            "agreement": round(agreed / count, 2),
+            "sql": latest[(key, digest)][1].strip().rstrip(";").strip(),
+            "sql_hash": digest,
+        }
+    return sorted(by_sql.values(), key=lambda q: -q["count"])[:top]
+
+
+def is_single_select(sql: str) -> bool:
+    """One read-only query: starts with SELECT or WITH, no further statements, no DDL/DML or SYSTEM$ calls"""
+    code = _LITERALS_AND_COMMENTS.sub(" ", sql).strip().rstrip(";").strip()
+    if not code or ";" in code:
+        return False
+    words = [word.upper() for word in re.findall(r"[A-Za-z_][\w$]*", code)]
+    if not words or words[0] not in ("SELECT", "WITH"):
+        return False
+    return not any(word in WRITE_KEYWORDS or word.startswith("SYSTEM$") for word in words)
+
+
+def check_sql(session, sql: str) -> Optional[str]:
+    """None when sql still compiles and runs, else the error"""
+    try:
+        # The newline keeps a trailing -- comment from swallowing the parenthesis
+        session.sql(f"SELECT * FROM (\n{sql}\n) LIMIT 0").collect()
+        return None
+    except Exception as e:
+        return str(e).splitlines()[0] if str(e) else type(e).__name__
+
+
+def _masked(sql: str) -> str:
+    """sql with literals and comments blanked out, same length so positions line up"""
+    return _LITERALS_AND_COMMENTS.sub(lambda m: " " * len(m.group(0)), sql)
+
+
+def split_ctes(sql: str) -> Tuple[List[Tuple[str, str]], str]:
+    """([(name, body)], main query) of a leading WITH clause; ([], sql) when there is none"""
+    masked = _masked(sql)
+    start = re.match(r"\s*WITH\s+", masked, re.IGNORECASE)
+    if not start:
+        return [], sql
+    ctes, pos = [], start.end()
+    while True:
+        head = _CTE_HEAD.match(masked, pos)
+        if not head:
+            return [], sql  # not a plain WITH name AS (...) list; leave it alone
+        depth, end = 0, head.end() - 1
+        for end in range(head.end() - 1, len(masked)):
+            depth += {"(": 1, ")": -1}.get(masked[end], 0)
+            if depth == 0:
+                break
+        if depth:
+            return [], sql
+        ctes.append((sql[head.start(1):head.end(1)], sql[head.end():end].strip()))
+        comma = re.match(r"\s*,", masked[end + 1:])
+        if not comma:
+            return ctes, sql[end + 1:].strip()
+        pos = end + 1 + comma.end()
+
+
+def _with(ctes: List[Tuple[str, str]], query: str) -> str:
+    if not ctes:
+        return query
+    return "WITH " + ",\n".join(f"{name} AS (\n{body}\n)" for name, body in ctes) + "\n" + query
+
+
+def _logical_name(table: str) -> str:
+    return f"__{table}"
+
+
+def logical_sql(sql: str, model: SemanticModel) -> str:
+    """sql in the form verified_queries use: logical tables as __<TABLE>, not base tables
+
+    Cortex Analyst's SQL defines each logical table as a __<table> CTE over its base table;
+    those definitions are dropped (the model supplies them). Base tables still named directly
+    are replaced by their logical names.
+    """
+    logical = {_logical_name(name).lower() for name in model.tables}
+    ctes, query = split_ctes(sql)
+    kept = [(name, body) for name, body in ctes if name.strip('"').lower() not in logical]
+    if len(kept) < len(ctes):
+        sql = _with(kept, query)
+    for name, table in model.tables.items():
+        base = table.get("base_table") or {}
+        parts = [base.get("database"), base.get("schema"), base.get("table")]
+        if not all(parts):
+            continue
+        qualified = r"\.".join(rf'"?{re.escape(part)}"?' for part in parts)
+        sql = re.sub(rf"(?<![\w.\"]){qualified}(?![\w\"])", _logical_name(name), sql, flags=re.IGNORECASE)
+    return sql
+
+
+def expanded_sql(sql: str, model: SemanticModel) -> str:
+    """Published (logical) sql made runnable: each __<TABLE> it uses defined over its base table, as the model does"""
+    masked = _masked(sql)
+    definitions = []
+    for name, table in model.tables.items():
+        logical = _logical_name(name)
+        if not re.search(rf'(?<![\w$"]){re.escape(logical)}(?![\w$])', masked, re.IGNORECASE):
+            continue
+        base = table.get("base_table") or {}
+        columns = [
+            f"{column['expr']} AS {column['name']}"
+            for kind in COLUMN_KINDS for column in table.get(kind) or [] if column.get("expr") and column.get("name")
+        ]
+        source = ".".join(base.get(part, "") for part in ("database", "schema", "table"))
+        definitions.append((logical, f"SELECT {', '.join(columns) or '*'}\nFROM {source}"))
+    ctes, query = split_ctes(sql)
+    return _with(definitions + ctes, query)
+
+
+def query_name(key: str, taken: set) -> str:
+    name = "vq_" + re.sub(r"\W+", "_", key).strip("_")[:60]
+    unique, n = name, 2
+    while unique in taken:
+        unique, n = f"{name}_{n}", n + 1
+    taken.add(unique)
+    return unique
+
+
+def with_verified_queries(model: SemanticModel, mined: List[Dict], verified_by: str) -> dict:
+    """A copy of the model whose verified_queries are the mined ones plus the existing ones they do not replace"""
+    mined_keys = {q["key"] for q in mined}
+    existing = [q for q in model.model.get("verified_queries") or [] if question_key(q.get("question", "")) not in mined_keys]
+    taken = {q.get("name") for q in existing}
+    now = int(time.time())
+    verified = existing + [
+        {
+            "name": query_name(q["key"], taken),
+            "question": q["question"],
+            "sql": q["logical_sql"],
+            "verified_at": now,
+            "verified_by": verified_by,
+        }
+        for q in mined
+    ]
+    return {**model.model, "verified_queries": verified}
+
+
+def versioned_paths(model_file: str, version: str) -> Tuple[str, str]:
+    """(local file, stage path) of a model version"""
+    stem, ext = os.path.splitext(os.path.basename(model_file))
+    directory, name = SEMANTIC_MODEL.rsplit("/", 1)
+    return (
+        os.path.join(os.path.dirname(os.path.abspath(model_file)), f"{stem}.{version}{ext}"),
+        f"{directory}/{VERSIONS_DIR}/{name.rsplit('.', 1)[0]}.{version}.yaml",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connection", required=True, help="Snowflake connection name")
+    parser.add_argument("--log", required=True,
+                        help="Directory of queries-*.jsonl files; must be private to this OS user (mode 0700)")
+    parser.add_argument("--min-count", type=int, default=3, help="Skip questions asked fewer times")
+    parser.add_argument("--min-agreement", type=float, default=0.6,
+                        help="Share of a question's answers that must have produced the same SQL")
+    parser.add_argument("--top", type=int, default=100, help="Most verified queries to add")
+    parser.add_argument("--model-file", default=SEMANTIC_MODEL_YAML, help="Semantic model to extend")
+    parser.add_argument("--verified-by", default="query log miner")
+    parser.add_argument("--publish", action="store_true",
+                        help="Upload the new version and make it the staged and local semantic model")
+    parser.add_argument("--dry-run", action="store_true", help="Print the mined questions and the SQL to publish, and stop")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.log):
+        parser.error(f"--log {args.log} is not a directory")
+    try:
+        log_dir = private_dir(args.log)
+    except PermissionError as e:
+        parser.error(f"--log: {e}")
+    mined = mine_queries(read_log([log_dir]), args.min_count, args.min_agreement, args.top)
+    rejected = {q["question"]: "not a single SELECT" for q in mined if not is_single_select(q["sql"])}
+    mined = [q for q in mined if q["question"] not in rejected]
+    model = SemanticModel.load(args.model_file)
+    if args.dry_run:
+        for question in rejected:
+            print(f"  rejected (not a single SELECT): {question}")
+        for q in mined:
+            published = " ".join(logical_sql(q["sql"], model).split())
+            print(f"  {q['count']:>6} {q['agreement']:>5.0%}  {q['question']}\n{'':>16}{published}")
+        return
+
+    from snowflake.snowpark import Session
+
+    session = Session.builder.config("connection_name", args.connection).create()
+    try:
+        core_session.configure(session)
+        failed = {}
+        for q in mined:
+            # Check the exact string that is published, run the way the model defines its tables
+            q["logical_sql"] = logical_sql(q["sql"], model)
+            error = check_sql(session, expanded_sql(q["logical_sql"], model))
+            if error:
+                failed[q["question"]] = error
+        valid = [q for q in mined if q["question"] not in failed]
+
+        model_yaml = SemanticModel.dump(with_verified_queries(model, valid, args.verified_by))
+        version = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d%H%M%S")
+        local_path, stage_path = versioned_paths(args.model_file, version)
+        with open(local_path, "w", encoding="utf-8") as f:
+            f.write(model_yaml)
+        if args.publish:
+            upload_model(stage_path, model_yaml)
+            upload_model(SEMANTIC_MODEL, model_yaml)
+            with open(args.model_file, "w", encoding="utf-8") as f:
+                f.write(model_yaml)
+        print(json.dumps({
+            "mined": len(mined) + len(rejected),
+            "verified": len(valid),
+            "failed": {**rejected, **failed},
+            "version": version,
+            "file": local_path,
+            "published": stage_path if args.publish else None,
+        }, indent=2))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()